@@ -0,0 +1,84 @@
+"""
+Throughput de verificación de password (la parte CPU del login) según
+rondas de bcrypt y tamaño del pool de hashing.
+
+    python -m benchmarks.login_throughput --rounds 10 11 12 --workers 1 2 4 --logins 200
+
+Cada login simulado es un `verify` a través de HashingExecutor, con
+`--concurrency` logins en vuelo a la vez (como una ráfaga de inicio de turno).
+Imprime una línea JSON por combinación.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import bcrypt
+
+from core.exceptions import ServiceUnavailableError
+from core.hashing import HashingExecutor, _verify
+
+
+PASSWORD = "clave-de-prueba"
+
+
+async def run_case(rounds: int, workers: int, logins: int, concurrency: int):
+    stored_hash = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(rounds)).decode()
+    executor = HashingExecutor(workers=workers, queue_limit=concurrency)
+    gate = asyncio.Semaphore(concurrency)
+    latencies = []
+    rejected = 0
+
+    async def one_login():
+        nonlocal rejected
+
+        async with gate:
+            start = time.perf_counter()
+
+            try:
+                valid, _ = await executor.run(_verify, PASSWORD, stored_hash, rounds)
+            except ServiceUnavailableError:
+                rejected += 1
+                return
+
+            assert valid
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+
+    executor.shutdown()
+    latencies.sort()
+
+    return {
+        "rounds": rounds,
+        "workers": workers,
+        "concurrency": concurrency,
+        "logins": logins,
+        "rejected": rejected,
+        "elapsed_s": round(elapsed, 3),
+        "logins_per_s": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 11, 12, 13])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    for rounds in args.rounds:
+        for workers in args.workers:
+            result = asyncio.run(run_case(rounds, workers, args.logins, args.concurrency))
+            print(json.dumps(result), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Validación de RUT de a uno (validar_rut) contra el motor en lote de
+services/rut_service.py sobre el mismo arreglo de valores.
+
+    python -m benchmarks.rut_validation --values 1000000
+
+Los valores imitan la columna RUT / CELULAR: RUTs válidos con y sin puntos,
+RUTs con dígito verificador al azar, celulares y basura. Antes de medir se
+comprueba que validate_ruts y validar_rut den el mismo resultado en cada
+valor. Imprime una línea JSON.
+"""
+
+import argparse
+import json
+import random
+import time
+
+import numpy as np
+
+from services.rut_service import classify_rut_celular, validar_rut, validate_ruts
+
+
+GARBAGE = ["", "sin rut", "12-", "-", "K", "1.2.3", "n/a", "0"]
+
+
+def rut_check_digit(body: int) -> str:
+    total = sum(int(digit) * (2 + i % 6) for i, digit in enumerate(reversed(str(body))))
+
+    return "0123456789K0"[11 - total % 11]
+
+
+def sample_values(count: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    values = []
+
+    for _ in range(count):
+        kind = rng.random()
+        body = rng.randint(1_000_000, 99_999_999)
+
+        if kind < 0.5:
+            dv = rut_check_digit(body)
+            values.append(f"{body:,}".replace(",", ".") + f"-{dv}" if rng.random() < 0.5 else f"{body}-{dv}")
+        elif kind < 0.7:
+            values.append(f"{body}-{rng.choice('0123456789K')}")
+        elif kind < 0.9:
+            values.append(f"9{rng.randint(10_000_000, 99_999_999)}")
+        else:
+            values.append(rng.choice(GARBAGE))
+
+    return values
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--values", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    values = sample_values(args.values, args.seed)
+
+    scalar, scalar_s = timed(lambda: np.array([validar_rut(value) for value in values]))
+    batch, batch_s = timed(validate_ruts, values)
+    _, classify_s = timed(classify_rut_celular, values)
+
+    mismatches = int((scalar != batch).sum())
+
+    if mismatches:
+        raise SystemExit(f"validate_ruts difiere de validar_rut en {mismatches} valores")
+
+    print(json.dumps({
+        "values": args.values,
+        "valid": int(batch.sum()),
+        "scalar_s": round(scalar_s, 3),
+        "batch_s": round(batch_s, 3),
+        "classify_s": round(classify_s, 3),
+        "speedup": round(scalar_s / batch_s, 1),
+        "scalar_values_per_s": round(args.values / scalar_s),
+        "batch_values_per_s": round(args.values / batch_s),
+    }), flush=True)
+
+
+if __name__ == "__main__":
+    main()
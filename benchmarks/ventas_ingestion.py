@@ -0,0 +1,339 @@
+"""
+Tiempos por fase de la carga de ventas LYL sobre libros VENTAS sintéticos,
+según cantidad de filas, períodos y formato del archivo.
+
+    python -m benchmarks.ventas_ingestion --rows 10000 100000 --periods 1 12 --formats xlsx csv
+
+Cada caso genera (o reutiliza en --workdir) un archivo con los encabezados
+exactos de COLUMN_MAP y las filas repartidas en `--periods` períodos, y
+recorre el mismo camino que load_ventas_file para el primer período: lectura
+por chunks, normalize_columns/validate_columns, filter_period, las reglas de
+RowValidator (--validar-rut incluye la columna RUT / CELULAR),
+build_insert_rows, el archivo COPY local y el COPY. El COPY va a una tabla
+temporal con la forma de core.stg_ventas_lyl dentro de una transacción que
+se descarta, así que se puede correr contra la BD local sin tocar datos
+(--no-db lo omite).
+
+Cada caso corre en un proceso aparte para que el pico de RSS sea solo suyo.
+Imprime una línea JSON por caso, con las mismas claves siempre: se puede
+redirigir a un archivo y comparar corridas con diff o jq.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import resource
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from openpyxl import Workbook
+
+from services.ventas_lyl_service import (
+    COLUMN_MAP,
+    EXCEL_SHEET_NAME,
+    VENTAS_CHUNK_SIZE,
+    RowValidator,
+    _copy_text_line,
+    build_insert_rows,
+    copy_spool,
+    filter_period,
+    normalize_columns,
+    read_ventas_chunks,
+    validate_columns,
+)
+
+
+# cambia al cambiar synthetic_rows, para no reutilizar archivos viejos
+GENERATOR_VERSION = 2
+
+PHASES = ("read", "validate", "filter", "check_rows", "build_rows", "spool", "db_load")
+
+FAMILIAS = ["CABELLO", "MANOS Y PIES", "DEPILACION", "PESTAÑAS", "FACIAL"]
+
+# columnas con montos en pesos
+AMOUNT_COLUMNS = {
+    "PRECIO PROFESIONAL", "PRECIO WEB", "ABONO", "$ PAGADOS", "TOTAL", "TOTAL PW",
+    "ABONO PERDIDO", "$ DESCUENTOS", "GANANCIA PROF", "TOTAL GANANCIA PROF",
+    "GANANCIA SALON", "DESCPROF_A_CLIENTAS",
+}
+
+
+# =========================
+# ARCHIVOS SINTÉTICOS
+# =========================
+
+def rut_check_digit(body: int) -> str:
+    total = sum(int(digit) * (2 + i % 6) for i, digit in enumerate(reversed(str(body))))
+
+    return "0123456789K0"[11 - total % 11]
+
+
+def rut_or_mobile(rng: random.Random) -> str:
+    if rng.random() < 0.3:
+        return f"9{rng.randint(10_000_000, 99_999_999)}"
+
+    body = rng.randint(5_000_000, 25_000_000)
+
+    return f"{body:,}".replace(",", ".") + f"-{rut_check_digit(body)}"
+
+
+def period_list(periods: int, desde: str = "2024-01"):
+    year, month = int(desde[:4]), int(desde[5:])
+    result = []
+
+    for _ in range(periods):
+        result.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+    return result
+
+
+def synthetic_rows(rows: int, periods: int, seed: int = 0):
+    """
+    Filas de la hoja VENTAS en el orden de COLUMN_MAP, con los tipos que
+    trae un Excel real: fechas, montos numéricos, textos y celdas vacías.
+    """
+    rng = random.Random(seed)
+    spread = period_list(periods)
+
+    for i in range(rows):
+        year, month = spread[i % len(spread)]
+        delivered = datetime(year, month, 1 + i % 28)
+        row = []
+
+        for col in COLUMN_MAP:
+            if col == "VENTAS_KEY":
+                value = f"V{year}{month:02d}-{i:08d}"
+            elif col == "AÑO":
+                value = year
+            elif col == "AÑO-MES":
+                value = f"{year}-{month:02d}"
+            elif col == "FECHA ENTREGA":
+                value = delivered
+            elif col == "FECHA RECAU.":
+                value = delivered + timedelta(days=rng.randint(0, 5))
+            elif col == "FAMILIA":
+                value = rng.choice(FAMILIAS)
+            elif col == "% PROFESIONAL":
+                value = rng.choice([0.3, 0.4, 0.5])
+            elif col == "RUT / CELULAR":
+                value = rut_or_mobile(rng)
+            elif col in AMOUNT_COLUMNS:
+                value = rng.randint(0, 120) * 500 if rng.random() > 0.05 else None
+            elif col == "OBS":
+                value = rng.choice([None, None, "", "reagenda", "pago parcial"])
+            else:
+                value = f"{col.lower()} {rng.randint(1, 40)}"
+
+            row.append(value)
+
+        yield row
+
+
+def write_xlsx(path: str, rows: int, periods: int, seed: int):
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(EXCEL_SHEET_NAME)
+    sheet.append(list(COLUMN_MAP))
+
+    for row in synthetic_rows(rows, periods, seed):
+        sheet.append(row)
+
+    workbook.save(path)
+
+
+def write_csv(path: str, rows: int, periods: int, seed: int):
+    import csv
+
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(list(COLUMN_MAP))
+
+        for row in synthetic_rows(rows, periods, seed):
+            writer.writerow(["" if value is None else value for value in row])
+
+
+def write_parquet(path: str, rows: int, periods: int, seed: int):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    data = {col: [] for col in COLUMN_MAP}
+
+    for row in synthetic_rows(rows, periods, seed):
+        for col, value in zip(COLUMN_MAP, row):
+            data[col].append(None if value is None else str(value))
+
+    pq.write_table(pa.table(data), path)
+
+
+WRITERS = {
+    "xlsx": write_xlsx,
+    "csv": write_csv,
+    "parquet": write_parquet,
+}
+
+
+def ensure_file(workdir: str, formato: str, rows: int, periods: int, seed: int) -> str:
+    path = os.path.join(workdir, f"ventas_{rows}x{periods}_s{seed}_g{GENERATOR_VERSION}.{formato}")
+
+    if not os.path.exists(path):
+        partial = path + ".tmp"
+        WRITERS[formato](partial, rows, periods, seed)
+        os.replace(partial, path)
+
+    return path
+
+
+# =========================
+# FASES
+# =========================
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss viene en KB en Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def _write_spool(spool, rows):
+    spool.writelines(_copy_text_line(row) for row in rows)
+
+
+def measure(path: str, formato: str, anio: int, mes: int, cur=None, validar_rut: bool = False) -> dict:
+    """
+    Recorre el archivo por chunks como load_ventas_file, acumulando el
+    tiempo de cada fase. Sin `cur` no hay fase de COPY.
+    """
+    timings = dict.fromkeys(PHASES, 0.0)
+    counts = {"rows_read": 0, "rows_period": 0}
+
+    # todas las familias generadas son válidas: se mide el costo de las
+    # reglas, no el del reporte
+    validator = RowValidator(set(FAMILIAS), validar_rut=validar_rut)
+
+    def timed(phase, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        timings[phase] += time.perf_counter() - start
+        return result
+
+    _, columns, chunks = timed("read", read_ventas_chunks, path, formato)
+    timed("validate", validate_columns, columns)
+
+    spool = tempfile.NamedTemporaryFile("w", encoding="utf-8", suffix=".copy")
+
+    while True:
+        chunk = timed("read", next, chunks, None)
+
+        if chunk is None:
+            break
+
+        counts["rows_read"] += len(chunk)
+        chunk = timed("validate", normalize_columns, chunk)
+        df_filtered = timed("filter", filter_period, chunk, anio, mes)
+
+        if df_filtered.empty:
+            continue
+
+        timed("check_rows", validator.check, df_filtered, df_filtered["AÑO-MES"])
+
+        insert_rows = timed("build_rows", build_insert_rows, df_filtered, os.path.basename(path))
+        counts["rows_period"] += len(insert_rows)
+
+        timed("spool", _write_spool, spool, insert_rows)
+
+    with spool:
+        spool.flush()
+
+        if cur is not None:
+            timed("db_load", copy_spool, cur, spool.name, "bench_stg_ventas_lyl")
+
+    return {**counts, "row_errors": validator.error_count, **timings}
+
+
+def run_case(path: str, formato: str, rows: int, periods: int, use_db: bool, validar_rut: bool) -> dict:
+    anio, mes = period_list(periods)[0]
+    start = time.perf_counter()
+
+    if use_db:
+        from core.db import get_connection
+
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    CREATE TEMP TABLE bench_stg_ventas_lyl
+                    (LIKE core.stg_ventas_lyl INCLUDING DEFAULTS INCLUDING GENERATED)
+                    """
+                )
+
+                try:
+                    measured = measure(path, formato, anio, mes, cur, validar_rut)
+                finally:
+                    conn.rollback()
+    else:
+        measured = measure(path, formato, anio, mes, validar_rut=validar_rut)
+
+    elapsed = time.perf_counter() - start
+
+    def per_second(count, seconds):
+        return round(count / seconds, 1) if seconds else None
+
+    return {
+        "formato": formato,
+        "rows": rows,
+        "periods": periods,
+        "chunk_size": VENTAS_CHUNK_SIZE,
+        "validar_rut": validar_rut,
+        "file_mb": round(os.path.getsize(path) / 1024 / 1024, 2),
+        "rows_read": measured["rows_read"],
+        "rows_period": measured["rows_period"],
+        "row_errors": measured["row_errors"],
+        **{f"{phase}_s": round(measured[phase], 3) for phase in PHASES},
+        "elapsed_s": round(elapsed, 3),
+        "read_rows_per_s": per_second(measured["rows_read"], measured["read"]),
+        "db_rows_per_s": per_second(measured["rows_period"], measured["db_load"]),
+        "rows_per_s": per_second(measured["rows_read"], elapsed),
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def _run_isolated(args):
+    return run_case(*args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 50_000])
+    parser.add_argument("--periods", type=int, nargs="+", default=[1, 6])
+    parser.add_argument("--formats", nargs="+", choices=sorted(WRITERS), default=["xlsx"])
+    parser.add_argument("--chunk-size", type=int, default=VENTAS_CHUNK_SIZE)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "kivor_bench"))
+    parser.add_argument("--no-db", action="store_true", help="omite la fase de COPY")
+    parser.add_argument("--validar-rut", action="store_true", help="incluye la clasificación de RUT / CELULAR")
+    args = parser.parse_args()
+
+    os.makedirs(args.workdir, exist_ok=True)
+
+    # los procesos de cada caso leen VENTAS_CHUNK_SIZE al importar el servicio
+    os.environ["VENTAS_CHUNK_SIZE"] = str(args.chunk_size)
+
+    # spawn: cada caso parte de un proceso limpio y su pico de RSS no
+    # arrastra el de los casos anteriores
+    context = multiprocessing.get_context("spawn")
+
+    for formato in args.formats:
+        for rows in args.rows:
+            for periods in args.periods:
+                path = ensure_file(args.workdir, formato, rows, periods, args.seed)
+                case = (path, formato, rows, periods, not args.no_db, args.validar_rut)
+
+                with context.Pool(1) as pool:
+                    result = pool.apply(_run_isolated, (case,))
+
+                print(json.dumps(result), flush=True)
+
+
+if __name__ == "__main__":
+    main()
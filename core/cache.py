@@ -0,0 +1,103 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Cache en memoria con expiración por entrada y tamaño máximo (LRU).
+
+    Es por proceso: cada worker de uvicorn tiene su propia copia, por eso
+    la invalidación entre procesos se hace vía LISTEN/NOTIFY.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+
+        # key -> (expira_en, guardado_en, valor)
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._age_total = 0.0
+        self._age_max = 0.0
+
+    def get_entry(self, key):
+        """
+        Retorna (valor, edad_en_segundos) o None si no está o expiró.
+        """
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._data.get(key)
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, stored_at, value = entry
+
+            if expires_at <= now:
+                del self._data[key]
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+
+            age = now - stored_at
+            self.hits += 1
+            self._age_total += age
+            self._age_max = max(self._age_max, age)
+
+            return value, age
+
+    def get(self, key, default=None):
+        entry = self.get_entry(key)
+
+        if entry is None:
+            return default
+
+        return entry[0]
+
+    def set(self, key, value, ttl: float = None):
+        now = time.monotonic()
+        ttl = self.ttl if ttl is None else ttl
+
+        with self._lock:
+            self._data[key] = (now + ttl, now, value)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._data.pop(key, None)
+
+        return entry[2] if entry else None
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "avg_hit_age_s": round(self._age_total / self.hits, 3) if self.hits else 0.0,
+            "max_hit_age_s": round(self._age_max, 3),
+        }
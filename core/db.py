@@ -1,9 +1,25 @@
 import os
-import psycopg
+from contextlib import asynccontextmanager
+from psycopg.pq import TransactionStatus
+from psycopg_pool import ConnectionPool, AsyncConnectionPool
 from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
 
 
-def get_connection():
+# =========================
+# CONFIG POOL
+# =========================
+
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_MAX_IDLE = float(os.getenv("DB_POOL_MAX_IDLE", "300"))
+DB_POOL_MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME", "1800"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+
+_pool = None
+_async_pool = None
+
+
+def get_database_url():
     database_url = os.getenv("DATABASE_URL")
 
     if not database_url:
@@ -17,7 +33,7 @@ def get_connection():
 
     new_query = urlencode(query, doseq=True)
 
-    clean_url = urlunparse((
+    return urlunparse((
         parsed.scheme,
         parsed.netloc,
         parsed.path,
@@ -26,9 +42,139 @@ def get_connection():
         parsed.fragment
     ))
 
-    return psycopg.connect(clean_url)
+
+def _reset_connection(conn):
+    # la conexión vuelve al pool sin transacción abierta ni search_path de tenant
+    if conn.info.transaction_status != TransactionStatus.IDLE:
+        conn.rollback()
+
+    conn.execute("RESET search_path")
+    conn.commit()
+
+
+async def _reset_async_connection(conn):
+    if conn.info.transaction_status != TransactionStatus.IDLE:
+        await conn.rollback()
+
+    await conn.execute("RESET search_path")
+    await conn.commit()
+
+
+def open_pool():
+    global _pool
+
+    if _pool is None:
+        _pool = ConnectionPool(
+            get_database_url(),
+            min_size=DB_POOL_MIN_SIZE,
+            max_size=DB_POOL_MAX_SIZE,
+            max_idle=DB_POOL_MAX_IDLE,
+            max_lifetime=DB_POOL_MAX_LIFETIME,
+            timeout=DB_POOL_TIMEOUT,
+            check=ConnectionPool.check_connection,
+            reset=_reset_connection,
+            name="kivor",
+            open=False,
+        )
+        _pool.open()
+
+    return _pool
+
+
+def close_pool():
+    global _pool
+
+    if _pool is not None:
+        _pool.close()
+        _pool = None
+
+
+def get_connection():
+    """
+    Entrega una conexión del pool como context manager.
+
+    Al salir del bloque `with` se hace commit (o rollback si hubo error)
+    y la conexión vuelve al pool en vez de cerrarse.
+    """
+    return open_pool().connection()
+
+
+async def open_async_pool():
+    global _async_pool
+
+    if _async_pool is None:
+        _async_pool = AsyncConnectionPool(
+            get_database_url(),
+            min_size=DB_POOL_MIN_SIZE,
+            max_size=DB_POOL_MAX_SIZE,
+            max_idle=DB_POOL_MAX_IDLE,
+            max_lifetime=DB_POOL_MAX_LIFETIME,
+            timeout=DB_POOL_TIMEOUT,
+            check=AsyncConnectionPool.check_connection,
+            reset=_reset_async_connection,
+            name="kivor-async",
+            open=False,
+        )
+        await _async_pool.open()
+
+    return _async_pool
+
+
+async def close_async_pool():
+    global _async_pool
+
+    if _async_pool is not None:
+        await _async_pool.close()
+        _async_pool = None
+
+
+@asynccontextmanager
+async def get_async_connection():
+    """
+    Versión asíncrona de get_connection() para rutas `async def`.
+
+    Mismas reglas: commit/rollback al salir y la conexión vuelve al pool.
+    """
+    pool = await open_async_pool()
+
+    async with pool.connection() as conn:
+        yield conn
+
+
+def _pool_stats(pool):
+    if pool is None:
+        return {"open": False}
+
+    stats = pool.get_stats()
+
+    return {
+        "open": True,
+        "pool_size": stats.get("pool_size", 0),
+        "pool_available": stats.get("pool_available", 0),
+        "checkouts": stats.get("requests_num", 0),
+        "waiting": stats.get("requests_waiting", 0),
+        "wait_ms": stats.get("requests_wait_ms", 0),
+        "timeouts": stats.get("requests_errors", 0),
+        "connections_num": stats.get("connections_num", 0),
+        "connections_errors": stats.get("connections_errors", 0),
+        "connections_lost": stats.get("connections_lost", 0),
+        "returns_bad": stats.get("returns_bad", 0),
+    }
+
+
+def get_pool_stats():
+    return _pool_stats(_pool)
+
+
+def get_async_pool_stats():
+    return _pool_stats(_async_pool)
 
 
 def set_tenant_schema(conn, schema):
     with conn.cursor() as cur:
         cur.execute(f"SET search_path TO {schema}")
+
+
+async def set_tenant_schema_async(conn, schema):
+    async with conn.cursor() as cur:
+        await cur.execute(f"SET search_path TO {schema}")
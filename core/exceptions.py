@@ -30,3 +30,8 @@ class InvalidDataError(AppException):
 class InternalServerError(AppException):
     status_code = 500
     detail = "Internal server error"
+
+
+class ServiceUnavailableError(AppException):
+    status_code = 503
+    detail = "Service unavailable"
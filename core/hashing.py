@@ -0,0 +1,143 @@
+import asyncio
+import hashlib
+import hmac
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+from core.exceptions import ServiceUnavailableError
+
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 2)))
+HASH_QUEUE_LIMIT = int(os.getenv("HASH_QUEUE_LIMIT", "32"))
+
+# bcrypt solo considera los primeros 72 bytes; bcrypt>=5 exige truncar a mano
+BCRYPT_MAX_BYTES = 72
+
+
+class HashingExecutor:
+    """
+    Pool de threads dedicado a bcrypt.
+
+    bcrypt libera el GIL, así que los hashes corren en paralelo sin tomar
+    los threads de AnyIO que atienden requests. `queue_limit` acota los
+    trabajos en curso + en cola; por encima se rechaza con 503 en vez de
+    acumular latencia.
+    """
+
+    def __init__(self, workers: int = HASH_WORKERS, queue_limit: int = HASH_QUEUE_LIMIT):
+        self.workers = workers
+        self.queue_limit = max(queue_limit, workers)
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix="hashing"
+        )
+        self._slots = threading.BoundedSemaphore(self.queue_limit)
+        self._lock = threading.Lock()
+
+        self.in_flight = 0
+        self.submitted = 0
+        self.rejected = 0
+        self.max_in_flight = 0
+
+    def _release(self, future):
+        with self._lock:
+            self.in_flight -= 1
+
+        self._slots.release()
+
+    def submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+
+            raise ServiceUnavailableError("Servidor ocupado, intenta nuevamente")
+
+        with self._lock:
+            self.in_flight += 1
+            self.submitted += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(self._release)
+
+        return future
+
+    async def run(self, fn, *args):
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_executor = HashingExecutor()
+
+
+def _password_bytes(password: str) -> bytes:
+    return password.encode()[:BCRYPT_MAX_BYTES]
+
+
+def is_legacy_hash(stored_hash: str) -> bool:
+    return not (stored_hash or "").startswith("$2")
+
+
+def _hash(password: str, rounds: int = BCRYPT_ROUNDS) -> str:
+    return bcrypt.hashpw(_password_bytes(password), bcrypt.gensalt(rounds)).decode()
+
+
+def _verify(password: str, stored_hash: str, rounds: int = BCRYPT_ROUNDS):
+    """
+    Retorna (válida, requiere_rehash).
+
+    Los hashes antiguos son SHA-256 hex sin salt; si coinciden se piden
+    rehashear. Un bcrypt con menos rondas que las configuradas también.
+    """
+    if not stored_hash:
+        return False, False
+
+    if is_legacy_hash(stored_hash):
+        legacy = hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(legacy, stored_hash), True
+
+    try:
+        valid = bcrypt.checkpw(_password_bytes(password), stored_hash.encode())
+    except ValueError:
+        return False, False
+
+    stored_rounds = int(stored_hash.split("$")[2])
+
+    return valid, valid and stored_rounds < rounds
+
+
+def hash_password(password: str) -> str:
+    # para código síncrono (ya corre en un thread de AnyIO)
+    return _executor.submit(_hash, password).result()
+
+
+async def hash_password_async(password: str) -> str:
+    return await _executor.run(_hash, password)
+
+
+async def verify_password_async(password: str, stored_hash: str):
+    return await _executor.run(_verify, password, stored_hash)
+
+
+def get_hashing_stats():
+    return {
+        "bcrypt_rounds": BCRYPT_ROUNDS,
+        **_executor.stats(),
+    }
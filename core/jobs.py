@@ -0,0 +1,237 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from uuid import uuid4
+
+from core.exceptions import ServiceUnavailableError
+
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_LIMIT = int(os.getenv("JOB_QUEUE_LIMIT", "16"))
+
+# segundos que un job terminado sigue disponible para consultar su estado
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+class Job:
+    """
+    Estado de un trabajo en segundo plano.
+
+    El worker avanza `phase` y los contadores con `update`; el endpoint de
+    estado lee `snapshot()`. Solo guarda datos en memoria del proceso.
+    """
+
+    def __init__(self, kind: str, owner: dict, params: dict):
+        self.job_id = uuid4().hex
+        self.kind = kind
+        self.owner = owner
+        self.params = params
+
+        self.status = JOB_QUEUED
+        self.phase = JOB_QUEUED
+        self.progress = {}
+        self.result = None
+        self.error = None
+
+        self.created_at = _now()
+        self.started_at = None
+        self.finished_at = None
+
+        self._lock = threading.Lock()
+
+    def update(self, phase: str = None, **progress):
+        with self._lock:
+            if phase:
+                self.phase = phase
+
+            self.progress.update(progress)
+
+    def is_owned_by(self, user: dict) -> bool:
+        return all(user.get(key) == value for key, value in self.owner.items())
+
+    def is_finished(self) -> bool:
+        return self.status in (JOB_DONE, JOB_FAILED)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "job_id": self.job_id,
+                "kind": self.kind,
+                "status": self.status,
+                "phase": self.phase,
+                **self.params,
+                "progress": dict(self.progress),
+                "result": self.result,
+                "error": self.error,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+            }
+
+
+class JobRunner:
+    """
+    Pool de threads para trabajos largos (cargas de archivos).
+
+    `submit` registra el job y retorna de inmediato; `fn(job)` corre en un
+    worker y su retorno queda en `job.result`. Igual que HashingExecutor,
+    `queue_limit` acota los jobs pendientes y por encima se rechaza con 503.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, queue_limit: int = JOB_QUEUE_LIMIT):
+        self.workers = workers
+        self.queue_limit = max(queue_limit, workers)
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix="jobs"
+        )
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+        # job_id -> (future, cleanup) de los jobs que aún no terminan
+        self._futures = {}
+
+        self.submitted = 0
+        self.rejected = 0
+        self.failed = 0
+
+    def _prune(self):
+        limit = time.time() - JOB_RETENTION_SECONDS
+
+        for job_id, job in list(self._jobs.items()):
+            if job.finished_at and job.finished_at.timestamp() < limit:
+                del self._jobs[job_id]
+
+    def _pending(self) -> int:
+        return sum(1 for job in self._jobs.values() if not job.is_finished())
+
+    def _run(self, job: Job, fn, cleanup):
+        with job._lock:
+            job.status = JOB_RUNNING
+            job.started_at = _now()
+
+        try:
+            result = fn(job)
+
+            with job._lock:
+                job.result = result
+                job.status = JOB_DONE
+                job.phase = JOB_DONE
+                job.finished_at = _now()
+
+        except Exception as e:
+            logger.exception("Job %s falló", job.job_id)
+            self._fail(job, str(e))
+
+        finally:
+            with self._lock:
+                self._futures.pop(job.job_id, None)
+
+            if cleanup:
+                cleanup()
+
+    def _fail(self, job: Job, error: str):
+        with job._lock:
+            job.error = error
+            job.status = JOB_FAILED
+            job.phase = JOB_FAILED
+            job.finished_at = _now()
+
+        with self._lock:
+            self.failed += 1
+
+    def submit(self, kind: str, fn, owner: dict, params: dict = None, cleanup=None) -> Job:
+        job = Job(kind, owner, params or {})
+
+        with self._lock:
+            self._prune()
+
+            if self._pending() >= self.queue_limit:
+                self.rejected += 1
+
+                if cleanup:
+                    cleanup()
+
+                raise ServiceUnavailableError("Demasiadas cargas en curso, intenta nuevamente")
+
+            self._jobs[job.job_id] = job
+            self.submitted += 1
+
+        with self._lock:
+            future = self._executor.submit(self._run, job, fn, cleanup)
+            self._futures[job.job_id] = (future, cleanup)
+
+        return job
+
+    def get(self, job_id: str):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self):
+        with self._lock:
+            by_status = {}
+
+            for job in self._jobs.values():
+                by_status[job.status] = by_status.get(job.status, 0) + 1
+
+            return {
+                "workers": self.workers,
+                "queue_limit": self.queue_limit,
+                "submitted": self.submitted,
+                "rejected": self.rejected,
+                "failed": self.failed,
+                "jobs": by_status,
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+        # los jobs cancelados nunca llegan a _run: se liberan sus archivos
+        # acá y quedan como fallidos en vez de "queued" para siempre
+        with self._lock:
+            cancelled = [
+                (self._jobs.get(job_id), self._futures.pop(job_id)[1])
+                for job_id, (future, _) in list(self._futures.items())
+                if future.cancelled()
+            ]
+
+        for job, cleanup in cancelled:
+            if job is not None:
+                self._fail(job, "Carga cancelada al detener el servidor")
+
+            if cleanup:
+                cleanup()
+
+
+_runner = JobRunner()
+
+
+def submit_job(kind: str, fn, owner: dict, params: dict = None, cleanup=None) -> Job:
+    return _runner.submit(kind, fn, owner, params, cleanup)
+
+
+def get_job(job_id: str):
+    return _runner.get(job_id)
+
+
+def shutdown_jobs():
+    _runner.shutdown()
+
+
+def get_job_stats():
+    return _runner.stats()
@@ -0,0 +1,121 @@
+import asyncio
+import logging
+
+import psycopg
+from psycopg import sql
+
+from core.db import get_database_url
+
+
+logger = logging.getLogger(__name__)
+
+LISTENER_RETRY_SECONDS = 5
+
+_handlers = {}
+_task = None
+_connected = False
+_stats = {
+    "notifications": 0,
+    "reconnects": 0,
+    "errors": 0,
+}
+
+
+def register_listener(channel: str, handler):
+    """
+    Registra un handler para un canal de NOTIFY.
+
+    El handler recibe el payload (str). Cuando el listener se (re)conecta
+    se llama con payload None: pudo haber notificaciones perdidas y el
+    cache asociado debe vaciarse completo.
+    """
+    _handlers.setdefault(channel, []).append(handler)
+
+
+def is_listening() -> bool:
+    return _connected
+
+
+def _dispatch(channel: str, payload):
+    for handler in _handlers.get(channel, []):
+        try:
+            handler(payload)
+        except Exception:
+            logger.exception("Error en handler de NOTIFY %s", channel)
+
+
+async def _listen_loop():
+    global _connected
+
+    while True:
+        try:
+            conn = await psycopg.AsyncConnection.connect(
+                get_database_url(),
+                autocommit=True
+            )
+
+            async with conn:
+                for channel in _handlers:
+                    await conn.execute(
+                        sql.SQL("LISTEN {}").format(sql.Identifier(channel))
+                    )
+
+                _connected = True
+                _stats["reconnects"] += 1
+
+                for channel in _handlers:
+                    _dispatch(channel, None)
+
+                async for notify in conn.notifies():
+                    _stats["notifications"] += 1
+                    _dispatch(notify.channel, notify.payload)
+
+        except asyncio.CancelledError:
+            raise
+
+        except Exception:
+            _stats["errors"] += 1
+            logger.exception("Listener de NOTIFY desconectado")
+
+        finally:
+            _connected = False
+
+        await asyncio.sleep(LISTENER_RETRY_SECONDS)
+
+
+async def start_listener():
+    global _task
+
+    if _task is None and _handlers:
+        _task = asyncio.create_task(_listen_loop())
+
+
+async def stop_listener():
+    global _task
+
+    if _task is not None:
+        _task.cancel()
+
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+
+        _task = None
+
+
+async def notify(cur, channel: str, payload: str):
+    # se entrega a los demás procesos al hacer commit de la transacción
+    await cur.execute("SELECT pg_notify(%s, %s)", (channel, payload))
+
+
+def notify_sync(cur, channel: str, payload: str):
+    cur.execute("SELECT pg_notify(%s, %s)", (channel, payload))
+
+
+def get_listener_stats():
+    return {
+        "connected": _connected,
+        "channels": sorted(_handlers),
+        **_stats,
+    }
@@ -5,7 +5,7 @@ from fastapi import HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import os
 
-from core.db import get_connection
+from core.session_cache import get_session_state
 
 SECRET_KEY = os.getenv("SECRET_KEY")
 
@@ -35,7 +35,7 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     return encoded_jwt
 
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
 
     token = credentials.credentials
 
@@ -53,16 +53,7 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
         if not tenant_schema:
             raise HTTPException(status_code=401, detail="Token inválido: tenant no definido")
 
-        with get_connection() as conn:
-            with conn.cursor() as cur:
-
-                cur.execute("""
-                    SELECT revoked, expires_at
-                    FROM core.user_session
-                    WHERE session_id = %s
-                """, (session_id,))
-
-                session = cur.fetchone()
+        session = await get_session_state(session_id)
 
         if not session:
             raise HTTPException(status_code=401, detail="Sesión no válida")
@@ -0,0 +1,109 @@
+import os
+
+from core.cache import TTLCache
+from core.db import get_async_connection
+from core.notifications import register_listener, is_listening, notify
+
+
+SESSION_REVOKED_CHANNEL = "user_session_revoked"
+
+SESSION_CACHE_TTL = float(os.getenv("SESSION_CACHE_TTL", "60"))
+SESSION_CACHE_MAXSIZE = int(os.getenv("SESSION_CACHE_MAXSIZE", "10000"))
+
+_cache = TTLCache(maxsize=SESSION_CACHE_MAXSIZE, ttl=SESSION_CACHE_TTL)
+
+# se incrementa en cada invalidación: una lectura de la BD que empezó antes
+# no guarda en el cache lo que leyó (podría ser la sesión aún sin revocar)
+_generation = 0
+
+_stats = {
+    "bypassed": 0,
+    "invalidations": 0,
+}
+
+
+def invalidate_session(session_id: str = None):
+    """
+    Descarta la sesión cacheada; sin session_id, todas (el listener se
+    reconectó y pudo perder notificaciones).
+    """
+    global _generation
+
+    _generation += 1
+
+    if session_id is None:
+        _cache.clear()
+        return
+
+    _stats["invalidations"] += 1
+    _cache.pop(session_id)
+
+
+register_listener(SESSION_REVOKED_CHANNEL, invalidate_session)
+
+
+async def _fetch_session(session_id: str):
+    async with get_async_connection() as conn:
+        async with conn.cursor() as cur:
+
+            await cur.execute("""
+                SELECT revoked, expires_at
+                FROM core.user_session
+                WHERE session_id = %s
+            """, (session_id,))
+
+            return await cur.fetchone()
+
+
+async def get_session_state(session_id: str):
+    """
+    Retorna (revoked, expires_at) de la sesión o None si no existe.
+
+    Solo se usa el cache mientras el listener de NOTIFY está conectado;
+    sin él no habría forma de enterarse de una revocación a tiempo.
+    """
+    if not is_listening():
+        _stats["bypassed"] += 1
+        return await _fetch_session(session_id)
+
+    session = _cache.get(session_id)
+
+    if session is not None:
+        return session
+
+    generation = _generation
+    session = await _fetch_session(session_id)
+
+    if session:
+        session = tuple(session)
+
+        if _generation == generation:
+            _cache.set(session_id, session)
+
+    return session
+
+
+async def revoke_session(cur, session_id: str):
+    """
+    Marca la sesión como revocada en la misma transacción de `cur` y avisa
+    a todos los procesos (este incluido) al hacer commit.
+
+    El llamador debe llamar a invalidate_session(session_id) después del
+    commit: antes, una validación concurrente todavía leería la sesión sin
+    revocar y la volvería a dejar en el cache.
+    """
+    await cur.execute("""
+        UPDATE core.user_session
+        SET revoked = TRUE
+        WHERE session_id = %s
+    """, (session_id,))
+
+    await notify(cur, SESSION_REVOKED_CHANNEL, session_id)
+
+
+def get_session_cache_stats():
+    return {
+        **_cache.stats(),
+        **_stats,
+        "listening": is_listening(),
+    }
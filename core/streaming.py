@@ -0,0 +1,127 @@
+import csv
+import io
+import json
+import os
+from datetime import date, datetime, time
+from decimal import Decimal
+from uuid import UUID, uuid4
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+from core.db import get_async_connection, set_tenant_schema_async
+
+
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "1000"))
+
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def get_stream_format(request: Request):
+    """
+    Formato de streaming pedido en el header Accept, o None para la
+    respuesta JSON normal.
+    """
+    accept = request.headers.get("accept", "")
+
+    for fmt, media_type in STREAM_MEDIA_TYPES.items():
+        if media_type in accept:
+            return fmt
+
+    return None
+
+
+def _json_default(value):
+    # mismo criterio que el encoder de FastAPI para los tipos que entrega psycopg
+    if isinstance(value, Decimal):
+        return int(value) if value.as_tuple().exponent >= 0 else float(value)
+
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+
+    if isinstance(value, UUID):
+        return str(value)
+
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+
+def _encode_ndjson(columns, rows) -> bytes:
+    return "".join(
+        json.dumps(dict(zip(columns, row)), default=_json_default, ensure_ascii=False) + "\n"
+        for row in rows
+    ).encode()
+
+
+def _encode_csv(rows) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+
+    return buffer.getvalue().encode()
+
+
+async def _stream_rows(query, params, fmt: str, tenant_schema: str = None):
+    async with get_async_connection() as conn:
+        if tenant_schema:
+            await set_tenant_schema_async(conn, tenant_schema)
+
+        # cursor con nombre (server-side): la BD entrega de a STREAM_BATCH_SIZE
+        # filas y la memoria no crece con el tamaño del resultado
+        async with conn.cursor(name=f"stream_{uuid4().hex}") as cur:
+            await cur.execute(query, params)
+
+            columns = [desc[0] for desc in cur.description]
+
+            if fmt == "csv":
+                yield _encode_csv([columns])
+
+            while True:
+                rows = await cur.fetchmany(STREAM_BATCH_SIZE)
+
+                if not rows:
+                    break
+
+                if fmt == "csv":
+                    yield _encode_csv(rows)
+                else:
+                    yield _encode_ndjson(columns, rows)
+
+
+async def _stream_list(columns, rows, fmt: str):
+    if fmt == "csv":
+        yield _encode_csv([columns])
+
+    for start in range(0, len(rows), STREAM_BATCH_SIZE):
+        batch = rows[start:start + STREAM_BATCH_SIZE]
+
+        if fmt == "csv":
+            yield _encode_csv(batch)
+        else:
+            yield _encode_ndjson(columns, batch)
+
+
+def _streaming_response(body, fmt: str, filename: str):
+    headers = {}
+
+    if fmt == "csv":
+        headers["Content-Disposition"] = f'attachment; filename="{filename}.csv"'
+
+    return StreamingResponse(
+        body,
+        media_type=STREAM_MEDIA_TYPES[fmt],
+        headers=headers,
+    )
+
+
+def stream_query(query, params, fmt: str, tenant_schema: str = None, filename: str = "export"):
+    return _streaming_response(_stream_rows(query, params, fmt, tenant_schema), fmt, filename)
+
+
+def stream_rows(columns, rows, fmt: str, filename: str = "export"):
+    """
+    Como stream_query, para filas que ya están en memoria (tuplas en el
+    orden de `columns`).
+    """
+    return _streaming_response(_stream_list(columns, rows, fmt), fmt, filename)
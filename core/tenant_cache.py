@@ -0,0 +1,125 @@
+import asyncio
+import os
+import time
+
+from core.notifications import register_listener
+
+
+ORG_TENANT_CHANNEL = "org_tenant_changed"
+
+ORG_TENANT_CACHE_TTL = float(os.getenv("ORG_TENANT_CACHE_TTL", "600"))
+
+# organization_id -> (tenant_id, tenant_db_schema), para todas las
+# organizaciones; None si ni ella ni sus ancestros tienen tenant
+_map = None
+_loaded_at = 0.0
+_lock = asyncio.Lock()
+
+# se incrementa en cada invalidación: una carga que empezó antes no deja
+# en _map lo que leyó (podría ser el mapa previo al cambio)
+_generation = 0
+
+_stats = {
+    "hits": 0,
+    "misses": 0,
+    "loads": 0,
+    "invalidations": 0,
+}
+
+
+ORG_TENANT_MAP_QUERY = """
+WITH RECURSIVE org_tree AS (
+    SELECT organization_id AS root_id,
+           organization_id,
+           organization_parent_id,
+           organization_tenant_id,
+           0 AS depth
+    FROM core.organization
+    UNION ALL
+    SELECT t.root_id,
+           o.organization_id,
+           o.organization_parent_id,
+           o.organization_tenant_id,
+           t.depth + 1
+    FROM core.organization o
+    JOIN org_tree t ON o.organization_id = t.organization_parent_id
+)
+SELECT DISTINCT ON (ot.root_id)
+       ot.root_id,
+       te.tenant_id,
+       te.tenant_db_schema
+FROM org_tree ot
+LEFT JOIN core.tenant te ON te.tenant_id = ot.organization_tenant_id
+ORDER BY ot.root_id, te.tenant_id IS NULL, ot.depth
+"""
+
+
+def invalidate_org_tenant_map(payload=None):
+    global _map, _generation
+
+    _generation += 1
+    _stats["invalidations"] += 1
+    _map = None
+
+
+register_listener(ORG_TENANT_CHANNEL, invalidate_org_tenant_map)
+
+
+def _is_fresh():
+    return _map is not None and time.monotonic() - _loaded_at < ORG_TENANT_CACHE_TTL
+
+
+async def _load(cur) -> dict:
+    global _map, _loaded_at
+
+    generation = _generation
+
+    await cur.execute(ORG_TENANT_MAP_QUERY)
+    rows = await cur.fetchall()
+
+    org_map = {
+        organization_id: (tenant_id, tenant_schema) if tenant_id is not None else None
+        for organization_id, tenant_id, tenant_schema in rows
+    }
+    _stats["loads"] += 1
+
+    # llegó un NOTIFY mientras se leía: se usa para este login pero no se
+    # guarda, el siguiente vuelve a cargar
+    if _generation == generation:
+        _map = org_map
+        _loaded_at = time.monotonic()
+
+    return org_map
+
+
+async def resolve_tenant(cur, organization_id):
+    """
+    Retorna (tenant_id, tenant_db_schema) de la organización, subiendo por
+    organization_parent_id hasta encontrar un tenant. None si no tiene.
+
+    Usa el cursor del llamador para no pedir otra conexión al pool.
+    """
+    if _is_fresh() and organization_id in _map:
+        _stats["hits"] += 1
+        return _map[organization_id]
+
+    _stats["misses"] += 1
+
+    async with _lock:
+        # otro login pudo cargarlo mientras esperábamos el lock; el mapa
+        # trae todas las organizaciones (las sin tenant con None), así que
+        # solo un id que no existía al cargar fuerza recarga
+        if _is_fresh() and organization_id in _map:
+            return _map[organization_id]
+
+        org_map = await _load(cur)
+
+    return org_map.get(organization_id)
+
+
+def get_org_tenant_cache_stats():
+    return {
+        "size": len(_map) if _map is not None else 0,
+        "ttl": ORG_TENANT_CACHE_TTL,
+        **_stats,
+    }
@@ -1,4 +1,26 @@
-from core.db import get_connection
+from contextlib import asynccontextmanager
+
+from core.db import (
+    get_connection,
+    open_pool,
+    close_pool,
+    open_async_pool,
+    close_async_pool,
+    get_pool_stats,
+    get_async_pool_stats,
+)
+from core.notifications import start_listener, stop_listener, get_listener_stats
+from core.session_cache import get_session_cache_stats
+from core.tenant_cache import get_org_tenant_cache_stats
+from core.hashing import get_hashing_stats
+from core.jobs import get_job_stats, shutdown_jobs
+from services.menu_service import get_menu_cache_stats
+from services.price_catalog_service import get_price_catalog_stats
+from services.customer_express_service import (
+    get_customer_settings_cache_stats,
+    get_customer_express_token_cache_stats,
+)
+from services.rut_service import validar_rut  # antes definido acá; se sigue exportando desde main
 
 from routes import auth
 from routes import customers_express
@@ -6,6 +28,7 @@ from routes import users
 from routes import analytics
 from routes import menu
 from routes import ventas_lyl
+from routes import ruts
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
@@ -24,7 +47,19 @@ import os
 
 
 
-app = FastAPI(title="KIVOR Backend")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    open_pool()
+    await open_async_pool()
+    await start_listener()
+    yield
+    shutdown_jobs()
+    await stop_listener()
+    await close_async_pool()
+    close_pool()
+
+
+app = FastAPI(title="KIVOR Backend", lifespan=lifespan)
 
 @app.exception_handler(AppException)
 async def app_exception_handler(request, exc: AppException):
@@ -50,50 +85,13 @@ app.include_router(customers_express.router)
 app.include_router(users.router)
 app.include_router(analytics.router)
 app.include_router(menu.router)
+app.include_router(ruts.router)
 
 @app.options("/{full_path:path}")
 def options_handler(full_path: str):
     return Response(status_code=200)
 
 
-# =========================
-# Valida RUT
-# =========================
-def validar_rut(rut: str) -> bool:
-    try:
-        rut = rut.replace(".", "").replace("-", "").upper().strip()
-
-        cuerpo = rut[:-1]
-        dv = rut[-1]
-
-        if not cuerpo.isdigit():
-            return False
-
-        suma = 0
-        multiplo = 2
-
-        for c in reversed(cuerpo):
-            suma += int(c) * multiplo
-            multiplo += 1
-            if multiplo == 8:
-                multiplo = 2
-
-        resto = suma % 11
-        dv_calculado = 11 - resto
-
-        if dv_calculado == 11:
-            dv_calculado = "0"
-        elif dv_calculado == 10:
-            dv_calculado = "K"
-        else:
-            dv_calculado = str(dv_calculado)
-
-        return dv == dv_calculado
-
-    except:
-        return False
-
-
 # =========================
 # CONFIG
 # =========================
@@ -119,6 +117,22 @@ def root():
 def health():
     return {"healthy": True}
 
+@app.get("/metrics")
+def metrics():
+    return {
+        "db_pool": get_pool_stats(),
+        "db_async_pool": get_async_pool_stats(),
+        "listener": get_listener_stats(),
+        "session_cache": get_session_cache_stats(),
+        "org_tenant_cache": get_org_tenant_cache_stats(),
+        "hashing": get_hashing_stats(),
+        "jobs": get_job_stats(),
+        "menu_cache": get_menu_cache_stats(),
+        "price_catalog": get_price_catalog_stats(),
+        "customer_settings_cache": get_customer_settings_cache_stats(),
+        "customer_express_token_cache": get_customer_express_token_cache_stats()
+    }
+
 @app.get("/test-db")
 def test_db():
     try:
@@ -1,5 +1,8 @@
-from fastapi import APIRouter, HTTPException, Depends
+import re
+
+from fastapi import APIRouter, HTTPException, Depends, Request
 from core.security import verify_token
+from core.streaming import get_stream_format, stream_query
 
 from services.analytics_service import (
     get_familias_service,
@@ -8,55 +11,71 @@ from services.analytics_service import (
     get_nivel4_service,
     get_precios_service,
     get_precios_service_GS,
-    get_ganancias_por_mes_service
+    get_precios_query,
+    get_precios_GS_query,
+    get_precio_por_servicekey_service,
+    get_arbol_precios_service,
+    get_ganancias_por_mes_service,
+    get_ventas_lyl_resumen_query,
+    get_ventas_lyl_resumen_service,
+    GANANCIAS_SOURCES
 )
 
 router = APIRouter()
 
 
 @router.get("/ganancias-por-mes")
-def ganancias_por_mes(mes: str, current_user: dict = Depends(verify_token)):
+async def ganancias_por_mes(
+    mes: str,
+    source: str = "rollup",
+    current_user: dict = Depends(verify_token)
+):
 
     if not mes.isdigit() or len(mes) != 2 or int(mes) < 1 or int(mes) > 12:
         raise HTTPException(status_code=400, detail="Mes inválido. Usa formato 01-12.")
 
-    return get_ganancias_por_mes_service(
+    if source not in GANANCIAS_SOURCES:
+        raise HTTPException(status_code=400, detail="source inválido. Usa rollup, live o verify.")
+
+    return await get_ganancias_por_mes_service(
         mes,
-        current_user["tenant_schema"]
+        current_user["tenant_schema"],
+        source
     )
 
 
 @router.get("/familias")
-def obtener_familias(current_user: dict = Depends(verify_token)):
+async def obtener_familias(current_user: dict = Depends(verify_token)):
 
-    return get_familias_service()
+    return await get_familias_service()
 
 
 @router.get("/niveles2")
-def obtener_nivel2(family: str, current_user: dict = Depends(verify_token)):
+async def obtener_nivel2(family: str, current_user: dict = Depends(verify_token)):
 
-    return get_nivel2_service(family)
+    return await get_nivel2_service(family)
 
 
 @router.get("/niveles3")
-def obtener_nivel3(family: str, level2: str, current_user: dict = Depends(verify_token)):
+async def obtener_nivel3(family: str, level2: str, current_user: dict = Depends(verify_token)):
 
-    return get_nivel3_service(family, level2)
+    return await get_nivel3_service(family, level2)
 
 
 @router.get("/niveles4")
-def obtener_nivel4(
+async def obtener_nivel4(
     family: str,
     level2: str,
     level3: str,
     current_user: dict = Depends(verify_token)
 ):
 
-    return get_nivel4_service(family, level2, level3)
+    return await get_nivel4_service(family, level2, level3)
 
 
 @router.get("/precios")
-def obtener_precios(
+async def obtener_precios(
+    request: Request,
     family: str,
     level2: str = None,
     level3: str = None,
@@ -64,9 +83,60 @@ def obtener_precios(
     current_user: dict = Depends(verify_token)
 ):
 
-    return get_precios_service(family, level2, level3, level4)
+    stream_format = get_stream_format(request)
+
+    if stream_format:
+        query, params = get_precios_query(family, level2, level3, level4)
+        return stream_query(query, params, stream_format, filename="precios")
+
+    return await get_precios_service(family, level2, level3, level4)
 
 @router.get("/preciosGS")
-def obtener_precios(family: str = None):
-    return get_precios_service_GS(family)
+async def obtener_precios(request: Request, family: str = None):
+
+    stream_format = get_stream_format(request)
+
+    if stream_format:
+        query, params = get_precios_GS_query(family)
+        return stream_query(query, params, stream_format, filename="precios")
+
+    return await get_precios_service_GS(family)
+
+
+@router.get("/precios-arbol")
+async def obtener_arbol_precios(current_user: dict = Depends(verify_token)):
+
+    return await get_arbol_precios_service()
+
+
+@router.get("/precios/{servicekey}")
+async def obtener_precio(servicekey: str, current_user: dict = Depends(verify_token)):
+
+    precio = await get_precio_por_servicekey_service(servicekey)
+
+    if not precio:
+        raise HTTPException(status_code=404, detail="Servicio no encontrado")
+
+    return precio
+
+
+@router.get("/ventas-lyl/resumen")
+async def obtener_resumen_ventas_lyl(
+    request: Request,
+    desde: str = None,
+    hasta: str = None,
+    familia: str = None,
+    current_user: dict = Depends(verify_token)
+):
+
+    for periodo in (desde, hasta):
+        if periodo and not re.match(r"^\d{4}-(0[1-9]|1[0-2])$", periodo):
+            raise HTTPException(status_code=400, detail="Período inválido. Usa formato AAAA-MM.")
+
+    stream_format = get_stream_format(request)
+
+    if stream_format:
+        query, params = get_ventas_lyl_resumen_query(desde, hasta, familia)
+        return stream_query(query, params, stream_format, filename="ventas_lyl_resumen")
 
+    return await get_ventas_lyl_resumen_service(desde, hasta, familia)
@@ -10,13 +10,14 @@ from datetime import datetime, timedelta
 from uuid import uuid4
 import hashlib
 
-from core.db import get_connection
+from core.db import get_async_connection
 from core.security import create_access_token, get_token_expiration_minutes,  verify_token
+from core.session_cache import revoke_session, invalidate_session
 
 router = APIRouter()
 
 @router.post("/login")
-def login(request: Request, data: LoginRequest):
+async def login(request: Request, data: LoginRequest):
 
     username = data.username
     password = data.password
@@ -25,7 +26,7 @@ def login(request: Request, data: LoginRequest):
         raise HTTPException(status_code=400, detail="Usuario y clave requeridos")
 
 
-    return login_user(
+    return await login_user(
         username,
         password,
         request.client.host,
@@ -34,21 +35,21 @@ def login(request: Request, data: LoginRequest):
 
 
 @router.post("/login-username")
-def login_username(data: LoginUsernameRequest):
+async def login_username(data: LoginUsernameRequest):
 
     username = data.username.strip().lower()
 
-    with get_connection() as conn:
-        with conn.cursor() as cur:
+    async with get_async_connection() as conn:
+        async with conn.cursor() as cur:
 
-            cur.execute("""
+            await cur.execute("""
                 SELECT user_id
                 FROM core."user"
                 WHERE user_name = %s
                 AND user_active = TRUE
             """, (username,))
 
-            user = cur.fetchone()
+            user = await cur.fetchone()
 
     if not user:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
@@ -57,42 +58,41 @@ def login_username(data: LoginUsernameRequest):
 
 
 @router.post("/logout")
-def logout(current_user: dict):
+async def logout(current_user: dict):
 
     session_id = current_user.get("session_id")
 
     if not session_id:
         raise HTTPException(status_code=400, detail="Sesión no encontrada")
 
-    with get_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
-                UPDATE core.user_session
-                SET revoked = TRUE
-                WHERE session_id = %s
-            """, (session_id,))
+    async with get_async_connection() as conn:
+        async with conn.cursor() as cur:
+            await revoke_session(cur, session_id)
+
+    # ya con commit: la próxima validación en este proceso vuelve a la BD
+    invalidate_session(session_id)
 
     return {"status": "ok", "message": "Sesión cerrada"}
 
 
 @router.post("/logout-session")
-def logout_session(
+async def logout_session(
     data: LogoutSessionRequest,
     current_user: dict = Depends(verify_token)
 ):
 
     session_id = data.session_id
 
-    with get_connection() as conn:
-        with conn.cursor() as cur:
+    async with get_async_connection() as conn:
+        async with conn.cursor() as cur:
 
-            cur.execute("""
+            await cur.execute("""
                 SELECT user_name
                 FROM core.user_session
                 WHERE session_id = %s
             """, (session_id,))
 
-            row = cur.fetchone()
+            row = await cur.fetchone()
 
             if not row:
                 raise HTTPException(status_code=404, detail="Sesión no encontrada")
@@ -102,10 +102,8 @@ def logout_session(
             if session_user != current_user["username"]:
                 raise HTTPException(status_code=403, detail="No autorizado")
 
-            cur.execute("""
-                UPDATE core.user_session
-                SET revoked = TRUE
-                WHERE session_id = %s
-            """, (session_id,))
+            await revoke_session(cur, session_id)
+
+    invalidate_session(session_id)
 
     return {"status": "ok", "message": "Sesión cerrada"}
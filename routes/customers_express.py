@@ -1,30 +1,77 @@
-from fastapi import APIRouter, HTTPException, Depends, Body
+from fastapi import APIRouter, HTTPException, Depends, Body, Request
 from services.customer_express_service import search_customer_express_by_mobile_service
 
 from core.security import verify_token
+from core.streaming import get_stream_format, stream_rows
+from schemas.customer_express_schema import (
+    GenerateCustomerExpressBatchRequest,
+    GenerateCustomerExpressBatchResponse
+)
 
 from services.customer_express_service import (
     generate_customer_express_service,
     get_customer_express_service,
-    save_customer_express_service
+    save_customer_express_service,
+    refresh_customer_settings_service,
+    generate_customer_express_batch_service,
+    customer_express_links,
+    CUSTOMER_EXPRESS_LINK_COLUMNS
 )
 
 router = APIRouter(prefix="/customers-express")
 
 @router.post("/generate")
-def generate_customer_express(current_user: dict = Depends(verify_token)):
+async def generate_customer_express(current_user: dict = Depends(verify_token)):
+
+    try:
+        return await generate_customer_express_service(current_user)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/generate-batch", response_model=GenerateCustomerExpressBatchResponse)
+async def generate_customer_express_batch(
+    request: Request,
+    payload: GenerateCustomerExpressBatchRequest,
+    current_user: dict = Depends(verify_token)
+):
+
+    try:
+        rows = await generate_customer_express_batch_service(
+            current_user,
+            count=payload.count,
+            mobiles=payload.mobiles
+        )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # con Accept: text/csv (o ndjson) se entregan los links para la campaña
+    stream_format = get_stream_format(request)
+
+    if stream_format:
+        return stream_rows(CUSTOMER_EXPRESS_LINK_COLUMNS, rows, stream_format, filename="links")
+
+    return {
+        "status": "ok",
+        "count": len(rows),
+        "items": customer_express_links(rows)
+    }
+
+
+@router.post("/settings/refresh")
+async def refresh_customer_settings(current_user: dict = Depends(verify_token)):
 
     try:
-        return generate_customer_express_service(current_user)
+        return await refresh_customer_settings_service(current_user)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/{token}")
-def get_customer_express(token: str):
+async def get_customer_express(token: str):
 
     try:
-        return get_customer_express_service(token)
+        return await get_customer_express_service(token)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -32,17 +79,17 @@ def get_customer_express(token: str):
 async def save_customer_express(token: str, payload: dict = Body(...)):
 
     try:
-        return save_customer_express_service(token, payload)
+        return await save_customer_express_service(token, payload)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/by-mobile/{mobile}")
-def search_customers_express(
+async def search_customers_express(
     mobile: str,
     current_user: dict = Depends(verify_token)
 ):
 
     try:
-        return search_customer_express_by_mobile_service(mobile, current_user)
+        return await search_customer_express_by_mobile_service(mobile, current_user)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
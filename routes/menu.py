@@ -1,73 +1,85 @@
-from fastapi import APIRouter, HTTPException, Depends
-from core.db import get_connection
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import JSONResponse, Response
+from core.db import get_async_connection
 from core.security import verify_token
+from core.streaming import get_stream_format, stream_query
+from services.menu_service import get_cached_menu, get_menu_entry
 
 router = APIRouter()
 
 
-@router.get("/menu")
-def get_menu(current_user: dict = Depends(verify_token)):
+def _menu_response(request: Request, entry: dict, kind: str):
+    etag = entry[f"etag_{kind}"]
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    return JSONResponse(content=entry[kind], headers=headers)
+
+
+async def _menu(request: Request, current_user: dict, kind: str):
 
     group_id = current_user.get("group_id")
 
     if not group_id:
         raise HTTPException(status_code=400, detail="Usuario sin grupo")
 
-    query = """
-    WITH RECURSIVE recursive_menu AS (
+    # menú sin cambios: 304 directo desde memoria, sin ir a la BD
+    entry = get_cached_menu(group_id)
 
-        SELECT m.*
-        FROM core.menu m
-        JOIN core.role_menu rm ON m.menu_id = rm.menu_id
-        JOIN core.group_role gr ON rm.role_id = gr.role_id
-        WHERE gr.group_id = %s
-          AND m.menu_active = TRUE
-
-        UNION
-
-        SELECT parent.*
-        FROM core.menu parent
-        JOIN recursive_menu child
-          ON child.menu_parent_id = parent.menu_id
-    )
-    SELECT DISTINCT *
-    FROM recursive_menu
-    ORDER BY menu_order;
-    """
+    if entry is not None:
+        return _menu_response(request, entry, kind)
 
     try:
-        with get_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute(query, (group_id,))
-                columns = [desc[0] for desc in cur.description]
-                rows = cur.fetchall()
-
-        return [dict(zip(columns, row)) for row in rows]
+        entry = await get_menu_entry(group_id)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    return _menu_response(request, entry, kind)
+
+
+@router.get("/menu")
+async def get_menu(request: Request, current_user: dict = Depends(verify_token)):
+
+    return await _menu(request, current_user, "items")
+
+
+@router.get("/menu/tree")
+async def get_menu_tree(request: Request, current_user: dict = Depends(verify_token)):
+
+    return await _menu(request, current_user, "tree")
+
+
+SESSIONS_QUERY = """
+    SELECT session_id,
+           created_at,
+           expires_at,
+           revoked
+    FROM core.user_session
+    WHERE user_name = %s
+    AND revoked = FALSE
+    AND expires_at > NOW()
+    ORDER BY created_at DESC
+"""
+
 
 @router.get("/sessions")
-def get_sessions(current_user: dict = Depends(verify_token)):
+async def get_sessions(request: Request, current_user: dict = Depends(verify_token)):
 
     username = current_user.get("username")
 
-    with get_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT session_id,
-                       created_at,
-                       expires_at,
-                       revoked
-                FROM core.user_session
-                WHERE user_name = %s
-                AND revoked = FALSE
-                AND expires_at > NOW()
-                ORDER BY created_at DESC
-            """, (username,))
+    stream_format = get_stream_format(request)
+
+    if stream_format:
+        return stream_query(SESSIONS_QUERY, (username,), stream_format, filename="sesiones")
+
+    async with get_async_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(SESSIONS_QUERY, (username,))
 
             columns = [desc[0] for desc in cur.description]
-            rows = cur.fetchall()
+            rows = await cur.fetchall()
 
     return [dict(zip(columns, row)) for row in rows]
@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Depends
+
+from core.security import verify_token
+from schemas.rut_schema import ValidarRutsRequest, ValidarRutsResponse
+from services.rut_service import validate_ruts_service
+
+router = APIRouter(prefix="/ruts", tags=["RUT"])
+
+
+@router.post("/validar", response_model=ValidarRutsResponse)
+def validar_ruts(
+    payload: ValidarRutsRequest,
+    current_user: dict = Depends(verify_token)
+):
+    # sync a propósito: el cálculo es CPU y FastAPI lo corre en el threadpool.
+    # Cada valor se clasifica como rut, celular o invalido (ver rut_service)
+    return validate_ruts_service(payload.values)
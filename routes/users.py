@@ -1,5 +1,4 @@
 from fastapi import APIRouter, Body
-from core.db import get_connection
 from schemas.user_schema import CreateUserRequest, CreateUserResponse
 from services.user_service import create_user_service
 
@@ -9,34 +8,5 @@ router = APIRouter()
 @router.post("/users", response_model=CreateUserResponse)
 def create_user(data: CreateUserRequest):
 
-    conn = get_connection()
-    cur = conn.cursor()
-
-    cur.execute("""
-        INSERT INTO core."user" (
-            user_nickname,
-            user_name,
-            user_password_hash,
-            user_firstname,
-            user_lastname,
-            user_group_id
-        )
-        VALUES (%s, %s, %s, %s, %s, %s)
-        RETURNING user_id
-    """, (
-        data.user_nickname,
-        data.user_name,
-        data.user_password,
-        data.user_firstname,
-        data.user_lastname,
-        int(data.user_group_id)
-    ))
-
-    user_id = cur.fetchone()
-
-    conn.commit()
-    cur.close()
-    conn.close()
-
     return create_user_service(data)
 
@@ -1,19 +1,76 @@
+from typing import Optional
+
 from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException
+from core.exceptions import AppException
 from core.security import verify_token
-from services.ventas_lyl_service import upload_ventas_service
-from schemas.ventas_lyl_schema import UploadVentasResponse
+from services.ventas_lyl_service import (
+    get_upload_ventas_job,
+    submit_upload_ventas_job,
+    submit_upload_ventas_periods_job,
+)
+from schemas.ventas_lyl_schema import UploadVentasJobResponse
 
 router = APIRouter(prefix="/ventas-lyl", tags=["Ventas LYL"])
 
 
-@router.post("/upload", response_model=UploadVentasResponse)
+@router.post("/upload", response_model=UploadVentasJobResponse, status_code=202)
 async def upload_ventas(
     anio: int = Form(...),
     mes: int = Form(...),
     file: UploadFile = File(...),
+    modo: str = Form("replace"),
+    formato: Optional[str] = Form(None),
+    force: bool = Form(False),
+    validar_rut: bool = Form(False),
+    rechazar_rut_invalido: bool = Form(False),
     current_user: dict = Depends(verify_token)
 ):
+    # el archivo queda en disco y se procesa en segundo plano; el estado se
+    # consulta en /ventas-lyl/jobs/{job_id}. modo "diff" aplica solo los
+    # cambios por ventas_key en vez de reemplazar el período. formato
+    # (xlsx, csv, parquet) se detecta del contenido si no viene. Si la última
+    # carga del período fue el mismo archivo no se repite, salvo force.
+    # validar_rut cuenta los RUT / CELULAR por tipo (rut, celular, invalido);
+    # con rechazar_rut_invalido los inválidos son errores y no se carga nada
     try:
-        return await upload_ventas_service(anio, mes, file, current_user)
+        return await submit_upload_ventas_job(
+            anio, mes, file, current_user, modo, formato, force, validar_rut,
+            rechazar_rut_invalido
+        )
+    except AppException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/upload-periodos", response_model=UploadVentasJobResponse, status_code=202)
+async def upload_ventas_periodos(
+    file: UploadFile = File(...),
+    desde: Optional[str] = Form(None),
+    hasta: Optional[str] = Form(None),
+    modo: str = Form("replace"),
+    formato: Optional[str] = Form(None),
+    force: bool = Form(False),
+    validar_rut: bool = Form(False),
+    rechazar_rut_invalido: bool = Form(False),
+    current_user: dict = Depends(verify_token)
+):
+    # una sola lectura del Excel para todos sus períodos (o los de
+    # desde..hasta, formato AAAA-MM); cada período se reemplaza por separado
+    try:
+        return await submit_upload_ventas_periods_job(
+            file, current_user, desde, hasta, modo, formato, force, validar_rut,
+            rechazar_rut_invalido
+        )
+    except AppException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/jobs/{job_id}", response_model=UploadVentasJobResponse)
+async def get_upload_job(
+    job_id: str,
+    current_user: dict = Depends(verify_token)
+):
+    return get_upload_ventas_job(job_id, current_user)
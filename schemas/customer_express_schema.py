@@ -0,0 +1,25 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from services.customer_express_service import CUSTOMER_EXPRESS_BATCH_LIMIT
+
+
+class GenerateCustomerExpressBatchRequest(BaseModel):
+    # uno de los dos: cantidad de links sin celular, o un link por celular
+    count: Optional[int] = Field(None, ge=1, le=CUSTOMER_EXPRESS_BATCH_LIMIT)
+    mobiles: Optional[List[str]] = Field(None, min_length=1, max_length=CUSTOMER_EXPRESS_BATCH_LIMIT)
+
+
+class CustomerExpressLink(BaseModel):
+    customers_express_id: int
+    token: str
+    mobile: Optional[str] = None
+    expires_at: datetime
+
+
+class GenerateCustomerExpressBatchResponse(BaseModel):
+    status: str
+    count: int
+    items: List[CustomerExpressLink]
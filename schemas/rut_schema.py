@@ -0,0 +1,19 @@
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+
+class ValidarRutsRequest(BaseModel):
+    values: List[Optional[str]]
+
+
+class RutItem(BaseModel):
+    valor: Optional[str] = None
+    tipo: str
+    normalizado: Optional[str] = None
+
+
+class ValidarRutsResponse(BaseModel):
+    total: int
+    counts: Dict[str, int]
+    items: List[RutItem]
@@ -1,11 +1,66 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Union
+
 from pydantic import BaseModel
 
 
+class VentasRowError(BaseModel):
+    fila: int
+    columna: str
+    valor: Optional[str] = None
+    error: str
+
+
 class UploadVentasResponse(BaseModel):
     success: bool
     anio: int
     mes: int
     anio_mes: str
+    modo: str = "replace"
     rows_deleted: int
     rows_inserted: int
+    rows_updated: int = 0
+    rows_unchanged: int = 0
+    rows_fact: Optional[int] = None
+    fact_error: Optional[str] = None
+    deduplicated: bool = False
+    error_count: int = 0
+    errors: List[VentasRowError] = []
+    rut_celular: Optional[Dict[str, int]] = None
+    message: str
+
+
+class UploadVentasPeriodsResponse(BaseModel):
+    success: bool
+    desde: Optional[str] = None
+    hasta: Optional[str] = None
+    modo: str = "replace"
+    periods: List[UploadVentasResponse]
+    rows_inserted: int
+    error_count: int = 0
+    errors: List[VentasRowError] = []
+    rut_celular: Optional[Dict[str, int]] = None
     message: str
+
+
+class UploadVentasJobResponse(BaseModel):
+    job_id: str
+    status: str
+    phase: str
+    anio: Optional[int] = None
+    mes: Optional[int] = None
+    anio_mes: Optional[str] = None
+    desde: Optional[str] = None
+    hasta: Optional[str] = None
+    filename: Optional[str] = None
+    modo: str = "replace"
+    formato: Optional[str] = None
+    force: bool = False
+    validar_rut: bool = False
+    rechazar_rut_invalido: bool = False
+    progress: Dict[str, int] = {}
+    result: Optional[Union[UploadVentasResponse, UploadVentasPeriodsResponse]] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
@@ -1,60 +1,124 @@
-from core.db import get_connection
-
-def get_ganancias_por_mes_service(mes: str, tenant_schema: str):
-
-    from core.db import get_connection, set_tenant_schema
-
-    query = """
-    SELECT 
-        TO_CHAR(v.date,'YYYYMM') AS fecha,
-        FLOOR(SUM(CASE WHEN v.family='CABELLO' THEN (v.listprice-v.amounttopayprofessional-v.salondiscount) ELSE 0 END)/(1+(19.0/100))) AS cabello,
-        FLOOR(SUM(CASE WHEN v.family='MANOS_Y_PIES' THEN (v.listprice-v.amounttopayprofessional-v.salondiscount) ELSE 0 END)/(1+(19.0/100))) AS manos_y_pies,
-        FLOOR(SUM(CASE WHEN v.family='DEPILACION' THEN (v.listprice-v.amounttopayprofessional-v.salondiscount) ELSE 0 END)/(1+(19.0/100))) AS depilacion,
-        FLOOR(SUM(CASE WHEN v.family='CEJAS_Y_PESTAÑAS' THEN (v.listprice-v.amounttopayprofessional-v.salondiscount) ELSE 0 END)/(1+(19.0/100))) AS cejas_y_pestanas,
-        FLOOR(SUM(CASE WHEN v.family='FACIALES' THEN (v.listprice-v.amounttopayprofessional-v.salondiscount) ELSE 0 END)/(1+(19.0/100))) AS faciales,
-        FLOOR(SUM(CASE WHEN v.family='CORPORAL' THEN (v.listprice-v.amounttopayprofessional-v.salondiscount) ELSE 0 END)/(1+(19.0/100))) AS corporal
-    FROM sales v
-    WHERE TO_CHAR(v.date,'MM') = %s
-    AND v.family IN ('CABELLO','MANOS_Y_PIES','DEPILACION','CEJAS_Y_PESTAÑAS','FACIALES','CORPORAL')
-    GROUP BY TO_CHAR(v.date,'YYYYMM')
-    ORDER BY fecha;
+import logging
+
+import psycopg
+
+from core.db import get_async_connection
+from services.price_catalog_service import get_price_catalog
+
+
+GANANCIAS_LIVE_QUERY = """
+SELECT 
+    TO_CHAR(v.date,'YYYYMM') AS fecha,
+    FLOOR(SUM(CASE WHEN v.family='CABELLO' THEN (v.listprice-v.amounttopayprofessional-v.salondiscount) ELSE 0 END)/(1+(19.0/100))) AS cabello,
+    FLOOR(SUM(CASE WHEN v.family='MANOS_Y_PIES' THEN (v.listprice-v.amounttopayprofessional-v.salondiscount) ELSE 0 END)/(1+(19.0/100))) AS manos_y_pies,
+    FLOOR(SUM(CASE WHEN v.family='DEPILACION' THEN (v.listprice-v.amounttopayprofessional-v.salondiscount) ELSE 0 END)/(1+(19.0/100))) AS depilacion,
+    FLOOR(SUM(CASE WHEN v.family='CEJAS_Y_PESTAÑAS' THEN (v.listprice-v.amounttopayprofessional-v.salondiscount) ELSE 0 END)/(1+(19.0/100))) AS cejas_y_pestanas,
+    FLOOR(SUM(CASE WHEN v.family='FACIALES' THEN (v.listprice-v.amounttopayprofessional-v.salondiscount) ELSE 0 END)/(1+(19.0/100))) AS faciales,
+    FLOOR(SUM(CASE WHEN v.family='CORPORAL' THEN (v.listprice-v.amounttopayprofessional-v.salondiscount) ELSE 0 END)/(1+(19.0/100))) AS corporal
+FROM sales v
+WHERE TO_CHAR(v.date,'MM') = %s
+AND v.family IN ('CABELLO','MANOS_Y_PIES','DEPILACION','CEJAS_Y_PESTAÑAS','FACIALES','CORPORAL')
+GROUP BY TO_CHAR(v.date,'YYYYMM')
+ORDER BY fecha;
+"""
+
+# mismo resultado que GANANCIAS_LIVE_QUERY, leyendo el rollup mensual
+# (sql/004_sales_profit_monthly.sql) en vez de recorrer toda la tabla sales
+GANANCIAS_ROLLUP_QUERY = """
+SELECT
+    (r.year * 100 + r.month)::text AS fecha,
+    SUM(CASE WHEN r.family='CABELLO' THEN r.net_profit ELSE 0 END) AS cabello,
+    SUM(CASE WHEN r.family='MANOS_Y_PIES' THEN r.net_profit ELSE 0 END) AS manos_y_pies,
+    SUM(CASE WHEN r.family='DEPILACION' THEN r.net_profit ELSE 0 END) AS depilacion,
+    SUM(CASE WHEN r.family='CEJAS_Y_PESTAÑAS' THEN r.net_profit ELSE 0 END) AS cejas_y_pestanas,
+    SUM(CASE WHEN r.family='FACIALES' THEN r.net_profit ELSE 0 END) AS faciales,
+    SUM(CASE WHEN r.family='CORPORAL' THEN r.net_profit ELSE 0 END) AS corporal
+FROM sales_profit_monthly r
+WHERE r.month = %s
+AND r.family IN ('CABELLO','MANOS_Y_PIES','DEPILACION','CEJAS_Y_PESTAÑAS','FACIALES','CORPORAL')
+GROUP BY r.year, r.month
+ORDER BY fecha;
+"""
+
+GANANCIAS_SOURCES = ("rollup", "live", "verify")
+
+
+async def _fetch_ganancias(conn, query: str, params: tuple):
+    async with conn.cursor() as cur:
+        await cur.execute(query, params)
+        columns = [desc[0] for desc in cur.description]
+        rows = await cur.fetchall()
+
+    return [dict(zip(columns, row)) for row in rows]
+
+
+async def get_ganancias_por_mes_service(mes: str, tenant_schema: str, source: str = "rollup"):
+    """
+    source:
+      - rollup: lee sales_profit_monthly (por defecto)
+      - live:   consulta original sobre sales
+      - verify: ejecuta ambas, registra diferencias y responde con la en vivo
+    Si el tenant no tiene el rollup instalado se usa la consulta en vivo.
     """
 
-    with get_connection() as conn:
-        set_tenant_schema(conn, tenant_schema)
-        with conn.cursor() as cur:
-            cur.execute(query, (mes,))
-            columns = [desc[0] for desc in cur.description]
-            rows = cur.fetchall()
+    from core.db import get_async_connection, set_tenant_schema_async
+
+    if source not in GANANCIAS_SOURCES:
+        raise ValueError(f"source inválido: {source}")
+
+    async with get_async_connection() as conn:
+        await set_tenant_schema_async(conn, tenant_schema)
 
-    result = [dict(zip(columns, row)) for row in rows]
+        result = None
+
+        if source != "live":
+            try:
+                result = await _fetch_ganancias(conn, GANANCIAS_ROLLUP_QUERY, (int(mes),))
+            except psycopg.errors.UndefinedTable:
+                await conn.rollback()
+                await set_tenant_schema_async(conn, tenant_schema)
+                logging.warning("Tenant %s sin sales_profit_monthly, usando consulta en vivo", tenant_schema)
+                source = "live"
+
+        if source != "rollup":
+            live = await _fetch_ganancias(conn, GANANCIAS_LIVE_QUERY, (mes,))
+
+            if result is not None and result != live:
+                logging.warning(
+                    "sales_profit_monthly no coincide con sales en %s mes %s: rollup=%s live=%s",
+                    tenant_schema, mes, result, live
+                )
+
+            result = live
 
     return {
         "mes": mes,
         "data": result
     }
 
-def get_precios_service(
+PRECIOS_QUERY = """
+SELECT family,
+       level2,
+       level3,
+       level4,
+       servicekey,
+       listprice,
+       professionalprice,
+       salonpercentage,
+       professionalpercentage
+FROM core.prices
+"""
+
+
+def get_precios_query(
     family: str,
     level2: str = None,
     level3: str = None,
     level4: str = None
 ):
+    # consulta equivalente a get_precios_service, para exportar en streaming
 
-    query = """
-    SELECT family,
-           level2,
-           level3,
-           level4,
-           servicekey,
-           listprice,
-           professionalprice,
-           salonpercentage,
-           professionalpercentage
-    FROM core.prices
-    WHERE family = %s
-    """
-
+    query = PRECIOS_QUERY + " WHERE family = %s"
     params = [family]
 
     if level2:
@@ -71,114 +135,129 @@ def get_precios_service(
 
     query += " ORDER BY servicekey"
 
-    with get_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(query, tuple(params))
-            columns = [desc[0] for desc in cur.description]
-            rows = cur.fetchall()
+    return query, params
 
-    return [dict(zip(columns, row)) for row in rows]
 
+def get_precios_GS_query(family=None):
 
-def get_nivel4_service(family: str, level2: str, level3: str):
+    query = PRECIOS_QUERY
+    params = []
+
+    if family:
+        query += " WHERE family = %s"
+        params.append(family)
+
+    query += " ORDER BY servicekey"
+
+    return query, params
+
+
+async def get_precios_service(
+    family: str,
+    level2: str = None,
+    level3: str = None,
+    level4: str = None
+):
+
+    catalog = await get_price_catalog()
+
+    return catalog.prices(family, level2, level3, level4)
 
-    query = """
-    SELECT DISTINCT level4
-    FROM core.prices
-    WHERE family = %s
-    AND level2 = %s
-    AND level3 = %s
-    AND level4 IS NOT NULL
-    ORDER BY level4;
-    """
 
-    with get_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(query, (family, level2, level3))
-            rows = cur.fetchall()
+async def get_nivel4_service(family: str, level2: str, level3: str):
 
-    return [r[0] for r in rows]
+    catalog = await get_price_catalog()
+
+    return catalog.children(family, level2, level3)
     
-def get_nivel3_service(family: str, level2: str):
-
-    query = """
-    SELECT DISTINCT level3
-    FROM core.prices
-    WHERE family = %s
-    AND level2 = %s
-    AND level3 IS NOT NULL
-    ORDER BY level3;
-    """
+async def get_nivel3_service(family: str, level2: str):
 
-    with get_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(query, (family, level2))
-            rows = cur.fetchall()
+    catalog = await get_price_catalog()
 
-    return [r[0] for r in rows]
+    return catalog.children(family, level2)
 
 
-def get_familias_service():
+async def get_familias_service():
 
-    query = """
-    SELECT DISTINCT family
-    FROM core.prices
-    WHERE family IS NOT NULL
-    ORDER BY family;
-    """
+    catalog = await get_price_catalog()
 
-    with get_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(query)
-            rows = cur.fetchall()
+    return catalog.children()
 
-    return [r[0] for r in rows]
+async def get_nivel2_service(family: str):
 
-def get_nivel2_service(family: str):
+    catalog = await get_price_catalog()
 
-    query = """
-    SELECT DISTINCT level2
-    FROM core.prices
-    WHERE family = %s
-    AND level2 IS NOT NULL
-    ORDER BY level2;
-    """
+    return catalog.children(family)
 
-    with get_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(query, (family,))
-            rows = cur.fetchall()
 
-    return [r[0] for r in rows]
+async def get_precios_service_GS(family=None):
 
+    catalog = await get_price_catalog()
 
-def get_precios_service_GS(family=None):
+    return catalog.all_prices(family)
 
-    query = """
-    SELECT family,
-           level2,
-           level3,
-           level4,
-           servicekey,
-           listprice,
-           professionalprice,
-           salonpercentage,
-           professionalpercentage
-    FROM core.prices
-    """
 
+async def get_precio_por_servicekey_service(servicekey: str):
+
+    catalog = await get_price_catalog()
+
+    return catalog.by_servicekey.get(servicekey)
+
+
+async def get_arbol_precios_service():
+
+    catalog = await get_price_catalog()
+
+    return catalog.as_tree()
+
+
+# ventas LYL desde la tabla de hechos tipada (sql/008): sin casteos por fila
+VENTAS_LYL_RESUMEN_QUERY = """
+SELECT TO_CHAR(f.periodo, 'YYYY-MM') AS anio_mes,
+       f.familia,
+       COUNT(*) AS ventas,
+       SUM(f.total) AS total,
+       SUM(f.abono) AS abono,
+       SUM(f.descuentos) AS descuentos,
+       SUM(f.ganancia_prof) AS ganancia_prof,
+       SUM(f.ganancia_salon) AS ganancia_salon
+FROM core.fact_ventas_lyl f
+"""
+
+
+def get_ventas_lyl_resumen_query(desde: str = None, hasta: str = None, familia: str = None):
+    filters = []
     params = []
 
-    if family:
-        query += " WHERE family = %s"
-        params.append(family)
+    if desde:
+        filters.append("f.periodo >= TO_DATE(%s, 'YYYY-MM')")
+        params.append(desde)
 
-    query += " ORDER BY servicekey"
+    if hasta:
+        filters.append("f.periodo <= TO_DATE(%s, 'YYYY-MM')")
+        params.append(hasta)
+
+    if familia:
+        filters.append("f.familia = %s")
+        params.append(familia)
+
+    query = VENTAS_LYL_RESUMEN_QUERY
+
+    if filters:
+        query += " WHERE " + " AND ".join(filters)
+
+    query += " GROUP BY f.periodo, f.familia ORDER BY f.periodo, f.familia"
+
+    return query, params
+
+
+async def get_ventas_lyl_resumen_service(desde: str = None, hasta: str = None, familia: str = None):
+    query, params = get_ventas_lyl_resumen_query(desde, hasta, familia)
 
-    with get_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(query, params)  # 🔥 CLAVE
+    async with get_async_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(query, params)
             columns = [desc[0] for desc in cur.description]
-            rows = cur.fetchall()
+            rows = await cur.fetchall()
 
     return [dict(zip(columns, row)) for row in rows]
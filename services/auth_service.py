@@ -1,103 +1,99 @@
 from datetime import datetime, timedelta
 from uuid import uuid4
-import hashlib
+import logging
 
-from core.db import get_connection
+from core.db import get_async_connection
+from core.tenant_cache import resolve_tenant
 from core.security import create_access_token, get_token_expiration_minutes
-from core.exceptions import UnauthorizedError
+from core.exceptions import UnauthorizedError, ServiceUnavailableError
+from core.hashing import hash_password_async, verify_password_async
 
-def login_user(username: str, password: str, client_ip: str, user_agent: str):
 
-    username = username.strip().lower()
+async def rehash_password(cur, user_id: int, password: str):
+    # migra hashes SHA-256 (o bcrypt con menos rondas) al hacer login exitoso
+    try:
+        new_hash = await hash_password_async(password)
+    except ServiceUnavailableError:
+        # con el pool saturado se deja para el próximo login
+        logging.warning("Rehash de password pospuesto para user_id %s", user_id)
+        return
+
+    await cur.execute("""
+        UPDATE core."user"
+        SET user_password_hash = %s
+        WHERE user_id = %s
+    """, (new_hash, user_id))
+
 
-    with get_connection() as conn:
-        with conn.cursor() as cur:
+async def login_user(username: str, password: str, client_ip: str, user_agent: str):
 
-            # USER
-            cur.execute("""
-                SELECT user_id, user_password_hash, user_group_id
-                FROM core."user"
-                WHERE user_name = %s
-                AND user_active = TRUE
+    username = username.strip().lower()
+
+    async with get_async_connection() as conn:
+        async with conn.cursor() as cur:
+
+            # USER + PERSON + ORGANIZATION
+            await cur.execute("""
+                SELECT u.user_id,
+                       u.user_password_hash,
+                       u.user_group_id,
+                       p.person_id,
+                       po.organization_id
+                FROM core."user" u
+                LEFT JOIN LATERAL (
+                    SELECT person_id
+                    FROM core.person
+                    WHERE person_user_id = u.user_id
+                    LIMIT 1
+                ) p ON TRUE
+                LEFT JOIN LATERAL (
+                    SELECT person_organization_organization_id AS organization_id
+                    FROM core.person_organization
+                    WHERE person_organization_person_id = p.person_id
+                    AND person_organization_is_default = true
+                    AND person_organization_active = true
+                    LIMIT 1
+                ) po ON TRUE
+                WHERE u.user_name = %s
+                AND u.user_active = TRUE
             """, (username,))
 
-            user = cur.fetchone()
+            user = await cur.fetchone()
 
             if not user:
                 raise UnauthorizedError("Credenciales inválidas")
 
-            user_id, stored_password, group_id = user
+            user_id, stored_password, group_id, person_id, organization_id = user
 
             # PASSWORD
-            hashed_input = hashlib.sha256(password.encode()).hexdigest()
+            valid, needs_rehash = await verify_password_async(password, stored_password)
 
-            if hashed_input != stored_password:
+            if not valid:
    
                 raise UnauthorizedError("Credenciales inválidas")
 
-            # PERSON
-            cur.execute("""
-                SELECT person_id
-                FROM core.person
-                WHERE person_user_id = %s
-            """, (user_id,))
-
-            person = cur.fetchone()
+            if needs_rehash:
+                await rehash_password(cur, user_id, password)
 
-            if not person:
+            if person_id is None:
                 raise Exception("Usuario sin persona")
 
-            person_id = person[0]
-
-            # ORGANIZATION
-            cur.execute("""
-                SELECT person_organization_organization_id
-                FROM core.person_organization
-                WHERE person_organization_person_id = %s
-                AND person_organization_is_default = true
-                AND person_organization_active = true
-            """, (person_id,))
-
-            org = cur.fetchone()
-
-            if not org:
+            if organization_id is None:
                 raise Exception("Usuario sin organización")
 
-            organization_id = org[0]
-
             # TENANT
-            cur.execute("""
-            WITH RECURSIVE org_tree AS (
-                SELECT organization_id, organization_parent_id, organization_tenant_id
-                FROM core.organization
-                WHERE organization_id = %s
-                UNION ALL
-                SELECT o.organization_id, o.organization_parent_id, o.organization_tenant_id
-                FROM core.organization o
-                JOIN org_tree t ON o.organization_id = t.organization_parent_id
-            )
-            SELECT t.tenant_id, t.tenant_db_schema
-            FROM org_tree ot
-            JOIN core.tenant t ON t.tenant_id = ot.organization_tenant_id
-            WHERE ot.organization_tenant_id IS NOT NULL
-            LIMIT 1
-            """, (organization_id,))
-
-            tenant = cur.fetchone()
+            tenant = await resolve_tenant(cur, organization_id)
 
             if not tenant:
                 raise Exception("No tenant")
 
             tenant_id, tenant_schema = tenant
 
-    # SESSION
-    session_id = str(uuid4())
-    expires_at = datetime.utcnow() + timedelta(minutes=get_token_expiration_minutes())
-
-    with get_connection() as conn:
-        with conn.cursor() as cur:
+            # SESSION (misma transacción)
+            session_id = str(uuid4())
+            expires_at = datetime.utcnow() + timedelta(minutes=get_token_expiration_minutes())
 
-            cur.execute("""
+            await cur.execute("""
                 INSERT INTO core.user_session
                 (session_id, user_name, user_group_id, expires_at, ip_address, user_agent)
                 VALUES (%s,%s,%s,%s,%s,%s)
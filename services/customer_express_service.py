@@ -1,29 +1,256 @@
+import os
 from uuid import uuid4
 from psycopg import sql
 
-from core.db import get_connection
+from core.cache import TTLCache
+from core.db import get_async_connection
+from core.notifications import register_listener, notify
 from datetime import datetime
 
-def search_customer_express_by_mobile_service(mobile: str, current_user: dict):
+
+CUSTOMER_SETTINGS_CHANNEL = "customer_settings_changed"
+
+CUSTOMER_SETTINGS_CACHE_TTL = float(os.getenv("CUSTOMER_SETTINGS_CACHE_TTL", "300"))
+
+# vigencia de un link (customers_express_token_expires_at = NOW() + 24 horas)
+CUSTOMER_EXPRESS_TOKEN_TTL = 24 * 3600
+
+CUSTOMER_EXPRESS_TOKEN_CACHE_MAXSIZE = int(os.getenv("CUSTOMER_EXPRESS_TOKEN_CACHE_MAXSIZE", "10000"))
+
+# cuánto se recuerda que un token no existe o ya no sirve
+CUSTOMER_EXPRESS_INVALID_TOKEN_TTL = float(os.getenv("CUSTOMER_EXPRESS_INVALID_TOKEN_TTL", "60"))
+
+# máximo de links por llamada a /customers-express/generate-batch
+CUSTOMER_EXPRESS_BATCH_LIMIT = int(os.getenv("CUSTOMER_EXPRESS_BATCH_LIMIT", "1000"))
+
+CUSTOMER_EXPRESS_LINK_COLUMNS = ["customers_express_id", "token", "mobile", "expires_at"]
+
+
+# =========================
+# CONFIGURACIÓN DEL FORMULARIO POR TENANT
+# =========================
+
+# tenant_schema -> {"fields": [...], "identifier_types": [...]}
+_settings_cache = TTLCache(maxsize=256, ttl=CUSTOMER_SETTINGS_CACHE_TTL)
+
+# cada invalidación sube la versión del tenant (o la global si es de todos);
+# una carga que empezó antes no guarda en el cache lo que leyó
+_settings_versions = {}
+_settings_epoch = 0
+
+_settings_stats = {
+    "invalidations": 0,
+}
+
+
+def invalidate_customer_settings(tenant_schema=None):
+    """
+    Descarta la configuración cacheada del tenant; sin tenant, la de todos
+    (el listener se reconectó y pudo perder notificaciones).
+    """
+    global _settings_epoch
+
+    _settings_stats["invalidations"] += 1
+
+    if tenant_schema is None:
+        _settings_epoch += 1
+        _settings_cache.clear()
+        return
+
+    _settings_versions[tenant_schema] = _settings_versions.get(tenant_schema, 0) + 1
+    _settings_cache.pop(tenant_schema)
+
+
+register_listener(CUSTOMER_SETTINGS_CHANNEL, invalidate_customer_settings)
+
+
+def _settings_version(tenant_schema: str):
+    return _settings_epoch, _settings_versions.get(tenant_schema, 0)
+
+
+async def _load_customer_settings(conn, tenant_schema: str) -> dict:
+    query_fields = sql.SQL("""
+        SELECT
+            customer_capture_settings_field,
+            customer_capture_settings_label,
+            customer_capture_settings_is_required,
+            customer_capture_settings_display_order
+        FROM {}.customer_capture_settings
+        WHERE customer_capture_settings_is_active = TRUE
+        ORDER BY customer_capture_settings_display_order
+    """).format(sql.Identifier(tenant_schema))
+
+    query_identifiers = sql.SQL("""
+        SELECT
+            identifier_type_settings_code,
+            identifier_type_settings_label
+        FROM {}.identifier_type_settings
+        WHERE identifier_type_settings_is_active = TRUE
+        ORDER BY identifier_type_settings_display_order
+    """).format(sql.Identifier(tenant_schema))
+
+    async with conn.cursor() as fields_cur, conn.cursor() as identifiers_cur:
+
+        # las dos consultas, junto con lo que el llamador ya tenga en cola,
+        # van en un solo viaje a la BD
+        async with conn.pipeline():
+            await fields_cur.execute(query_fields)
+            await identifiers_cur.execute(query_identifiers)
+
+        columns = [desc[0] for desc in fields_cur.description]
+        fields = [dict(zip(columns, row)) for row in await fields_cur.fetchall()]
+
+        columns = [desc[0] for desc in identifiers_cur.description]
+        identifier_types = [dict(zip(columns, row)) for row in await identifiers_cur.fetchall()]
+
+    # los tipos de identificador solo se muestran si el formulario los pide
+    if not any(f["customer_capture_settings_field"] == "identifier_type" for f in fields):
+        identifier_types = []
+
+    return {
+        "fields": fields,
+        "identifier_types": identifier_types
+    }
+
+
+async def get_customer_settings(conn, tenant_schema: str) -> dict:
+    """
+    Campos activos del formulario y tipos de identificador del tenant.
+
+    Usa la conexión del llamador solo si no está en el cache. Lo retornado
+    es compartido entre requests: no modificarlo.
+    """
+    settings = _settings_cache.get(tenant_schema)
+
+    if settings is not None:
+        return settings
+
+    version = _settings_version(tenant_schema)
+    settings = await _load_customer_settings(conn, tenant_schema)
+
+    if _settings_version(tenant_schema) == version:
+        _settings_cache.set(tenant_schema, settings)
+
+    return settings
+
+
+async def refresh_customer_settings_service(current_user: dict):
+    """
+    Invalidación explícita para el tenant del usuario, en este proceso y en
+    los demás (vía NOTIFY), para cambios hechos sin pasar por los triggers.
+    """
+    tenant_schema = current_user.get("tenant_schema")
+
+    if not tenant_schema or not tenant_schema.isidentifier():
+        raise Exception("Invalid tenant schema")
+
+    async with get_async_connection() as conn:
+        async with conn.cursor() as cur:
+            await notify(cur, CUSTOMER_SETTINGS_CHANNEL, tenant_schema)
+
+    invalidate_customer_settings(tenant_schema)
+
+    return {"status": "ok"}
+
+
+def get_customer_settings_cache_stats():
+    return {
+        **_settings_cache.stats(),
+        **_settings_stats,
+    }
+
+
+# =========================
+# TOKEN -> TENANT
+# =========================
+
+# token -> tenant_schema, o _INVALID_TOKEN para tokens que no existen o ya
+# no sirven. El mapeo de un token no cambia: basta con que expire junto
+# con el link
+_token_cache = TTLCache(
+    maxsize=CUSTOMER_EXPRESS_TOKEN_CACHE_MAXSIZE,
+    ttl=CUSTOMER_EXPRESS_TOKEN_TTL
+)
+
+_INVALID_TOKEN = object()
+
+_token_stats = {
+    "invalid_hits": 0,
+}
+
+
+def remember_customer_express_token(token: str, tenant_schema: str, ttl: float = None):
+    _token_cache.set(token, tenant_schema, ttl=ttl)
+
+
+def forget_customer_express_token(token: str):
+    # el link no existe, expiró o apunta a un tenant inválido
+    _token_cache.set(token, _INVALID_TOKEN, ttl=CUSTOMER_EXPRESS_INVALID_TOKEN_TTL)
+
+
+async def resolve_customer_express_token(cur, token: str) -> str:
+    """
+    tenant_schema del link. Consulta core.customers_express_token_map solo
+    si el token no está en el cache.
+    """
+    tenant_schema = _token_cache.get(token)
+
+    if tenant_schema is _INVALID_TOKEN:
+        _token_stats["invalid_hits"] += 1
+        raise Exception("invalid_link")
+
+    if tenant_schema is not None:
+        return tenant_schema
+
+    await cur.execute("""
+        SELECT tenant_schema
+        FROM core.customers_express_token_map
+        WHERE token = %s
+    """, (token,))
+
+    row = await cur.fetchone()
+
+    if not row:
+        forget_customer_express_token(token)
+        raise Exception("invalid_link")
+
+    tenant_schema = row[0]
+
+    if not tenant_schema or not tenant_schema.isidentifier():
+        forget_customer_express_token(token)
+        raise Exception("invalid_tenant")
+
+    remember_customer_express_token(token, tenant_schema)
+
+    return tenant_schema
+
+
+def get_customer_express_token_cache_stats():
+    return {
+        **_token_cache.stats(),
+        **_token_stats,
+    }
+
+
+# =========================
+# CLIENTES EXPRESS
+# =========================
+
+async def search_customer_express_by_mobile_service(mobile: str, current_user: dict):
 
     import logging
 
-    with get_connection() as conn:
-        with conn.cursor() as cur:
+    tenant_schema = current_user["tenant_schema"]
 
-            # campos configurados
-            cur.execute("""
-                SELECT
-                    customer_capture_settings_field
-                FROM lindasylunaticas.customer_capture_settings
-                WHERE customer_capture_settings_is_active = TRUE
-                ORDER BY customer_capture_settings_display_order
-            """)
+    if not tenant_schema or not tenant_schema.isidentifier():
+        raise Exception("Invalid tenant schema")
 
-            field_rows = cur.fetchall()
-            fields = [r[0] for r in field_rows]
+    async with get_async_connection() as conn:
+        async with conn.cursor() as cur:
 
-            tenant_schema = current_user["tenant_schema"]
+            # campos configurados
+            settings = await get_customer_settings(conn, tenant_schema)
+            fields = [f["customer_capture_settings_field"] for f in settings["fields"]]
 
             query = f"""
             SELECT *
@@ -39,10 +266,10 @@ def search_customer_express_by_mobile_service(mobile: str, current_user: dict):
             logging.info(f"MOBILE: {mobile}")
             logging.info(f"QUERY: {query}")
 
-            cur.execute(query, (mobile,))
+            await cur.execute(query, (mobile,))
 
             columns = [desc[0] for desc in cur.description]
-            rows = cur.fetchall()
+            rows = await cur.fetchall()
 
     results = [dict(zip(columns, row)) for row in rows]
 
@@ -51,29 +278,15 @@ def search_customer_express_by_mobile_service(mobile: str, current_user: dict):
         "fields": fields,
         "results": results
     }
-def save_customer_express_service(token: str, payload: dict):
+async def save_customer_express_service(token: str, payload: dict):
 
     from psycopg import sql
 
-    with get_connection() as conn:
-        with conn.cursor() as cur:
+    async with get_async_connection() as conn:
+        async with conn.cursor() as cur:
 
             # resolver tenant
-            cur.execute("""
-                SELECT tenant_schema
-                FROM core.customers_express_token_map
-                WHERE token = %s
-            """, (token,))
-
-            row = cur.fetchone()
-
-            if not row:
-                raise Exception("invalid_link")
-
-            tenant_schema = row[0]
-
-            if not tenant_schema or not tenant_schema.isidentifier():
-                raise Exception("invalid_tenant")
+            tenant_schema = await resolve_customer_express_token(cur, token)
 
             fields = []
             values = []
@@ -103,50 +316,44 @@ def save_customer_express_service(token: str, payload: dict):
                 sql.SQL(", ").join(fields)
             )
 
-            cur.execute(query, values)
+            await cur.execute(query, values)
 
     return {"status": "ok"}
 
-def get_customer_express_service(token: str):
+async def get_customer_express_service(token: str):
 
-    with get_connection() as conn:
-        with conn.cursor() as cur:
+    async with get_async_connection() as conn:
+        async with conn.cursor() as cur:
 
             # resolver tenant
-            cur.execute("""
-                SELECT tenant_schema
-                FROM core.customers_express_token_map
-                WHERE token = %s
-            """, (token,))
-
-            row = cur.fetchone()
-
-            if not row:
-                raise Exception("invalid_link")
-
-            tenant_schema = row[0]
-
-            if not tenant_schema or not tenant_schema.isidentifier():
-                raise Exception("invalid_tenant")
+            tenant_schema = await resolve_customer_express_token(cur, token)
 
             # validar token
             query = sql.SQL("""
                 SELECT
                     customers_express_id,
                     customers_express_token_expires_at,
-                    customers_express_link_status
+                    customers_express_link_status,
+                    EXTRACT(EPOCH FROM customers_express_token_expires_at - LOCALTIMESTAMP)
                 FROM {}.customers_express
                 WHERE customers_express_token = %s
                 AND customers_express_token_expires_at > NOW()
             """).format(sql.Identifier(tenant_schema))
 
-            cur.execute(query, (token,))
-            record = cur.fetchone()
+            # token y campos en un solo viaje a la BD
+            async with conn.pipeline():
+                await cur.execute(query, (token,))
+                settings = await get_customer_settings(conn, tenant_schema)
+                record = await cur.fetchone()
 
             if not record:
+                forget_customer_express_token(token)
                 raise Exception("invalid_link")
 
-            customers_express_id, expires_at, status = record
+            customers_express_id, expires_at, status, remaining = record
+
+            # el mapeo del token se recuerda hasta que el link expira
+            remember_customer_express_token(token, tenant_schema, ttl=float(remaining))
 
             if expires_at and expires_at < datetime.utcnow():
                 raise Exception("expired_link")
@@ -154,52 +361,15 @@ def get_customer_express_service(token: str):
             if status == "completed":
                 raise Exception("form_completed")
 
-            # campos
-            query_fields = sql.SQL("""
-                SELECT
-                    customer_capture_settings_field,
-                    customer_capture_settings_label,
-                    customer_capture_settings_is_required,
-                    customer_capture_settings_display_order
-                FROM {}.customer_capture_settings
-                WHERE customer_capture_settings_is_active = TRUE
-                ORDER BY customer_capture_settings_display_order
-            """).format(sql.Identifier(tenant_schema))
-
-            cur.execute(query_fields)
-
-            columns = [desc[0] for desc in cur.description]
-            rows = cur.fetchall()
-            fields = [dict(zip(columns, row)) for row in rows]
-
-            identifier_types = []
-
-            if any(f["customer_capture_settings_field"] == "identifier_type" for f in fields):
-
-                query_identifiers = sql.SQL("""
-                    SELECT
-                        identifier_type_settings_code,
-                        identifier_type_settings_label
-                    FROM {}.identifier_type_settings
-                    WHERE identifier_type_settings_is_active = TRUE
-                    ORDER BY identifier_type_settings_display_order
-                """).format(sql.Identifier(tenant_schema))
-
-                cur.execute(query_identifiers)
-
-                columns = [desc[0] for desc in cur.description]
-                rows = cur.fetchall()
-                identifier_types = [dict(zip(columns, row)) for row in rows]
-
     return {
         "status": "ok",
         "token": token,
-        "fields": fields,
-        "identifier_types": identifier_types
+        "fields": settings["fields"],
+        "identifier_types": settings["identifier_types"]
     }
     
 
-def generate_customer_express_service(current_user: dict):
+async def generate_customer_express_service(current_user: dict):
 
     token = uuid4().hex
     tenant_schema = current_user.get("tenant_schema")
@@ -207,8 +377,8 @@ def generate_customer_express_service(current_user: dict):
     if not tenant_schema or not tenant_schema.isidentifier():
         raise Exception("Invalid tenant schema")
 
-    with get_connection() as conn:
-        with conn.cursor() as cur:
+    async with get_async_connection() as conn:
+        async with conn.cursor() as cur:
 
             query = sql.SQL("""
                 INSERT INTO {}.customers_express
@@ -228,16 +398,103 @@ def generate_customer_express_service(current_user: dict):
                 RETURNING customers_express_id
             """).format(sql.Identifier(tenant_schema))
 
-            cur.execute(query, (token,))
-            result = cur.fetchone()
+            await cur.execute(query, (token,))
+            result = await cur.fetchone()
 
-            cur.execute("""
+            await cur.execute("""
                 INSERT INTO core.customers_express_token_map (token, tenant_schema)
                 VALUES (%s, %s)
             """, (token, tenant_schema))
 
+    # se comparte por SMS y se abre en ráfagas: queda resuelto desde ya
+    remember_customer_express_token(token, tenant_schema)
+
     return {
         "status": "ok",
         "customers_express_id": result[0],
         "token": token
     }
+
+
+async def generate_customer_express_batch_service(current_user: dict, count: int = None, mobiles: list = None):
+    """
+    Genera varios links en una sola transacción: un INSERT multi-fila (unnest)
+    en {tenant}.customers_express y otro en core.customers_express_token_map,
+    enviados juntos en un pipeline.
+
+    Recibe `count` (links sin celular) o `mobiles` (un link por celular).
+    Retorna los links en el orden pedido.
+    """
+    tenant_schema = current_user.get("tenant_schema")
+
+    if not tenant_schema or not tenant_schema.isidentifier():
+        raise Exception("Invalid tenant schema")
+
+    if (count is None) == (mobiles is None):
+        raise Exception("Debe indicar count o mobiles")
+
+    if mobiles is not None:
+        count = len(mobiles)
+
+    # antes de armar cualquier lista del tamaño pedido
+    if not 0 < count <= CUSTOMER_EXPRESS_BATCH_LIMIT:
+        raise Exception(f"Se pueden generar entre 1 y {CUSTOMER_EXPRESS_BATCH_LIMIT} links por llamada")
+
+    if mobiles is not None:
+        mobiles = [mobile.strip() for mobile in mobiles]
+
+        if any(not mobile for mobile in mobiles):
+            raise Exception("Hay celulares vacíos")
+    else:
+        mobiles = [None] * count
+
+    tokens = [uuid4().hex for _ in range(count)]
+
+    async with get_async_connection() as conn:
+        async with conn.cursor() as cur, conn.cursor() as map_cur:
+
+            query = sql.SQL("""
+                INSERT INTO {}.customers_express
+                (
+                    customers_express_token,
+                    customers_express_token_created_at,
+                    customers_express_token_expires_at,
+                    customers_express_link_status,
+                    customers_express_mobile
+                )
+                SELECT
+                    t.token,
+                    NOW(),
+                    NOW() + interval '24 hours',
+                    'created',
+                    t.mobile
+                FROM unnest(%s::text[], %s::text[]) AS t(token, mobile)
+                RETURNING
+                    customers_express_id,
+                    customers_express_token,
+                    customers_express_mobile,
+                    customers_express_token_expires_at
+            """).format(sql.Identifier(tenant_schema))
+
+            async with conn.pipeline():
+                await cur.execute(query, (tokens, mobiles))
+
+                await map_cur.execute("""
+                    INSERT INTO core.customers_express_token_map (token, tenant_schema)
+                    SELECT token, %s
+                    FROM unnest(%s::text[]) AS t(token)
+                """, (tenant_schema, tokens))
+
+            # RETURNING no garantiza el orden del SELECT
+            by_token = {row[1]: row for row in await cur.fetchall()}
+
+    rows = [by_token[token] for token in tokens]
+
+    for token in tokens:
+        remember_customer_express_token(token, tenant_schema)
+
+    return rows
+
+
+def customer_express_links(rows: list) -> list:
+    return [dict(zip(CUSTOMER_EXPRESS_LINK_COLUMNS, row)) for row in rows]
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+
+from fastapi.encoders import jsonable_encoder
+
+from core.cache import TTLCache
+from core.db import get_async_connection
+from core.notifications import register_listener
+
+
+MENU_CHANNEL = "menu_changed"
+
+MENU_CACHE_TTL = float(os.getenv("MENU_CACHE_TTL", "3600"))
+
+MENU_QUERY = """
+WITH RECURSIVE recursive_menu AS (
+
+    SELECT m.*
+    FROM core.menu m
+    JOIN core.role_menu rm ON m.menu_id = rm.menu_id
+    JOIN core.group_role gr ON rm.role_id = gr.role_id
+    WHERE gr.group_id = %s
+      AND m.menu_active = TRUE
+
+    UNION
+
+    SELECT parent.*
+    FROM core.menu parent
+    JOIN recursive_menu child
+      ON child.menu_parent_id = parent.menu_id
+)
+SELECT DISTINCT *
+FROM recursive_menu
+ORDER BY menu_order;
+"""
+
+# se incrementa cada vez que cambia core.menu, core.role_menu o core.group_role;
+# una entrada cacheada con otra versión ya no sirve
+_version = 0
+
+_cache = TTLCache(maxsize=512, ttl=MENU_CACHE_TTL)
+
+
+def _on_menu_changed(payload):
+    global _version
+
+    _version += 1
+
+
+register_listener(MENU_CHANNEL, _on_menu_changed)
+
+
+def _etag(kind: str, content) -> str:
+    body = json.dumps(content, sort_keys=True, separators=(",", ":"))
+    digest = hashlib.sha1(f"{kind}:{body}".encode()).hexdigest()[:20]
+
+    return f'"{digest}"'
+
+
+def build_menu_tree(items: list) -> list:
+    """
+    Anida los ítems por menu_parent_id manteniendo el orden de menu_order.
+    Un ítem cuyo padre no vino en la lista queda como raíz.
+    """
+    nodes = {item["menu_id"]: {**item, "children": []} for item in items}
+    tree = []
+
+    for item in items:
+        node = nodes[item["menu_id"]]
+        parent = nodes.get(item["menu_parent_id"])
+
+        if parent is not None and parent is not node:
+            parent["children"].append(node)
+        else:
+            tree.append(node)
+
+    return tree
+
+
+async def _load_menu(group_id: int) -> list:
+    async with get_async_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(MENU_QUERY, (group_id,))
+            columns = [desc[0] for desc in cur.description]
+            rows = await cur.fetchall()
+
+    return jsonable_encoder([dict(zip(columns, row)) for row in rows])
+
+
+def get_cached_menu(group_id: int):
+    """
+    Entrada del cache del grupo si está vigente (misma versión), o None.
+    No toca la BD.
+    """
+    entry = _cache.get(group_id)
+
+    if entry is None or entry["version"] != _version:
+        return None
+
+    return entry
+
+
+async def get_menu_entry(group_id: int) -> dict:
+    entry = get_cached_menu(group_id)
+
+    if entry is not None:
+        return entry
+
+    version = _version
+    items = await _load_menu(group_id)
+    tree = build_menu_tree(items)
+
+    entry = {
+        "version": version,
+        "items": items,
+        "tree": tree,
+        "etag_items": _etag("items", items),
+        "etag_tree": _etag("tree", tree),
+    }
+
+    _cache.set(group_id, entry)
+
+    return entry
+
+
+def get_menu_cache_stats():
+    return {
+        "version": _version,
+        **_cache.stats(),
+    }
@@ -0,0 +1,257 @@
+import asyncio
+import os
+import time
+
+import psycopg
+
+from core.db import get_async_connection
+from core.notifications import register_listener
+
+
+PRICES_CHANNEL = "prices_changed"
+
+# cada cuántos segundos, como máximo, se consulta core.catalog_version
+PRICE_CATALOG_CHECK_SECONDS = float(os.getenv("PRICE_CATALOG_CHECK_SECONDS", "30"))
+
+PRICE_COLUMNS = [
+    "family",
+    "level2",
+    "level3",
+    "level4",
+    "servicekey",
+    "listprice",
+    "professionalprice",
+    "salonpercentage",
+    "professionalpercentage",
+]
+
+LEVELS = ["family", "level2", "level3", "level4"]
+
+# los rank replican el ORDER BY de la BD (collation incluida) para que las
+# listas servidas desde memoria salgan en el mismo orden que antes
+CATALOG_QUERY = """
+SELECT family,
+       level2,
+       level3,
+       level4,
+       servicekey,
+       listprice,
+       professionalprice,
+       salonpercentage,
+       professionalpercentage,
+       DENSE_RANK() OVER (ORDER BY family) AS family_rank,
+       DENSE_RANK() OVER (ORDER BY level2) AS level2_rank,
+       DENSE_RANK() OVER (ORDER BY level3) AS level3_rank,
+       DENSE_RANK() OVER (ORDER BY level4) AS level4_rank
+FROM core.prices
+ORDER BY servicekey
+"""
+
+VERSION_QUERY = """
+SELECT version
+FROM core.catalog_version
+WHERE catalog = 'prices'
+"""
+
+
+class PriceCatalog:
+    """
+    core.prices indexado en memoria.
+
+    `tree` es un trie family -> level2 -> level3 -> level4. Cada nodo tiene
+    sus hijos (solo valores no nulos, en orden de la BD) y las filas cuyo
+    siguiente nivel es NULL. `rows` mantiene el orden por servicekey.
+    """
+
+    def __init__(self, version, rows: list, ranks: list):
+        self.version = version
+        self.rows = rows
+        self.by_servicekey = {}
+        self.by_family = {}
+        self.tree = self._new_node(None)
+
+        for row, rank in zip(rows, ranks):
+            self.by_servicekey.setdefault(row["servicekey"], row)
+            self.by_family.setdefault(row["family"], []).append(row)
+
+            node = self.tree
+
+            for level in LEVELS:
+                key = row[level]
+
+                if key is None:
+                    break
+
+                child = node["children"].get(key)
+
+                if child is None:
+                    child = self._new_node(rank[level])
+                    node["children"][key] = child
+
+                node = child
+
+            node["prices"].append(row)
+
+        self._sort(self.tree)
+
+    @staticmethod
+    def _new_node(rank):
+        return {"rank": rank, "children": {}, "prices": []}
+
+    def _sort(self, node):
+        node["children"] = dict(
+            sorted(node["children"].items(), key=lambda item: item[1]["rank"])
+        )
+
+        for child in node["children"].values():
+            self._sort(child)
+
+    def _node(self, *path):
+        node = self.tree
+
+        for key in path:
+            node = node["children"].get(key)
+
+            if node is None:
+                return None
+
+        return node
+
+    def children(self, *path) -> list:
+        node = self._node(*path)
+
+        return list(node["children"]) if node else []
+
+    def prices(self, family, level2=None, level3=None, level4=None) -> list:
+        # mismos filtros opcionales que la consulta original (se ignoran vacíos)
+        filters = [
+            (level, value)
+            for level, value in (("level2", level2), ("level3", level3), ("level4", level4))
+            if value
+        ]
+
+        return [
+            row
+            for row in self.by_family.get(family, [])
+            if all(row[level] == value for level, value in filters)
+        ]
+
+    def all_prices(self, family=None) -> list:
+        if family:
+            return list(self.by_family.get(family, []))
+
+        return list(self.rows)
+
+    def _node_json(self, name, node, depth):
+        result = {"name": name}
+
+        if depth < len(LEVELS):
+            result["children"] = [
+                self._node_json(key, child, depth + 1)
+                for key, child in node["children"].items()
+            ]
+
+        result["prices"] = node["prices"]
+
+        return result
+
+    def as_tree(self) -> dict:
+        return {
+            "version": self.version,
+            "families": [
+                self._node_json(key, child, 1)
+                for key, child in self.tree["children"].items()
+            ],
+            "prices": self.tree["prices"],
+        }
+
+
+_catalog = None
+_checked_at = 0.0
+_stale = True
+_lock = asyncio.Lock()
+
+_stats = {
+    "loads": 0,
+    "version_checks": 0,
+    "notifications": 0,
+}
+
+
+def _on_prices_changed(payload):
+    global _stale
+
+    _stats["notifications"] += 1
+    _stale = True
+
+
+register_listener(PRICES_CHANNEL, _on_prices_changed)
+
+
+async def _fetch_version(cur):
+    try:
+        await cur.execute(VERSION_QUERY)
+    except psycopg.errors.UndefinedTable:
+        # sin sql/005 no hay versión: se recarga en cada chequeo
+        return None
+
+    row = await cur.fetchone()
+
+    return row[0] if row else None
+
+
+async def _refresh():
+    global _catalog, _checked_at
+
+    async with get_async_connection() as conn:
+        async with conn.cursor() as cur:
+            _stats["version_checks"] += 1
+            version = await _fetch_version(cur)
+
+            if version is not None and _catalog is not None and version == _catalog.version:
+                _checked_at = time.monotonic()
+                return
+
+            if version is None:
+                await conn.rollback()
+
+            await cur.execute(CATALOG_QUERY)
+            rows = await cur.fetchall()
+
+    width = len(PRICE_COLUMNS)
+
+    _catalog = PriceCatalog(
+        version,
+        [dict(zip(PRICE_COLUMNS, row[:width])) for row in rows],
+        [dict(zip(LEVELS, row[width:])) for row in rows],
+    )
+    _checked_at = time.monotonic()
+    _stats["loads"] += 1
+
+
+async def get_price_catalog() -> PriceCatalog:
+    global _stale
+
+    fresh = time.monotonic() - _checked_at < PRICE_CATALOG_CHECK_SECONDS
+
+    if _catalog is not None and not _stale and fresh:
+        return _catalog
+
+    async with _lock:
+        fresh = time.monotonic() - _checked_at < PRICE_CATALOG_CHECK_SECONDS
+
+        if _catalog is None or _stale or not fresh:
+            # marcado antes de leer: un NOTIFY que llegue durante la carga
+            # vuelve a dejarlo stale
+            _stale = False
+            await _refresh()
+
+    return _catalog
+
+
+def get_price_catalog_stats():
+    return {
+        "version": _catalog.version if _catalog else None,
+        "rows": len(_catalog.rows) if _catalog else 0,
+        **_stats,
+    }
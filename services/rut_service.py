@@ -0,0 +1,295 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from core.exceptions import InvalidDataError
+
+
+# máximo de valores por llamada a /ruts/validar
+RUT_BATCH_LIMIT = int(os.getenv("RUT_BATCH_LIMIT", "100000"))
+
+# los arreglos se procesan por bloques: los temporales de cada paso se
+# reutilizan entre bloques en vez de pedir memoria nueva del tamaño total
+RUT_BLOCK_SIZE = 32768
+
+# dígitos significativos del cuerpo de un RUT (hasta 999.999.999)
+RUT_MAX_DIGITS = 9
+
+# valores más largos que esto no son RUT ni celular
+RUT_MAX_LENGTH = 32
+
+RUT_KIND_RUT = "rut"
+RUT_KIND_MOBILE = "celular"
+RUT_KIND_INVALID = "invalido"
+
+RUT_KINDS = (RUT_KIND_RUT, RUT_KIND_MOBILE, RUT_KIND_INVALID)
+
+# dígito verificador (como código de carácter) según 11 - (suma % 11):
+# 10 es K y 11 es 0
+_RUT_DV_CODES = np.array([ord(c) for c in "?123456789K0"], dtype=np.uint8)
+
+# caracteres no ASCII que str.strip() quita en los extremos (NBSP de Excel, etc.)
+_WIDE_WHITESPACE_CODES = np.array(
+    [code for code in range(128, 0x3001) if chr(code).isspace()],
+    dtype=np.uint32
+)
+
+# tablas por código ASCII: una búsqueda por celda en vez de comparaciones
+_IS_SPACE = np.array([chr(code).isspace() for code in range(256)])
+
+# lo que se ignora al leer un celular: "+56 9 (1234) 5678"
+_IS_PHONE_SEPARATOR = np.isin(np.arange(256), [ord(c) for c in " +()"])
+
+_POWERS_OF_10 = 10 ** np.arange(19, dtype=np.int64)
+
+
+# =========================
+# RUT DE A UNO
+# =========================
+
+def validar_rut(rut: str) -> bool:
+    try:
+        rut = rut.replace(".", "").replace("-", "").upper().strip()
+
+        cuerpo = rut[:-1]
+        dv = rut[-1]
+
+        if not cuerpo.isdigit():
+            return False
+
+        suma = 0
+        multiplo = 2
+
+        for c in reversed(cuerpo):
+            suma += int(c) * multiplo
+            multiplo += 1
+            if multiplo == 8:
+                multiplo = 2
+
+        resto = suma % 11
+        dv_calculado = 11 - resto
+
+        if dv_calculado == 11:
+            dv_calculado = "0"
+        elif dv_calculado == 10:
+            dv_calculado = "K"
+        else:
+            dv_calculado = str(dv_calculado)
+
+        return dv == dv_calculado
+
+    except:
+        return False
+
+
+# =========================
+# RUT EN LOTE
+# =========================
+
+# Los valores se leen como una matriz de códigos UCS-4 (una fila por valor,
+# una columna por carácter) y todo lo demás es aritmética de NumPy sobre esa
+# matriz: quitar separadores, ubicar el dígito verificador, módulo 11 y el
+# número normalizado. No hay operaciones de texto por valor.
+
+def _blocks(values):
+    for start in range(0, len(values), RUT_BLOCK_SIZE):
+        yield values[start:start + RUT_BLOCK_SIZE]
+
+
+def _code_matrix(values) -> np.ndarray:
+    values = np.asarray(values, dtype=object)
+    text = np.where(pd.isna(values), "", values).astype(str)
+
+    lengths = np.strings.str_len(text)
+    text = np.where(lengths > RUT_MAX_LENGTH, "", text)
+    width = max(int(lengths[lengths <= RUT_MAX_LENGTH].max(initial=0)), 1)
+
+    codes = text.astype(f"<U{width}").view(np.uint32).reshape(len(text), width)
+
+    # a un byte por carácter: espacios Unicode como espacio y cualquier otro
+    # carácter no ASCII como 0xFF, que no es dígito ni separador
+    wide = codes > 127
+
+    if wide.any():
+        codes = np.where(wide, np.where(np.isin(codes, _WIDE_WHITESPACE_CODES), 32, 0xFF), codes)
+
+    return codes.astype(np.uint8)
+
+
+def _rank_from_right(mask: np.ndarray) -> np.ndarray:
+    # posición contando desde la derecha entre las celdas marcadas (0 = la última)
+    return np.cumsum(mask[:, ::-1], axis=1, dtype=np.int8)[:, ::-1] - 1
+
+
+def _number(digits: np.ndarray, mask: np.ndarray, rank: np.ndarray, max_digits: int) -> np.ndarray:
+    # valor de las cifras marcadas con rango < max_digits
+    used = mask & (rank < max_digits)
+    powers = _POWERS_OF_10[np.clip(rank, 0, max_digits - 1)]
+
+    return np.where(used, powers * digits, 0).sum(axis=1)
+
+
+def _check_codes(codes: np.ndarray):
+    """
+    (válidos, cuerpo, dígito verificador) con la misma semántica que
+    validar_rut: sin puntos ni guiones y sin espacios en los extremos, el
+    último carácter es el verificador y el resto son dígitos.
+
+    Solo se aceptan dígitos ASCII, y a lo más RUT_MAX_DIGITS significativos.
+    """
+    rows, width = codes.shape
+    columns = np.arange(width)
+
+    kept = (codes != 0) & (codes != ord(".")) & (codes != ord("-"))
+    solid = kept & ~_IS_SPACE[codes]
+
+    first = solid.argmax(axis=1)[:, None]
+    last = width - 1 - solid[:, ::-1].argmax(axis=1)
+
+    dv = codes[np.arange(rows), last]
+    dv = np.where(dv == ord("k"), ord("K"), dv).astype(np.uint8)
+
+    body = kept & (columns >= first) & (columns < last[:, None])
+
+    # sin signo: lo que está antes de "0" da la vuelta y queda > 9
+    digits = codes - np.uint8(ord("0"))
+    numeric = ~(body & (digits > 9)).any(axis=1)
+
+    rank = _rank_from_right(body)
+    total = np.where(body, digits * (2 + rank % 6), 0).sum(axis=1, dtype=np.int32)
+
+    significant = np.where(body & (digits > 0) & (digits <= 9), rank + 1, 0).max(axis=1)
+
+    valid = (
+        body.any(axis=1)
+        & numeric
+        & (significant <= RUT_MAX_DIGITS)
+        & (dv == _RUT_DV_CODES[11 - total % 11])
+    )
+
+    return valid, _number(digits, body, rank, RUT_MAX_DIGITS), dv
+
+
+def _mobile_codes(codes: np.ndarray):
+    """
+    (celulares, número de 9 dígitos): solo dígitos fuera de " +()", 9 que
+    parten en 9 o 11 que parten en 569.
+    """
+    kept = (codes != 0) & ~_IS_PHONE_SEPARATOR[codes]
+    digits = codes - np.uint8(ord("0"))
+
+    numeric = ~(kept & (digits > 9)).any(axis=1)
+    count = kept.sum(axis=1)
+
+    rank = _rank_from_right(kept)
+
+    # las tres primeras cifras como número (569 o 9XX)
+    position = count[:, None] - 1 - rank
+    lead = np.where(
+        kept & (position < 3),
+        _POWERS_OF_10[np.clip(2 - position, 0, 2)] * digits,
+        0
+    ).sum(axis=1)
+
+    mobile = numeric & (
+        ((count == 9) & (lead // 100 == 9))
+        | ((count == 11) & (lead == 569))
+    )
+
+    return mobile, _number(digits, kept, rank, 9)
+
+
+def normalize_ruts(values) -> np.ndarray:
+    """
+    RUTs válidos como 12345678-5 (sin puntos, sin ceros a la izquierda, K
+    mayúscula); None para los inválidos.
+    """
+    normalized = np.full(len(values), None, dtype=object)
+
+    for start, block in zip(range(0, len(values), RUT_BLOCK_SIZE), _blocks(values)):
+        valid, body, dv = _check_codes(_code_matrix(block))
+        normalized[start + np.flatnonzero(valid)] = _format_ruts(body[valid], dv[valid])
+
+    return normalized
+
+
+def _format_ruts(body: np.ndarray, dv: np.ndarray) -> np.ndarray:
+    return np.strings.add(np.strings.add(body.astype(str), "-"), dv.astype(np.uint32).view("<U1"))
+
+
+def validate_ruts(values) -> np.ndarray:
+    """
+    validar_rut aplicado a un arreglo completo; retorna un array de bool.
+    Difiere solo en dígitos no ASCII y en cuerpos con más de RUT_MAX_DIGITS
+    dígitos significativos (acá ambos son inválidos).
+    """
+    if not len(values):
+        return np.zeros(0, dtype=bool)
+
+    return np.concatenate([
+        _check_codes(_code_matrix(block))[0]
+        for block in _blocks(values)
+    ])
+
+
+def _classify_block(values):
+    codes = _code_matrix(values)
+
+    kinds = np.full(len(values), RUT_KIND_INVALID, dtype=object)
+    normalized = np.full(len(values), None, dtype=object)
+
+    # un RUT sin guion con cuerpo de 8 dígitos que parte en 9 se ve igual
+    # que un celular; sin guion ni puntos se toma como celular
+    mobile, number = _mobile_codes(codes)
+    valid, body, dv = _check_codes(codes)
+    rut = valid & ~mobile
+
+    kinds[mobile] = RUT_KIND_MOBILE
+    normalized[mobile] = number[mobile].astype(str)
+
+    kinds[rut] = RUT_KIND_RUT
+    normalized[rut] = _format_ruts(body[rut], dv[rut])
+
+    return kinds, normalized
+
+
+def classify_rut_celular(values):
+    """
+    Clasifica los valores de la columna RUT / CELULAR.
+
+    Retorna (tipos, normalizados): tipo "celular" para un número móvil
+    chileno escrito solo con dígitos (9XXXXXXXX, opcionalmente con 56 o +56),
+    "rut" para un RUT con dígito verificador correcto y "invalido" para el
+    resto. El normalizado es 12345678-5 para RUT, 9XXXXXXXX para celular y
+    None si es inválido.
+    """
+    if not len(values):
+        return np.zeros(0, dtype=object), np.zeros(0, dtype=object)
+
+    blocks = [_classify_block(block) for block in _blocks(values)]
+
+    return (
+        np.concatenate([kinds for kinds, _ in blocks]),
+        np.concatenate([normalized for _, normalized in blocks]),
+    )
+
+
+def count_kinds(kinds: np.ndarray) -> dict:
+    return {kind: int((kinds == kind).sum()) for kind in RUT_KINDS}
+
+
+def validate_ruts_service(values: list) -> dict:
+    if len(values) > RUT_BATCH_LIMIT:
+        raise InvalidDataError(f"Se pueden validar hasta {RUT_BATCH_LIMIT} valores por llamada")
+
+    kinds, normalized = classify_rut_celular(values)
+
+    return {
+        "total": len(values),
+        "counts": count_kinds(kinds),
+        "items": [
+            {"valor": value, "tipo": kind, "normalizado": norm}
+            for value, kind, norm in zip(values, kinds.tolist(), normalized.tolist())
+        ],
+    }
@@ -1,14 +1,15 @@
 from core.db import get_connection
 from core.exceptions import InternalServerError
-import hashlib
+from core.hashing import hash_password
 
 
 def create_user_service(data):
 
+    hashed_password = hash_password(data.user_password)
+
     try:
         with get_connection() as conn:
             with conn.cursor() as cur:
-                hashed_password = hashlib.sha256(data.user_password.encode()).hexdigest()
                 cur.execute("""
                     INSERT INTO core."user" (
                         user_nickname,
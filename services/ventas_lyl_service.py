@@ -1,12 +1,48 @@
 # services/ventas_lyl_service.py
 
+import codecs
+import csv
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice, repeat
+from uuid import uuid4
+
+import numpy as np
 import pandas as pd
 from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+from psycopg.types.json import Jsonb
+from openpyxl import load_workbook
+from openpyxl.cell.cell import ERROR_CODES
 from core.db import get_connection
+from core.exceptions import NotFoundError
+from core.jobs import get_job, submit_job
+from services.rut_service import RUT_KIND_INVALID, classify_rut_celular, count_kinds
 
 
 EXCEL_SHEET_NAME = "VENTAS"
 
+# filas del Excel que se leen, filtran y cargan de una vez
+VENTAS_CHUNK_SIZE = int(os.getenv("VENTAS_CHUNK_SIZE", "5000"))
+
+# directorio donde se deja el archivo subido mientras espera su job
+VENTAS_SPOOL_DIR = os.getenv("VENTAS_SPOOL_DIR") or None
+
+SPOOL_CHUNK_BYTES = 1024 * 1024
+
+# textos que pd.read_excel convierte en NaN por defecto, más las celdas con
+# error; el lector por streaming los trata igual para no cambiar la carga
+EXCEL_NA_VALUES = {
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a",
+    "nan", "null",
+} | set(ERROR_CODES)
+
 
 COLUMN_MAP = {
     "VENTAS_KEY": "ventas_key",
@@ -44,6 +80,12 @@ COLUMN_MAP = {
 }
 
 
+DB_COLUMNS = list(COLUMN_MAP.values()) + [
+    "archivo_origen",
+    "hoja_origen",
+    "fila_excel",
+]
+
 REQUIRED_COLUMNS = [
     "VENTAS_KEY",
     "AÑO",
@@ -51,13 +93,16 @@ REQUIRED_COLUMNS = [
 ]
 
 
+NULL_TOKENS = ["nan", "none", "nat", ""]
+
+
 def clean_value(value):
     if pd.isna(value):
         return None
 
     value = str(value).strip()
 
-    if value.lower() in ["nan", "none", "nat", ""]:
+    if value.lower() in NULL_TOKENS:
         return None
 
     if value.endswith(".0"):
@@ -66,28 +111,293 @@ def clean_value(value):
     return value
 
 
+def clean_series(series: pd.Series) -> np.ndarray:
+    """
+    clean_value aplicado a una columna completa con operaciones vectorizadas.
+    Retorna un array object con str o None, celda a celda igual a clean_value.
+    """
+    values = series.to_numpy(dtype=object)
+    result = np.full(len(values), None, dtype=object)
+
+    present = np.flatnonzero(~pd.isna(values))
+
+    if not len(present):
+        return result
+
+    text = pd.Series(values[present], dtype=object).astype(str).str.strip()
+    keep = ~text.str.lower().isin(NULL_TOKENS).to_numpy()
+
+    text = text[keep].str.removesuffix(".0")
+    result[present[keep]] = text.to_numpy(dtype=object)
+
+    return result
+
+
 def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
     df.columns = [str(col).strip() for col in df.columns]
     return df
 
 
-def validate_columns(df: pd.DataFrame):
+def validate_columns(columns):
     missing = []
 
     for col in REQUIRED_COLUMNS:
-        if col not in df.columns:
+        if col not in columns:
             missing.append(col)
 
     if missing:
         raise Exception(f"Faltan columnas obligatorias en el Excel: {', '.join(missing)}")
 
 
+def _excel_text(value):
+    # misma conversión que pd.read_excel(..., dtype=str) con openpyxl
+    if value is None:
+        return None
+
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+
+    text = str(value)
+
+    return None if text in EXCEL_NA_VALUES else text
+
+
+def read_excel_chunks(file, chunk_size: int = VENTAS_CHUNK_SIZE):
+    """
+    Lee la hoja VENTAS en modo read-only de openpyxl, sin cargar el libro
+    completo en memoria.
+
+    Retorna (columnas, chunks): las columnas del encabezado y un iterador de
+    DataFrames de a lo más `chunk_size` filas con las columnas de COLUMN_MAP
+    presentes. El índice de cada DataFrame es fila_excel - 2, igual que el
+    de pd.read_excel, así build_insert_rows no cambia.
+    """
+    workbook = load_workbook(file, read_only=True, data_only=True)
+
+    if EXCEL_SHEET_NAME not in workbook.sheetnames:
+        workbook.close()
+        raise Exception(f"El Excel no tiene la hoja {EXCEL_SHEET_NAME}")
+
+    rows = enumerate(workbook[EXCEL_SHEET_NAME].iter_rows(values_only=True), start=1)
+
+    header = []
+
+    for _, values in rows:
+        if any(value is not None for value in values):
+            header = [str(value).strip() if value is not None else "" for value in values]
+            break
+
+    positions = _column_positions(header)
+
+    def chunks():
+        try:
+            while True:
+                batch = list(islice(rows, chunk_size))
+
+                if not batch:
+                    break
+
+                index = []
+                data = {name: [] for name in positions}
+
+                for row_number, values in batch:
+                    if all(value is None for value in values):
+                        continue
+
+                    index.append(row_number - 2)
+
+                    for name, position in positions.items():
+                        value = values[position] if position < len(values) else None
+                        data[name].append(_excel_text(value))
+
+                if index:
+                    yield pd.DataFrame(data, index=index, dtype=object)
+
+        finally:
+            workbook.close()
+
+    return header, chunks()
+
+
+# =========================
+# CSV Y PARQUET
+# =========================
+
+VENTAS_FORMATS = ("xlsx", "csv", "parquet")
+
+CSV_DELIMITERS = ",;\t|"
+
+SNIFF_BYTES = 64 * 1024
+
+
+def _peek(source, size: int = SNIFF_BYTES) -> bytes:
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return f.read(size)
+
+    position = source.tell()
+    data = source.read(size)
+    source.seek(position)
+
+    return data
+
+
+def detect_format(source, formato: str = None) -> str:
+    """
+    Formato del archivo: el pedido explícitamente, o según su firma (xlsx es
+    un zip, parquet parte con PAR1). Cualquier otro archivo se trata como CSV.
+    """
+    if formato:
+        _validate_format(formato)
+        return formato.lower()
+
+    head = _peek(source, 4)
+
+    if head.startswith(b"PK"):
+        return "xlsx"
+
+    if head.startswith(b"PAR1"):
+        return "parquet"
+
+    return "csv"
+
+
+def _sniff_csv(sample: bytes):
+    if sample.startswith(b"\xef\xbb\xbf"):
+        encoding = "utf-8-sig"
+    else:
+        try:
+            # final=False: un carácter cortado al final de la muestra no es error
+            codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+            encoding = "utf-8"
+        except UnicodeDecodeError:
+            encoding = "latin-1"
+
+    text = sample.decode(encoding, errors="ignore")
+    first_lines = "\n".join(text.splitlines()[:20])
+
+    try:
+        delimiter = csv.Sniffer().sniff(first_lines, delimiters=CSV_DELIMITERS).delimiter
+    except csv.Error:
+        delimiter = ","
+
+    return encoding, delimiter
+
+
+def _column_positions(header: list) -> dict:
+    # primera aparición de cada columna de COLUMN_MAP, igual que en el Excel
+    positions = {}
+
+    for position, name in enumerate(header):
+        if name in COLUMN_MAP and name not in positions:
+            positions[name] = position
+
+    return positions
+
+
+def read_csv_chunks(source, chunk_size: int = VENTAS_CHUNK_SIZE):
+    """
+    Lee un CSV con el parser C de pandas por chunks, solo las columnas de
+    COLUMN_MAP. Detecta encoding (utf-8 o latin-1) y separador. Los textos
+    nulos son los mismos que en el Excel (EXCEL_NA_VALUES).
+    """
+    encoding, delimiter = _sniff_csv(_peek(source))
+
+    header = next(csv.reader(
+        _peek(source).decode(encoding, errors="ignore").splitlines()[:1],
+        delimiter=delimiter
+    ), [])
+    header = [name.strip() for name in header]
+    positions = _column_positions(header)
+
+    if not isinstance(source, (str, os.PathLike)):
+        source.seek(0)
+
+    reader = pd.read_csv(
+        source,
+        sep=delimiter,
+        encoding=encoding,
+        engine="c",
+        header=None,
+        skiprows=1,
+        dtype=str,
+        usecols=list(positions.values()),
+        keep_default_na=False,
+        na_values=list(EXCEL_NA_VALUES),
+        chunksize=chunk_size,
+    )
+
+    names = {position: name for name, position in positions.items()}
+
+    def chunks():
+        with reader:
+            for chunk in reader:
+                chunk.columns = [names[position] for position in chunk.columns]
+                yield chunk.astype(object).where(chunk.notna(), None)
+
+    return header, chunks()
+
+
+def read_parquet_chunks(source, chunk_size: int = VENTAS_CHUNK_SIZE):
+    """
+    Lee un Parquet por row groups con pyarrow, solo las columnas de
+    COLUMN_MAP. Los valores no texto se convierten igual que las celdas
+    del Excel (_excel_text).
+    """
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise Exception("Para cargar Parquet se requiere pyarrow")
+
+    parquet = pq.ParquetFile(source)
+
+    header = [name.strip() for name in parquet.schema_arrow.names]
+    positions = _column_positions(header)
+    source_names = [parquet.schema_arrow.names[position] for position in positions.values()]
+
+    def chunks():
+        start = 0
+
+        try:
+            for batch in parquet.iter_batches(batch_size=chunk_size, columns=source_names):
+                data = {
+                    name: [_excel_text(value) for value in batch.column(i).to_pylist()]
+                    for i, name in enumerate(positions)
+                }
+                index = range(start, start + batch.num_rows)
+                start += batch.num_rows
+
+                yield pd.DataFrame(data, index=index, dtype=object)
+
+        finally:
+            parquet.close()
+
+    return header, chunks()
+
+
+def read_ventas_chunks(source, formato: str = None):
+    """
+    Retorna (formato, columnas, chunks) para el archivo, sea Excel, CSV o
+    Parquet. Los chunks son DataFrames con columnas de COLUMN_MAP y valores
+    str o None; el índice + 2 es la fila de origen.
+    """
+    formato = detect_format(source, formato)
+
+    if formato == "csv":
+        return (formato, *read_csv_chunks(source))
+
+    if formato == "parquet":
+        return (formato, *read_parquet_chunks(source))
+
+    return (formato, *read_excel_chunks(source))
+
+
 def filter_period(df: pd.DataFrame, anio: int, mes: int) -> pd.DataFrame:
     anio_text = str(anio)
     anio_mes = f"{anio}-{str(mes).zfill(2)}"
 
-    df["AÑO"] = df["AÑO"].apply(clean_value)
-    df["AÑO-MES"] = df["AÑO-MES"].apply(clean_value)
+    df["AÑO"] = clean_series(df["AÑO"])
+    df["AÑO-MES"] = clean_series(df["AÑO-MES"])
 
     df_filtered = df[
         (df["AÑO"] == anio_text) &
@@ -98,24 +408,23 @@ def filter_period(df: pd.DataFrame, anio: int, mes: int) -> pd.DataFrame:
 
 
 def build_insert_rows(df: pd.DataFrame, archivo_origen: str):
-    rows = []
-
-    for index, row in df.iterrows():
-        record = {}
-
-        for excel_col, db_col in COLUMN_MAP.items():
-            if excel_col in df.columns:
-                record[db_col] = clean_value(row[excel_col])
-            else:
-                record[db_col] = None
+    """
+    Filas listas para COPY: tuplas en el orden de DB_COLUMNS, armadas
+    columna por columna (sin recorrer el DataFrame fila a fila).
+    """
+    columns = []
 
-        record["archivo_origen"] = archivo_origen
-        record["hoja_origen"] = EXCEL_SHEET_NAME
-        record["fila_excel"] = int(index) + 2
+    for excel_col in COLUMN_MAP:
+        if excel_col in df.columns:
+            columns.append(clean_series(df[excel_col]))
+        else:
+            columns.append(repeat(None))
 
-        rows.append(record)
+    columns.append(repeat(archivo_origen))
+    columns.append(repeat(EXCEL_SHEET_NAME))
+    columns.append((df.index.to_numpy() + 2).tolist())
 
-    return rows
+    return list(zip(*columns))
 
 
 def delete_period(cur, anio: int, anio_mes: str) -> int:
@@ -131,92 +440,1283 @@ def delete_period(cur, anio: int, anio_mes: str) -> int:
     return cur.rowcount
 
 
-def insert_dataframe_ventas(cur, rows: list) -> int:
-    if not rows:
-        return 0
+VENTAS_LOAD_MODES = ("replace", "diff")
+
+DIFF_TABLE = "tmp_stg_ventas_lyl"
+
+
+def create_diff_table(cur):
+    # misma estructura que la tabla real, incluido row_hash (columna generada)
+    cur.execute(
+        f"""
+        CREATE TEMP TABLE {DIFF_TABLE}
+        (LIKE core.stg_ventas_lyl INCLUDING GENERATED)
+        ON COMMIT DROP
+        """
+    )
+
+    # LIKE copia los NOT NULL; las columnas que no vienen en el COPY (id,
+    # created_at, ...) se llenan recién al insertar en la tabla real
+    cur.execute(
+        f"""
+        SELECT attname
+        FROM pg_attribute
+        WHERE attrelid = '{DIFF_TABLE}'::regclass
+        AND attnum > 0
+        AND attnotnull
+        AND NOT attisdropped
+        """
+    )
+
+    for (column,) in cur.fetchall():
+        if column not in DB_COLUMNS:
+            cur.execute(f"ALTER TABLE {DIFF_TABLE} ALTER COLUMN {column} DROP NOT NULL")
+
+
+def has_row_hash(cur) -> bool:
+    cur.execute(
+        """
+        SELECT 1
+        FROM pg_attribute
+        WHERE attrelid = 'core.stg_ventas_lyl'::regclass
+        AND attname = 'row_hash'
+        AND NOT attisdropped
+        """
+    )
+
+    return cur.fetchone() is not None
+
+
+def _keys_are_unique(cur, table: str, anio: int, anio_mes: str) -> bool:
+    cur.execute(
+        f"""
+        SELECT COUNT(*) = COUNT(DISTINCT ventas_key)
+        FROM {table}
+        WHERE anio = %s
+        AND anio_mes = %s
+        """,
+        (str(anio), anio_mes)
+    )
+
+    return cur.fetchone()[0]
+
+
+def replace_period_from_diff_table(cur, anio: int, anio_mes: str) -> dict:
+    rows_deleted = delete_period(cur, anio, anio_mes)
+    columns_sql = ", ".join(DB_COLUMNS)
+
+    cur.execute(
+        f"""
+        INSERT INTO core.stg_ventas_lyl ({columns_sql})
+        SELECT {columns_sql}
+        FROM {DIFF_TABLE}
+        """
+    )
+
+    return {
+        "rows_deleted": rows_deleted,
+        "rows_inserted": cur.rowcount,
+        "rows_updated": 0,
+        "rows_unchanged": 0,
+    }
 
-    db_columns = list(COLUMN_MAP.values()) + [
-        "archivo_origen",
-        "hoja_origen",
-        "fila_excel",
-    ]
 
-    columns_sql = ", ".join(db_columns)
-    placeholders = ", ".join(["%s"] * len(db_columns))
+def apply_period_diff(cur, anio: int, anio_mes: str, rows_staged: int) -> dict:
+    """
+    Aplica sobre el período solo las diferencias con las filas cargadas en
+    DIFF_TABLE, comparando por ventas_key y row_hash.
+    """
+    period = (str(anio), anio_mes)
+    columns_sql = ", ".join(DB_COLUMNS)
+    set_sql = ", ".join(f"{col} = t.{col}" for col in DB_COLUMNS)
 
-    insert_sql = f"""
-        INSERT INTO core.stg_ventas_lyl (
-            {columns_sql}
+    cur.execute(
+        f"""
+        DELETE FROM core.stg_ventas_lyl s
+        WHERE s.anio = %s
+        AND s.anio_mes = %s
+        AND NOT EXISTS (
+            SELECT 1
+            FROM {DIFF_TABLE} t
+            WHERE t.ventas_key = s.ventas_key
         )
-        VALUES (
-            {placeholders}
+        """,
+        period
+    )
+    rows_deleted = cur.rowcount
+
+    cur.execute(
+        f"""
+        UPDATE core.stg_ventas_lyl s
+        SET {set_sql}
+        FROM {DIFF_TABLE} t
+        WHERE s.anio = %s
+        AND s.anio_mes = %s
+        AND s.ventas_key = t.ventas_key
+        AND s.row_hash IS DISTINCT FROM t.row_hash
+        """,
+        period
+    )
+    rows_updated = cur.rowcount
+
+    cur.execute(
+        f"""
+        INSERT INTO core.stg_ventas_lyl ({columns_sql})
+        SELECT {columns_sql}
+        FROM {DIFF_TABLE} t
+        WHERE NOT EXISTS (
+            SELECT 1
+            FROM core.stg_ventas_lyl s
+            WHERE s.anio = %s
+            AND s.anio_mes = %s
+            AND s.ventas_key = t.ventas_key
         )
+        """,
+        period
+    )
+    rows_inserted = cur.rowcount
+
+    return {
+        "rows_deleted": rows_deleted,
+        "rows_inserted": rows_inserted,
+        "rows_updated": rows_updated,
+        "rows_unchanged": rows_staged - rows_inserted - rows_updated,
+    }
+
+
+# =========================
+# PARTICIONES (sql/007)
+# =========================
+
+def is_partitioned(cur) -> bool:
+    cur.execute(
+        """
+        SELECT relkind = 'p'
+        FROM pg_class
+        WHERE oid = 'core.stg_ventas_lyl'::regclass
+        """
+    )
+
+    return cur.fetchone()[0]
+
+
+def ensure_partition(cur, anio_mes: str) -> str:
+    cur.execute("SELECT core.ensure_stg_ventas_lyl_partition(%s)", (anio_mes,))
+
+    return cur.fetchone()[0]
+
+
+def create_period_table(cur, anio_mes: str) -> str:
     """
+    Tabla suelta con la estructura de core.stg_ventas_lyl donde se arma el
+    período antes del intercambio. El CHECK permite que ATTACH PARTITION no
+    tenga que recorrerla para validar.
+    """
+    name = f"stg_ventas_lyl_{anio_mes.replace('-', '_')}_{uuid4().hex[:8]}"
+
+    cur.execute(
+        f"""
+        CREATE TABLE core.{name}
+        (LIKE core.stg_ventas_lyl INCLUDING DEFAULTS INCLUDING GENERATED)
+        """
+    )
+    cur.execute(
+        f"""
+        ALTER TABLE core.{name}
+        ADD CONSTRAINT periodo_check
+        CHECK (anio_mes IS NOT NULL AND anio_mes = '{anio_mes}')
+        """
+    )
 
-    values = [
-        tuple(row.get(col) for col in db_columns)
-        for row in rows
-    ]
+    return name
 
-    cur.executemany(insert_sql, values)
 
-    return len(values)
+def swap_period_partition(cur, anio: int, anio_mes: str, staging: str) -> int:
+    """
+    Reemplaza la partición del período por `staging`. Debe correr en una
+    transacción corta: toma ACCESS EXCLUSIVE sobre la tabla padre antes que
+    nada para no escalar locks a mitad de camino.
 
+    Retorna las filas del período que había antes (las que se reemplazaron).
+    """
+    cur.execute("LOCK TABLE core.stg_ventas_lyl IN ACCESS EXCLUSIVE MODE")
 
-async def upload_ventas_service(
-    anio: int,
-    mes: int,
-    file: UploadFile,
-    current_user: dict
-):
-    if mes < 1 or mes > 12:
-        raise Exception("Mes inválido. Debe estar entre 1 y 12.")
+    partition = ensure_partition(cur, anio_mes)
 
-    anio_mes = f"{anio}-{str(mes).zfill(2)}"
+    cur.execute(
+        f"SELECT COUNT(*) FROM core.{partition} WHERE anio = %s",
+        (str(anio),)
+    )
+    rows_deleted = cur.fetchone()[0]
+
+    # delete_period solo borra las filas con el mismo anio: si la partición
+    # tuviera otras (AÑO distinto al de AÑO-MES) se conservan
+    cur.execute("SELECT core.stg_ventas_lyl_stored_columns()")
+    columns_sql = cur.fetchone()[0]
+
+    cur.execute(
+        f"""
+        INSERT INTO core.{staging} ({columns_sql})
+        SELECT {columns_sql}
+        FROM core.{partition}
+        WHERE anio IS DISTINCT FROM %s
+        """,
+        (str(anio),)
+    )
+
+    cur.execute(f"ALTER TABLE core.stg_ventas_lyl DETACH PARTITION core.{partition}")
+    cur.execute(f"DROP TABLE core.{partition}")
+    cur.execute(f"ALTER TABLE core.{staging} RENAME TO {partition}")
+    cur.execute(f"ALTER INDEX IF EXISTS core.{staging}_idx RENAME TO {partition}_anio_mes_ventas_key_idx")
+    cur.execute(
+        f"""
+        ALTER TABLE core.stg_ventas_lyl
+        ATTACH PARTITION core.{partition} FOR VALUES IN ('{anio_mes}')
+        """
+    )
+
+    return rows_deleted
+
+
+def replace_period_partition(conn, anio: int, anio_mes: str, copy_into, progress) -> dict:
+    """
+    Recarga por intercambio de partición: se crea la tabla nueva, se carga y
+    se indexa en transacciones propias (sin locks sobre la tabla padre) y
+    recién al final se hace el DETACH / ATTACH.
+    """
+    with conn.cursor() as cur:
+        staging = create_period_table(cur, anio_mes)
+
+    conn.commit()
 
     try:
-        df = pd.read_excel(
-            file.file,
-            sheet_name=EXCEL_SHEET_NAME,
-            engine="openpyxl",
-            dtype=str
-        )
+        with conn.cursor() as cur:
+            progress("loading")
+            rows_inserted = copy_into(cur, f"core.{staging}")
 
-        df = normalize_columns(df)
-        validate_columns(df)
+            if not rows_inserted:
+                raise Exception(f"No existen registros para el período {anio_mes} en el Excel.")
 
-        df_filtered = filter_period(df, anio, mes)
+            # con el índice ya creado ATTACH lo adopta en vez de construirlo
+            # mientras tiene tomada la tabla padre
+            cur.execute(f"CREATE INDEX {staging}_idx ON core.{staging} (anio_mes, ventas_key)")
 
-        if df_filtered.empty:
-            raise Exception(f"No existen registros para el período {anio_mes} en el Excel.")
+        conn.commit()
 
-        rows = build_insert_rows(df_filtered, file.filename)
+        with conn.cursor() as cur:
+            progress("swapping")
+            lock_period(cur, anio_mes)
+            rows_deleted = swap_period_partition(cur, anio, anio_mes, staging)
 
-        with get_connection() as conn:
-            with conn.cursor() as cur:
-                rows_deleted = delete_period(cur, anio, anio_mes)
-                rows_inserted = insert_dataframe_ventas(cur, rows)
+        conn.commit()
 
-            conn.commit()
+    except Exception:
+        conn.rollback()
 
-        return {
-            "success": True,
-            "anio": anio,
-            "mes": mes,
-            "anio_mes": anio_mes,
-            "rows_deleted": rows_deleted,
-            "rows_inserted": rows_inserted,
-            "message": "Carga realizada correctamente"
-        }
+        with conn.cursor() as cur:
+            cur.execute(f"DROP TABLE IF EXISTS core.{staging}")
+
+        conn.commit()
+        raise
 
-    except Exception as e:
-        raise Exception(f"Error cargando ventas: {str(e)}")
     return {
-        "success": True,
-        "anio": anio,
-        "mes": mes,
-        "anio_mes": anio_mes,
         "rows_deleted": rows_deleted,
-        "rows_inserted": len(df),
-        "message": "Carga realizada correctamente"
+        "rows_inserted": rows_inserted,
+        "rows_updated": 0,
+        "rows_unchanged": 0,
     }
+
+
+def has_fact_table(cur) -> bool:
+    cur.execute("SELECT to_regprocedure('core.refresh_fact_ventas_lyl(text, text)') IS NOT NULL")
+
+    return cur.fetchone()[0]
+
+
+def refresh_fact_table(cur, anio: int, anio_mes: str):
+    """
+    Reconstruye el período en core.fact_ventas_lyl desde staging con una
+    sola sentencia en la BD. Retorna las filas tipadas, o None si la tabla
+    de hechos no está instalada.
+    """
+    if not has_fact_table(cur):
+        return None
+
+    cur.execute("SELECT core.refresh_fact_ventas_lyl(%s, %s)", (str(anio), anio_mes))
+
+    return cur.fetchone()[0]
+
+
+# =========================
+# VALIDACIÓN DE FILAS
+# =========================
+
+# errores que se informan como máximo; al llegar al tope se deja de leer
+VENTAS_MAX_ERRORS = int(os.getenv("VENTAS_MAX_ERRORS", "100"))
+
+# familias permitidas separadas por coma; si no viene, las de core.prices
+VENTAS_FAMILIAS = os.getenv("VENTAS_FAMILIAS")
+
+AMOUNT_COLUMNS = [
+    "PRECIO PROFESIONAL", "PRECIO WEB", "ABONO", "$ PAGADOS", "TOTAL",
+    "TOTAL PW", "ABONO PERDIDO", "$ DESCUENTOS", "GANANCIA PROF",
+    "TOTAL GANANCIA PROF", "GANANCIA SALON", "DESCPROF_A_CLIENTAS",
+]
+
+PERCENTAGE_COLUMNS = ["% PROFESIONAL"]
+
+DATE_COLUMNS = ["FECHA ENTREGA", "FECHA RECAU."]
+
+# los mismos formatos que convierten core.try_numeric y core.try_date
+# (sql/008): lo que pasa la validación llega tipado a la tabla de hechos
+AMOUNT_PATTERN = r"-?\d+(\.\d+)?|-?\d{1,3}(\.\d{3})+(,\d+)?|-?\d+,\d+"
+ISO_DATE_PATTERN = r"\d{4}-\d{2}-\d{2}([ T]\d{2}:\d{2}(:\d{2}(\.\d+)?)?)?"
+LOCAL_DATE_PATTERN = r"\d{2}[-/]\d{2}[-/]\d{4}"
+SERIAL_DATE_PATTERN = r"\d{5}(\.\d+)?"
+
+
+def load_familias(cur) -> set:
+    if VENTAS_FAMILIAS:
+        return {familia.strip().upper() for familia in VENTAS_FAMILIAS.split(",") if familia.strip()}
+
+    cur.execute(
+        """
+        SELECT DISTINCT upper(btrim(family))
+        FROM core.prices
+        WHERE btrim(family) <> ''
+        """
+    )
+
+    return {row[0] for row in cur.fetchall()}
+
+
+def _valid_amounts(values: pd.Series) -> pd.Series:
+    text = values.str.replace(r"[$ ]", "", regex=True)
+
+    return text.str.fullmatch(AMOUNT_PATTERN, na=False)
+
+
+def _valid_percentages(values: pd.Series) -> pd.Series:
+    text = values.str.strip()
+    percent = text.str.endswith("%", na=False)
+    text = text.where(~percent, text.str[:-1])
+
+    return _valid_amounts(text)
+
+
+def _valid_dates(values: pd.Series) -> pd.Series:
+    text = values.str.strip()
+
+    iso = text.str.fullmatch(ISO_DATE_PATTERN, na=False)
+    local = text.str.fullmatch(LOCAL_DATE_PATTERN, na=False)
+    serial = text.str.fullmatch(SERIAL_DATE_PATTERN, na=False)
+
+    # AAAA-MM-DD de las dos formas de texto, para descartar 31-02 y similares
+    ymd = text.str[:10].where(iso, text.str[6:10] + "-" + text.str[3:5] + "-" + text.str[:2])
+    exists = pd.to_datetime(ymd.where(iso | local), format="%Y-%m-%d", errors="coerce").notna()
+
+    return ((iso | local) & exists) | serial
+
+
+def _invalid_values(values: pd.Series, is_valid) -> pd.Series:
+    # montos, fechas y familias se repiten mucho: las reglas se evalúan
+    # sobre los valores distintos y se proyectan a las filas con isin
+    distinct = pd.Series(values.dropna().unique(), dtype=object)
+    invalid = set(distinct[~is_valid(distinct)])
+
+    if not invalid:
+        return pd.Series(False, index=values.index)
+
+    return values.isin(invalid)
+
+
+class RowValidator:
+    """
+    Reglas por columna sobre las filas de cada período, aplicadas a cada
+    chunk con operaciones vectorizadas antes de tocar la BD.
+
+    Junta a lo más `max_errors` errores (fila, columna, valor, error); al
+    llegar al tope `full` queda en True y el que lee puede dejar de leer.
+    Los ventas_key se recuerdan entre chunks para detectar repetidos en el
+    mismo período.
+
+    Con `validar_rut` además clasifica RUT / CELULAR (rut, celular o
+    invalido, ver rut_service) y cuenta cuántos hay de cada uno; los
+    inválidos solo son error con `rechazar_rut_invalido` (que implica
+    validar_rut).
+    """
+
+    def __init__(
+        self,
+        familias: set = None,
+        max_errors: int = VENTAS_MAX_ERRORS,
+        validar_rut: bool = False,
+        rechazar_rut_invalido: bool = False
+    ):
+        self.familias = familias
+        self.max_errors = max_errors
+        self.errors = []
+        self.error_count = 0
+        self._keys = set()
+        self.rechazar_rut_invalido = rechazar_rut_invalido
+        self.rut_celular = count_kinds(np.array([])) if validar_rut or rechazar_rut_invalido else None
+
+    @property
+    def full(self) -> bool:
+        return self.error_count >= self.max_errors
+
+    def _add(self, values: pd.Series, invalid: pd.Series, column: str, error: str):
+        if not invalid.any():
+            return
+
+        self.error_count += int(invalid.sum())
+
+        room = self.max_errors - len(self.errors)
+
+        if room <= 0:
+            return
+
+        for index, value in values[invalid].head(room).items():
+            self.errors.append({
+                "fila": int(index) + 2,
+                "columna": column,
+                "valor": value,
+                "error": error,
+            })
+
+    def _column(self, df: pd.DataFrame, column: str) -> pd.Series:
+        return pd.Series(clean_series(df[column]), index=df.index, dtype=object)
+
+    def check(self, df: pd.DataFrame, anio_mes: pd.Series):
+        """
+        Valida las filas de `df` (ya filtradas por período); `anio_mes` es
+        el período de cada fila.
+        """
+        rules = (
+            (AMOUNT_COLUMNS, _valid_amounts, "Monto inválido"),
+            (PERCENTAGE_COLUMNS, _valid_percentages, "Porcentaje inválido"),
+            (DATE_COLUMNS, _valid_dates, "Fecha inválida"),
+        )
+
+        for columns, is_valid, error in rules:
+            for column in columns:
+                if column not in df.columns:
+                    continue
+
+                values = self._column(df, column)
+                invalid = _invalid_values(values, is_valid)
+                self._add(values, invalid, column, error)
+
+        keys = self._column(df, "VENTAS_KEY")
+        present = keys.notna()
+        period_keys = anio_mes.astype(object) + "\x1f" + keys
+
+        repeated = present & (
+            period_keys.duplicated(keep="first") | period_keys.isin(self._keys)
+        )
+        self._keys.update(period_keys[present])
+        self._add(keys, repeated, "VENTAS_KEY", "VENTAS_KEY repetido en el período")
+
+        if self.familias and "FAMILIA" in df.columns:
+            values = self._column(df, "FAMILIA")
+            invalid = _invalid_values(
+                values,
+                lambda distinct: distinct.str.strip().str.upper().isin(self.familias)
+            )
+            self._add(values, invalid, "FAMILIA", "FAMILIA no existe en el catálogo de precios")
+
+        if self.rut_celular is not None and "RUT / CELULAR" in df.columns:
+            values = self._column(df, "RUT / CELULAR")
+            present = values.dropna()
+            kinds, _ = classify_rut_celular(present.to_numpy())
+
+            for kind, count in count_kinds(kinds).items():
+                self.rut_celular[kind] += count
+
+            if self.rechazar_rut_invalido:
+                invalid = values.index.isin(present.index[kinds == RUT_KIND_INVALID])
+                self._add(values, pd.Series(invalid, index=values.index), "RUT / CELULAR", "No es un RUT ni un celular válido")
+
+    def report(self) -> dict:
+        errors = sorted(self.errors, key=lambda error: error["fila"])
+
+        report = {
+            "error_count": self.error_count,
+            "errors": errors,
+        }
+
+        if self.rut_celular is not None:
+            report["rut_celular"] = self.rut_celular
+
+        return report
+
+    def message(self) -> str:
+        count = f"{self.max_errors} o más" if self.full else str(self.error_count)
+
+        return f"El archivo tiene {count} errores; no se cargó nada"
+
+
+def new_row_validator(validar_rut: bool = False, rechazar_rut_invalido: bool = False) -> RowValidator:
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            return RowValidator(
+                load_familias(cur),
+                validar_rut=validar_rut,
+                rechazar_rut_invalido=rechazar_rut_invalido
+            )
+
+
+# =========================
+# REGISTRO DE CARGAS (sql/009)
+# =========================
+
+def has_ledger(cur) -> bool:
+    cur.execute("SELECT to_regclass('core.ventas_lyl_load_ledger') IS NOT NULL")
+
+    return cur.fetchone()[0]
+
+
+def find_previous_load(cur, anio_mes: str, file_sha256: str):
+    """
+    Resultado de la última carga del período si fue el mismo archivo, o
+    None. Una carga de otro archivo entremedio invalida el atajo, y también
+    una cuya tabla de hechos no se pudo actualizar (hay que volver a cargar
+    para que quede al día).
+    """
+    cur.execute(
+        """
+        SELECT file_sha256, result
+        FROM core.ventas_lyl_load_ledger
+        WHERE anio_mes = %s
+        ORDER BY id DESC
+        LIMIT 1
+        """,
+        (anio_mes,)
+    )
+    row = cur.fetchone()
+
+    if row is None or row[0] != file_sha256 or "fact_error" in row[1]:
+        return None
+
+    return row[1]
+
+
+def find_deduplicated_load(cur, anio_mes: str, ledger: dict):
+    """
+    Resumen a retornar si la carga se puede omitir por el registro, o None.
+    """
+    if not has_ledger(cur):
+        return None
+
+    previous = find_previous_load(cur, anio_mes, ledger["file_sha256"])
+
+    if previous is None:
+        return None
+
+    return {
+        **previous,
+        "deduplicated": True,
+        "message": f"El archivo ya estaba cargado para el período {anio_mes}; no se volvió a cargar"
+    }
+
+
+def record_load(cur, anio_mes: str, ledger: dict, summary: dict):
+    cur.execute(
+        """
+        INSERT INTO core.ventas_lyl_load_ledger
+            (anio_mes, file_sha256, file_size, filename, formato, modo, result, loaded_by)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        """,
+        (
+            anio_mes,
+            ledger["file_sha256"],
+            ledger.get("file_size"),
+            ledger.get("filename"),
+            ledger.get("formato"),
+            summary["modo"],
+            Jsonb(summary),
+            ledger.get("loaded_by"),
+        )
+    )
+
+
+# cargas del mismo período se ejecutan de a una: el lock local evita tomar
+# conexiones para esperar y el advisory lock cubre otros procesos
+_period_locks = {}
+_period_locks_lock = threading.Lock()
+
+
+def _period_lock(anio_mes: str) -> threading.Lock:
+    with _period_locks_lock:
+        return _period_locks.setdefault(anio_mes, threading.Lock())
+
+
+def lock_period(cur, anio_mes: str):
+    cur.execute(
+        "SELECT pg_advisory_xact_lock(hashtext(%s))",
+        (f"core.stg_ventas_lyl:{anio_mes}",)
+    )
+
+
+def _no_progress(phase=None, **progress):
+    pass
+
+
+def _validate_mode(modo: str):
+    if modo not in VENTAS_LOAD_MODES:
+        raise Exception(f"Modo inválido. Debe ser uno de: {', '.join(VENTAS_LOAD_MODES)}.")
+
+
+def _validate_format(formato: str):
+    if formato and formato.lower() not in VENTAS_FORMATS:
+        raise Exception(f"Formato inválido. Debe ser uno de: {', '.join(VENTAS_FORMATS)}.")
+
+
+def _period_summary(anio: int, mes: int, anio_mes: str, modo: str, counts: dict, message: str) -> dict:
+    return {
+        "success": True,
+        "anio": anio,
+        "mes": mes,
+        "anio_mes": anio_mes,
+        "modo": modo,
+        **counts,
+        "message": message
+    }
+
+
+def load_period(
+    anio: int,
+    mes: int,
+    copy_into,
+    modo: str = "replace",
+    progress=_no_progress,
+    ledger: dict = None,
+    force: bool = False
+) -> dict:
+    """
+    Carga un período en su propia transacción. `copy_into(cur, table)`
+    copia las filas del período a `table` y retorna cuántas fueron.
+
+    Con `ledger` (file_sha256, file_size, filename, formato, loaded_by) la
+    carga queda registrada, y si la última carga del período fue el mismo
+    archivo se retorna ese resultado sin leerlo de nuevo (salvo `force`).
+
+    modo "replace" borra el período y lo vuelve a insertar completo (con la
+    tabla particionada, intercambiando la partición); "diff" inserta,
+    actualiza o borra solo las filas que cambiaron por ventas_key.
+    """
+    anio_mes = f"{anio}-{str(mes).zfill(2)}"
+    message = "Carga realizada correctamente"
+
+    period_lock = _period_lock(anio_mes)
+
+    if not period_lock.acquire(blocking=False):
+        progress("waiting")
+        period_lock.acquire()
+
+    try:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                use_ledger = ledger is not None and has_ledger(cur)
+
+                if use_ledger and not force:
+                    progress("checking")
+                    deduplicated = find_deduplicated_load(cur, anio_mes, ledger)
+
+                    if deduplicated is not None:
+                        return deduplicated
+
+                partitioned = is_partitioned(cur)
+
+                if partitioned and modo == "diff":
+                    # la partición se crea en una transacción aparte: ATTACH
+                    # no debe quedar tomado durante todo el diff
+                    lock_period(cur, anio_mes)
+                    ensure_partition(cur, anio_mes)
+
+            conn.commit()
+
+            if partitioned and modo == "replace":
+                counts = replace_period_partition(conn, anio, anio_mes, copy_into, progress)
+            else:
+                with conn.cursor() as cur:
+                    lock_period(cur, anio_mes)
+
+                    if modo == "diff":
+                        if not has_row_hash(cur):
+                            raise Exception("El modo diff requiere la columna row_hash (sql/006).")
+
+                        create_diff_table(cur)
+
+                        progress("loading")
+                        rows_staged = copy_into(cur, DIFF_TABLE)
+
+                        if not rows_staged:
+                            raise Exception(f"No existen registros para el período {anio_mes} en el Excel.")
+
+                        progress("diffing")
+
+                        # sin ventas_key único no hay cómo parear filas: se
+                        # reemplaza el período completo en la misma transacción
+                        unique = (
+                            _keys_are_unique(cur, DIFF_TABLE, anio, anio_mes)
+                            and _keys_are_unique(cur, "core.stg_ventas_lyl", anio, anio_mes)
+                        )
+
+                        if unique:
+                            counts = apply_period_diff(cur, anio, anio_mes, rows_staged)
+                        else:
+                            modo = "replace"
+                            message = "Carga realizada correctamente (ventas_key repetido o vacío: se reemplazó el período)"
+                            counts = replace_period_from_diff_table(cur, anio, anio_mes)
+
+                    else:
+                        progress("deleting")
+                        rows_deleted = delete_period(cur, anio, anio_mes)
+
+                        progress("loading", rows_deleted=rows_deleted)
+                        rows_inserted = copy_into(cur, "core.stg_ventas_lyl")
+
+                        if not rows_inserted:
+                            raise Exception(f"No existen registros para el período {anio_mes} en el Excel.")
+
+                        counts = {
+                            "rows_deleted": rows_deleted,
+                            "rows_inserted": rows_inserted,
+                            "rows_updated": 0,
+                            "rows_unchanged": 0,
+                        }
+
+                conn.commit()
+
+            # etapa posterior en el mismo job: el período tipado en
+            # core.fact_ventas_lyl (sql/008)
+            # si falla, staging ya quedó cargado: se informa en el mensaje
+            try:
+                with conn.cursor() as cur:
+                    progress("typing")
+                    lock_period(cur, anio_mes)
+                    counts["rows_fact"] = refresh_fact_table(cur, anio, anio_mes)
+
+                conn.commit()
+
+            except Exception as e:
+                conn.rollback()
+                logging.exception("No se pudo actualizar core.fact_ventas_lyl para %s", anio_mes)
+                message = f"{message}. No se pudo actualizar la tabla de hechos: {e}"
+                # queda en el registro para que find_previous_load no la omita
+                counts["fact_error"] = str(e)
+
+            summary = _period_summary(anio, mes, anio_mes, modo, counts, message)
+
+            if use_ledger:
+                with conn.cursor() as cur:
+                    record_load(cur, anio_mes, ledger, summary)
+
+                conn.commit()
+
+    finally:
+        period_lock.release()
+
+    return summary
+
+
+def load_ventas_file(
+    anio: int,
+    mes: int,
+    source,
+    filename: str,
+    progress=_no_progress,
+    modo: str = "replace",
+    formato: str = None,
+    ledger: dict = None,
+    force: bool = False,
+    validar_rut: bool = False,
+    rechazar_rut_invalido: bool = False
+):
+    """
+    Carga el período anio-mes de core.stg_ventas_lyl con las filas del
+    archivo `source` (ruta o archivo; Excel, CSV o Parquet según `formato`
+    o su contenido). `progress(phase, **contadores)` se llama al cambiar de
+    fase y después de cada chunk.
+
+    `ledger` (file_sha256, file_size, loaded_by) registra la carga y evita
+    repetirla si es el mismo archivo; ver load_period.
+
+    Las filas del período se validan completas (RowValidator) y quedan en
+    un archivo COPY local antes de abrir la transacción: con errores se
+    retorna el reporte sin haber tocado staging. `validar_rut` agrega la
+    clasificación de RUT / CELULAR (conteos en "rut_celular");
+    `rechazar_rut_invalido` además cuenta los inválidos como errores.
+    """
+    if mes < 1 or mes > 12:
+        raise Exception("Mes inválido. Debe estar entre 1 y 12.")
+
+    _validate_mode(modo)
+
+    anio_mes = f"{anio}-{str(mes).zfill(2)}"
+
+    try:
+        # mismo archivo que la última carga: no hace falta ni leerlo, salvo
+        # que se pida validar RUT / CELULAR (la carga anterior pudo no
+        # hacerlo); en ese caso load_period igual omite la carga repetida
+        if ledger is not None and not force and not (validar_rut or rechazar_rut_invalido):
+            with get_connection() as conn:
+                with conn.cursor() as cur:
+                    deduplicated = find_deduplicated_load(cur, anio_mes, ledger)
+
+            if deduplicated is not None:
+                return deduplicated
+
+        progress("parsing")
+        formato, columns, chunks = read_ventas_chunks(source, formato)
+
+        progress("validating")
+        validate_columns(columns)
+        validator = new_row_validator(validar_rut, rechazar_rut_invalido)
+
+        with tempfile.TemporaryDirectory(prefix="ventas_", dir=VENTAS_SPOOL_DIR) as spool_dir:
+            progress("reading")
+            periods = split_periods(chunks, filename, spool_dir, anio_mes, anio_mes, progress, validator)
+
+            if validator.error_count:
+                return {
+                    "success": False,
+                    "anio": anio,
+                    "mes": mes,
+                    "anio_mes": anio_mes,
+                    "modo": modo,
+                    "rows_deleted": 0,
+                    "rows_inserted": 0,
+                    **validator.report(),
+                    "message": validator.message()
+                }
+
+            if anio_mes not in periods:
+                raise Exception(f"No existen registros para el período {anio_mes} en el Excel.")
+
+            path, _ = periods[anio_mes]
+
+            if ledger is not None:
+                ledger = {**ledger, "filename": filename, "formato": formato}
+
+            summary = load_period(
+                anio,
+                mes,
+                lambda cur, table: copy_spool(cur, path, table),
+                modo,
+                progress,
+                ledger,
+                force
+            )
+
+            if validator.rut_celular is not None:
+                summary["rut_celular"] = validator.rut_celular
+
+            return summary
+
+    except Exception as e:
+        raise Exception(f"Error cargando ventas: {str(e)}")
+
+
+# =========================
+# CARGA DE VARIOS PERÍODOS
+# =========================
+
+# períodos que se cargan en paralelo, cada uno con su propia conexión
+VENTAS_PERIOD_WORKERS = int(os.getenv("VENTAS_PERIOD_WORKERS", "4"))
+
+PERIOD_PATTERN = r"^\d{4}-(0[1-9]|1[0-2])$"
+
+_COPY_ESCAPES = str.maketrans({
+    "\\": "\\\\",
+    "\t": "\\t",
+    "\n": "\\n",
+    "\r": "\\r",
+})
+
+
+def _validate_period(value: str, name: str):
+    if value and not re.match(PERIOD_PATTERN, value):
+        raise Exception(f"{name} inválido. Debe tener formato AAAA-MM.")
+
+
+def _copy_text_line(row) -> str:
+    # una fila en el formato texto de COPY (tab, \N para NULL)
+    return "\t".join(
+        "\\N" if value is None else str(value).translate(_COPY_ESCAPES)
+        for value in row
+    ) + "\n"
+
+
+def split_periods(
+    chunks,
+    filename: str,
+    spool_dir: str,
+    desde=None,
+    hasta=None,
+    progress=_no_progress,
+    validator: RowValidator = None
+):
+    """
+    Recorre el Excel una sola vez y deja las filas de cada período en un
+    archivo en formato COPY texto dentro de `spool_dir`.
+
+    Usa el mismo criterio que filter_period: AÑO-MES con formato AAAA-MM y
+    AÑO igual a su año. Retorna {anio_mes: (ruta, filas)}.
+
+    Con `validator` cada chunk se valida antes de escribirse; desde el
+    primer error ya no se escribe nada y al llenarse el reporte se deja de
+    leer.
+    """
+    periods = {}
+    files = {}
+    rows_read = 0
+
+    try:
+        for chunk in chunks:
+            rows_read += len(chunk)
+            df = normalize_columns(chunk)
+
+            anio = clean_series(df["AÑO"])
+            anio_mes = pd.Series(clean_series(df["AÑO-MES"]), index=df.index)
+
+            mask = anio_mes.str.match(PERIOD_PATTERN, na=False) & (anio == anio_mes.str[:4])
+
+            if desde:
+                mask &= anio_mes >= desde
+
+            if hasta:
+                mask &= anio_mes <= hasta
+
+            if validator is not None:
+                validator.check(df[mask], anio_mes[mask])
+
+                if validator.error_count:
+                    progress(rows_read=rows_read, errors=validator.error_count)
+
+                    if validator.full:
+                        break
+
+                    continue
+
+            for period, index in df[mask].groupby(anio_mes[mask]).groups.items():
+                if period not in files:
+                    path = os.path.join(spool_dir, f"{period}.copy")
+                    files[period] = open(path, "w", encoding="utf-8")
+                    periods[period] = [path, 0]
+
+                rows = build_insert_rows(df.loc[index], filename)
+                files[period].writelines(_copy_text_line(row) for row in rows)
+                periods[period][1] += len(rows)
+
+            progress(rows_read=rows_read, periods_found=len(periods))
+
+    finally:
+        for spool in files.values():
+            spool.close()
+
+    return {period: tuple(info) for period, info in sorted(periods.items())}
+
+
+def copy_spool(cur, path: str, table: str) -> int:
+    columns_sql = ", ".join(DB_COLUMNS)
+
+    with open(path, "rb") as spool:
+        with cur.copy(f"COPY {table} ({columns_sql}) FROM STDIN") as copy:
+            while True:
+                data = spool.read(SPOOL_CHUNK_BYTES)
+
+                if not data:
+                    break
+
+                copy.write(data)
+
+    return cur.rowcount
+
+
+def load_ventas_file_periods(
+    source,
+    filename: str,
+    desde: str = None,
+    hasta: str = None,
+    progress=_no_progress,
+    modo: str = "replace",
+    formato: str = None,
+    ledger: dict = None,
+    force: bool = False,
+    validar_rut: bool = False,
+    rechazar_rut_invalido: bool = False
+):
+    """
+    Carga todos los períodos del archivo (o los del rango desde..hasta) con una
+    sola lectura. Cada período se carga en paralelo en su propia conexión y
+    transacción, con la misma semántica que load_ventas_file (incluido el
+    registro de cargas: un período cuya última carga fue este mismo archivo
+    no se vuelve a cargar).
+    """
+    _validate_mode(modo)
+    _validate_period(desde, "desde")
+    _validate_period(hasta, "hasta")
+
+    try:
+        progress("parsing")
+        formato, columns, chunks = read_ventas_chunks(source, formato)
+
+        progress("validating")
+        validate_columns(columns)
+        validator = new_row_validator(validar_rut, rechazar_rut_invalido)
+
+        if ledger is not None:
+            ledger = {**ledger, "filename": filename, "formato": formato}
+
+        with tempfile.TemporaryDirectory(prefix="ventas_periodos_", dir=VENTAS_SPOOL_DIR) as spool_dir:
+            progress("splitting")
+            periods = split_periods(chunks, filename, spool_dir, desde, hasta, progress, validator)
+
+            if validator.error_count:
+                return {
+                    "success": False,
+                    "desde": desde,
+                    "hasta": hasta,
+                    "modo": modo,
+                    "periods": [],
+                    "rows_inserted": 0,
+                    **validator.report(),
+                    "message": validator.message()
+                }
+
+            if not periods:
+                raise Exception("No existen registros para los períodos pedidos en el Excel.")
+
+            progress("loading", periods_total=len(periods), periods_done=0)
+
+            done = 0
+            done_lock = threading.Lock()
+
+            def run(period):
+                nonlocal done
+
+                path, rows = periods[period]
+                anio, mes = int(period[:4]), int(period[5:])
+
+                try:
+                    summary = load_period(
+                        anio,
+                        mes,
+                        lambda cur, table: copy_spool(cur, path, table),
+                        modo,
+                        ledger=ledger,
+                        force=force
+                    )
+                except Exception as e:
+                    summary = {
+                        "success": False,
+                        "anio": anio,
+                        "mes": mes,
+                        "anio_mes": period,
+                        "modo": modo,
+                        "rows_deleted": 0,
+                        "rows_inserted": 0,
+                        "message": str(e)
+                    }
+
+                with done_lock:
+                    done += 1
+                    progress(periods_done=done)
+
+                return summary
+
+            workers = max(1, min(VENTAS_PERIOD_WORKERS, len(periods)))
+
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ventas_periodos") as executor:
+                summaries = list(executor.map(run, periods))
+
+        failed = [summary["anio_mes"] for summary in summaries if not summary["success"]]
+
+        result = {
+            "success": not failed,
+            "desde": desde,
+            "hasta": hasta,
+            "modo": modo,
+            "periods": summaries,
+            "rows_inserted": sum(summary["rows_inserted"] for summary in summaries),
+            "message": (
+                f"Error cargando los períodos: {', '.join(failed)}"
+                if failed else "Carga realizada correctamente"
+            )
+        }
+
+        if validator.rut_celular is not None:
+            result["rut_celular"] = validator.rut_celular
+
+        return result
+
+    except Exception as e:
+        raise Exception(f"Error cargando ventas: {str(e)}")
+
+
+async def spool_upload(file: UploadFile):
+    """
+    Copia el archivo subido a disco local por bloques. Retorna la ruta, el
+    sha256 del contenido (calculado en la misma pasada) y el tamaño.
+
+    La escritura y el hash de cada bloque corren en el threadpool: con
+    archivos grandes no deben bloquear el event loop.
+    """
+    suffix = os.path.splitext(file.filename or "")[1]
+    fd, path = tempfile.mkstemp(prefix="ventas_", suffix=suffix, dir=VENTAS_SPOOL_DIR)
+
+    digest = hashlib.sha256()
+    size = 0
+
+    def write(spool, data):
+        digest.update(data)
+        spool.write(data)
+
+    try:
+        with os.fdopen(fd, "wb") as spool:
+            while True:
+                data = await file.read(SPOOL_CHUNK_BYTES)
+
+                if not data:
+                    break
+
+                size += len(data)
+                await run_in_threadpool(write, spool, data)
+
+    except Exception:
+        os.remove(path)
+        raise
+
+    return path, digest.hexdigest(), size
+
+
+def _remove_spool(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _job_owner(current_user: dict) -> dict:
+    return {
+        "username": current_user["username"],
+        "organization_id": current_user["organization_id"],
+    }
+
+
+def _upload_ledger(current_user: dict, file_sha256: str, file_size: int) -> dict:
+    return {
+        "file_sha256": file_sha256,
+        "file_size": file_size,
+        "loaded_by": current_user["username"],
+    }
+
+
+async def submit_upload_ventas_job(
+    anio: int,
+    mes: int,
+    file: UploadFile,
+    current_user: dict,
+    modo: str = "replace",
+    formato: str = None,
+    force: bool = False,
+    validar_rut: bool = False,
+    rechazar_rut_invalido: bool = False
+):
+    if mes < 1 or mes > 12:
+        raise Exception("Mes inválido. Debe estar entre 1 y 12.")
+
+    _validate_mode(modo)
+    _validate_format(formato)
+
+    path, file_sha256, file_size = await spool_upload(file)
+    filename = file.filename
+    ledger = _upload_ledger(current_user, file_sha256, file_size)
+
+    def run(job):
+        return load_ventas_file(
+            anio, mes, path, filename, job.update, modo, formato, ledger, force,
+            validar_rut=validar_rut,
+            rechazar_rut_invalido=rechazar_rut_invalido
+        )
+
+    job = submit_job(
+        "ventas_lyl_upload",
+        run,
+        owner=_job_owner(current_user),
+        params={
+            "anio": anio,
+            "mes": mes,
+            "anio_mes": f"{anio}-{str(mes).zfill(2)}",
+            "filename": filename,
+            "modo": modo,
+            "formato": formato,
+            "force": force,
+            "validar_rut": validar_rut,
+            "rechazar_rut_invalido": rechazar_rut_invalido,
+        },
+        cleanup=lambda: _remove_spool(path),
+    )
+
+    return job.snapshot()
+
+
+async def submit_upload_ventas_periods_job(
+    file: UploadFile,
+    current_user: dict,
+    desde: str = None,
+    hasta: str = None,
+    modo: str = "replace",
+    formato: str = None,
+    force: bool = False,
+    validar_rut: bool = False,
+    rechazar_rut_invalido: bool = False
+):
+    _validate_mode(modo)
+    _validate_format(formato)
+    _validate_period(desde, "desde")
+    _validate_period(hasta, "hasta")
+
+    path, file_sha256, file_size = await spool_upload(file)
+    filename = file.filename
+    ledger = _upload_ledger(current_user, file_sha256, file_size)
+
+    def run(job):
+        return load_ventas_file_periods(
+            path, filename, desde, hasta, job.update, modo, formato, ledger, force,
+            validar_rut=validar_rut,
+            rechazar_rut_invalido=rechazar_rut_invalido
+        )
+
+    job = submit_job(
+        "ventas_lyl_upload_periods",
+        run,
+        owner=_job_owner(current_user),
+        params={
+            "desde": desde,
+            "hasta": hasta,
+            "filename": filename,
+            "modo": modo,
+            "formato": formato,
+            "force": force,
+            "validar_rut": validar_rut,
+            "rechazar_rut_invalido": rechazar_rut_invalido,
+        },
+        cleanup=lambda: _remove_spool(path),
+    )
+
+    return job.snapshot()
+
+
+VENTAS_JOB_KINDS = ("ventas_lyl_upload", "ventas_lyl_upload_periods")
+
+
+def get_upload_ventas_job(job_id: str, current_user: dict):
+    job = get_job(job_id)
+
+    if job is None or job.kind not in VENTAS_JOB_KINDS or not job.is_owned_by(current_user):
+        raise NotFoundError("Carga no encontrada")
+
+    return job.snapshot()
@@ -0,0 +1,28 @@
+-- Avisa a los procesos del backend cuando una sesión se revoca o se elimina,
+-- también si se hace directo en la BD (fuera de /logout y /logout-session).
+-- Canal: user_session_revoked, payload: session_id.
+
+CREATE OR REPLACE FUNCTION core.notify_user_session_revoked()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    PERFORM pg_notify('user_session_revoked', OLD.session_id::text);
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_user_session_revoked ON core.user_session;
+
+CREATE TRIGGER trg_user_session_revoked
+AFTER UPDATE OF revoked, expires_at ON core.user_session
+FOR EACH ROW
+WHEN (NEW.revoked IS DISTINCT FROM OLD.revoked OR NEW.expires_at IS DISTINCT FROM OLD.expires_at)
+EXECUTE FUNCTION core.notify_user_session_revoked();
+
+DROP TRIGGER IF EXISTS trg_user_session_deleted ON core.user_session;
+
+CREATE TRIGGER trg_user_session_deleted
+AFTER DELETE ON core.user_session
+FOR EACH ROW
+EXECUTE FUNCTION core.notify_user_session_revoked();
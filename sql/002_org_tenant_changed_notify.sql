@@ -0,0 +1,27 @@
+-- Invalida el mapa organization_id -> tenant que cada proceso mantiene en
+-- memoria (core/tenant_cache.py) cuando cambian organizaciones o tenants.
+-- Canal: org_tenant_changed, payload: nombre de la tabla.
+
+CREATE OR REPLACE FUNCTION core.notify_org_tenant_changed()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    PERFORM pg_notify('org_tenant_changed', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_organization_changed ON core.organization;
+
+CREATE TRIGGER trg_organization_changed
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON core.organization
+FOR EACH STATEMENT
+EXECUTE FUNCTION core.notify_org_tenant_changed();
+
+DROP TRIGGER IF EXISTS trg_tenant_changed ON core.tenant;
+
+CREATE TRIGGER trg_tenant_changed
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON core.tenant
+FOR EACH STATEMENT
+EXECUTE FUNCTION core.notify_org_tenant_changed();
@@ -0,0 +1,34 @@
+-- Invalida el menú cacheado por grupo (services/menu_service.py) cuando
+-- cambian los menús o la asignación de roles.
+-- Canal: menu_changed, payload: nombre de la tabla.
+
+CREATE OR REPLACE FUNCTION core.notify_menu_changed()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    PERFORM pg_notify('menu_changed', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_menu_changed ON core.menu;
+
+CREATE TRIGGER trg_menu_changed
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON core.menu
+FOR EACH STATEMENT
+EXECUTE FUNCTION core.notify_menu_changed();
+
+DROP TRIGGER IF EXISTS trg_role_menu_changed ON core.role_menu;
+
+CREATE TRIGGER trg_role_menu_changed
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON core.role_menu
+FOR EACH STATEMENT
+EXECUTE FUNCTION core.notify_menu_changed();
+
+DROP TRIGGER IF EXISTS trg_group_role_changed ON core.group_role;
+
+CREATE TRIGGER trg_group_role_changed
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON core.group_role
+FOR EACH STATEMENT
+EXECUTE FUNCTION core.notify_menu_changed();
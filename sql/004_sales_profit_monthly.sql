@@ -0,0 +1,173 @@
+-- Rollup mensual de ganancia por familia para /ganancias-por-mes.
+--
+-- {tenant}.sales_profit_monthly guarda por (year, month, family) la suma de
+-- listprice - amounttopayprofessional - salondiscount y la ganancia neta ya
+-- calculada (sin IVA, FLOOR igual que la consulta en vivo).
+-- Se mantiene por triggers de sentencia sobre {tenant}.sales: solo se
+-- recalculan los meses tocados por cada INSERT/UPDATE/DELETE, bajo un
+-- advisory lock por (schema, mes).
+--
+-- Instalar para un tenant:  SELECT core.install_sales_profit_rollup('schema');
+-- Al final de este archivo se instala para todos los tenants con tabla sales.
+
+
+CREATE OR REPLACE FUNCTION core.refresh_sales_profit_monthly(p_schema text, p_months date[])
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    -- dos transacciones que escriben ventas del mismo mes recalculan de a
+    -- una: sin el lock la segunda chocaría con la PK al insertar. Los meses
+    -- se bloquean en orden fijo para no provocar deadlocks entre ellas
+    PERFORM pg_advisory_xact_lock(hashtext(p_schema || ':' || m.month_start::text))
+    FROM (
+        SELECT DISTINCT month_start
+        FROM unnest(p_months) AS u(month_start)
+        ORDER BY month_start
+    ) m;
+
+    EXECUTE format(
+        'DELETE FROM %I.sales_profit_monthly
+         WHERE make_date(year, month, 1) = ANY($1)',
+        p_schema
+    ) USING p_months;
+
+    EXECUTE format(
+        'INSERT INTO %I.sales_profit_monthly (year, month, family, margin_sum, sales_count)
+         SELECT EXTRACT(YEAR FROM m.month_start)::int,
+                EXTRACT(MONTH FROM m.month_start)::int,
+                v.family,
+                SUM(v.listprice - v.amounttopayprofessional - v.salondiscount),
+                COUNT(*)
+         FROM unnest($1) AS m(month_start)
+         JOIN %I.sales v
+           ON v.date >= m.month_start
+          AND v.date < m.month_start + interval ''1 month''
+         WHERE v.family IS NOT NULL
+         GROUP BY m.month_start, v.family',
+        p_schema,
+        p_schema
+    ) USING p_months;
+END;
+$$;
+
+
+CREATE OR REPLACE FUNCTION core.sales_profit_monthly_trigger()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_months date[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(DISTINCT date_trunc('month', date)::date)
+        INTO v_months
+        FROM new_rows;
+
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(DISTINCT date_trunc('month', date)::date)
+        INTO v_months
+        FROM old_rows;
+
+    ELSE
+        SELECT array_agg(DISTINCT date_trunc('month', t.date)::date)
+        INTO v_months
+        FROM (
+            SELECT date FROM new_rows
+            UNION
+            SELECT date FROM old_rows
+        ) t;
+    END IF;
+
+    IF v_months IS NOT NULL THEN
+        PERFORM core.refresh_sales_profit_monthly(TG_TABLE_SCHEMA, v_months);
+    END IF;
+
+    RETURN NULL;
+END;
+$$;
+
+
+CREATE OR REPLACE FUNCTION core.install_sales_profit_rollup(p_schema text)
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_months date[];
+BEGIN
+    EXECUTE format(
+        'CREATE TABLE IF NOT EXISTS %I.sales_profit_monthly (
+            year         int NOT NULL,
+            month        int NOT NULL,
+            family       text NOT NULL,
+            margin_sum   numeric,
+            sales_count  bigint NOT NULL DEFAULT 0,
+            net_profit   numeric GENERATED ALWAYS AS (FLOOR(margin_sum / (1 + (19.0 / 100)))) STORED,
+            refreshed_at timestamptz NOT NULL DEFAULT now(),
+            PRIMARY KEY (month, year, family)
+        )',
+        p_schema
+    );
+
+    EXECUTE format('DROP TRIGGER IF EXISTS trg_sales_profit_monthly_ins ON %I.sales', p_schema);
+    EXECUTE format('DROP TRIGGER IF EXISTS trg_sales_profit_monthly_upd ON %I.sales', p_schema);
+    EXECUTE format('DROP TRIGGER IF EXISTS trg_sales_profit_monthly_del ON %I.sales', p_schema);
+
+    -- las transition tables exigen un trigger por evento
+    EXECUTE format(
+        'CREATE TRIGGER trg_sales_profit_monthly_ins
+         AFTER INSERT ON %I.sales
+         REFERENCING NEW TABLE AS new_rows
+         FOR EACH STATEMENT
+         EXECUTE FUNCTION core.sales_profit_monthly_trigger()',
+        p_schema
+    );
+
+    EXECUTE format(
+        'CREATE TRIGGER trg_sales_profit_monthly_upd
+         AFTER UPDATE ON %I.sales
+         REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+         FOR EACH STATEMENT
+         EXECUTE FUNCTION core.sales_profit_monthly_trigger()',
+        p_schema
+    );
+
+    EXECUTE format(
+        'CREATE TRIGGER trg_sales_profit_monthly_del
+         AFTER DELETE ON %I.sales
+         REFERENCING OLD TABLE AS old_rows
+         FOR EACH STATEMENT
+         EXECUTE FUNCTION core.sales_profit_monthly_trigger()',
+        p_schema
+    );
+
+    -- carga inicial completa
+    EXECUTE format(
+        'SELECT array_agg(DISTINCT date_trunc(''month'', date)::date)
+         FROM %I.sales
+         WHERE date IS NOT NULL',
+        p_schema
+    ) INTO v_months;
+
+    EXECUTE format('TRUNCATE %I.sales_profit_monthly', p_schema);
+
+    IF v_months IS NOT NULL THEN
+        PERFORM core.refresh_sales_profit_monthly(p_schema, v_months);
+    END IF;
+END;
+$$;
+
+
+DO $$
+DECLARE
+    v_schema text;
+BEGIN
+    FOR v_schema IN
+        SELECT t.tenant_db_schema
+        FROM core.tenant t
+        WHERE to_regclass(format('%I.sales', t.tenant_db_schema)) IS NOT NULL
+    LOOP
+        PERFORM core.install_sales_profit_rollup(v_schema);
+    END LOOP;
+END;
+$$;
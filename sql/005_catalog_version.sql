@@ -0,0 +1,42 @@
+-- Versión del catálogo de precios. El backend mantiene core.prices indexado
+-- en memoria (services/price_catalog_service.py) y solo lo reconstruye cuando
+-- esta versión cambia; además se avisa por NOTIFY para no esperar al próximo
+-- chequeo.
+-- Canal: prices_changed, payload: nueva versión.
+
+CREATE TABLE IF NOT EXISTS core.catalog_version (
+    catalog    text PRIMARY KEY,
+    version    bigint NOT NULL DEFAULT 1,
+    updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+INSERT INTO core.catalog_version (catalog)
+VALUES ('prices')
+ON CONFLICT (catalog) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION core.bump_prices_version()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_version bigint;
+BEGIN
+    INSERT INTO core.catalog_version AS cv (catalog)
+    VALUES ('prices')
+    ON CONFLICT (catalog) DO UPDATE
+    SET version = cv.version + 1,
+        updated_at = now()
+    RETURNING version INTO v_version;
+
+    PERFORM pg_notify('prices_changed', v_version::text);
+
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_prices_changed ON core.prices;
+
+CREATE TRIGGER trg_prices_changed
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON core.prices
+FOR EACH STATEMENT
+EXECUTE FUNCTION core.bump_prices_version();
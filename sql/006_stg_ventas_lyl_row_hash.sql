@@ -0,0 +1,38 @@
+-- Hash por fila de core.stg_ventas_lyl para la carga diferencial (modo diff
+-- de /ventas-lyl/upload): solo se tocan las filas del período cuyo
+-- ventas_key es nuevo, desapareció o cambió de contenido.
+--
+-- row_hash cubre las columnas que vienen del Excel (COLUMN_MAP en
+-- services/ventas_lyl_service.py); archivo_origen, hoja_origen y fila_excel
+-- quedan fuera para que mover una fila en el Excel no la cuente como cambio.
+-- Es columna generada: las cargas por COPY no tienen que calcularlo.
+
+
+-- array_to_string es STABLE por el caso general (anyarray); sobre text[]
+-- el resultado no depende de nada externo y se puede declarar IMMUTABLE
+CREATE OR REPLACE FUNCTION core.ventas_row_hash(p_values text[])
+RETURNS text
+LANGUAGE sql
+IMMUTABLE
+PARALLEL SAFE
+AS $$
+    SELECT md5(array_to_string(p_values, E'\x1f', E'\x1e'))
+$$;
+
+
+ALTER TABLE core.stg_ventas_lyl
+    ADD COLUMN IF NOT EXISTS row_hash text GENERATED ALWAYS AS (
+        core.ventas_row_hash(ARRAY[
+            ventas_key, sp, fecha_entrega, profesional, fecha_recau,
+            rut_celular, nombre, origen, nro_formulario, familia,
+            nivel_2, nivel_3, nivel_4, precio_profesional, precio_web,
+            porcentaje_profesional, abono, pagados, total, nro_getnet,
+            total_pw, valida_form, abono_perdido, descuento, descuentos,
+            ganancia_prof, total_ganancia_prof, ganancia_salon,
+            descprof_a_clientas, anio, anio_mes, obs
+        ])
+    ) STORED;
+
+
+CREATE INDEX IF NOT EXISTS stg_ventas_lyl_periodo_key_idx
+    ON core.stg_ventas_lyl (anio_mes, ventas_key);
@@ -0,0 +1,155 @@
+-- core.stg_ventas_lyl particionada por LIST (anio_mes), una partición por
+-- período (core.stg_ventas_lyl_AAAA_MM) más una DEFAULT para valores que no
+-- son un período (NULL, textos mal formados).
+--
+-- Con esto la recarga de un período (modo replace) ya no borra filas: el
+-- backend arma el período en una tabla nueva y la intercambia por la
+-- partición anterior con DETACH / ATTACH en una transacción corta. El costo
+-- no depende de la historia acumulada y los lectores nunca ven el período
+-- a medio cargar.
+--
+-- Requiere sql/006 (row_hash). Se puede correr más de una vez: la
+-- conversión solo se hace si la tabla todavía no está particionada.
+
+
+CREATE OR REPLACE FUNCTION core.stg_ventas_lyl_partition_name(p_anio_mes text)
+RETURNS text
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT 'stg_ventas_lyl_' || replace(p_anio_mes, '-', '_')
+$$;
+
+
+-- columnas que se pueden copiar entre tablas (sin las generadas)
+CREATE OR REPLACE FUNCTION core.stg_ventas_lyl_stored_columns()
+RETURNS text
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT string_agg(quote_ident(a.attname), ', ' ORDER BY a.attnum)
+    FROM pg_attribute a
+    WHERE a.attrelid = 'core.stg_ventas_lyl'::regclass
+      AND a.attnum > 0
+      AND NOT a.attisdropped
+      AND a.attgenerated = ''
+$$;
+
+
+-- Crea la partición del período si no existe, moviendo a ella las filas que
+-- hubieran quedado en la partición DEFAULT. Retorna el nombre de la partición.
+CREATE OR REPLACE FUNCTION core.ensure_stg_ventas_lyl_partition(p_anio_mes text)
+RETURNS text
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_name    text := core.stg_ventas_lyl_partition_name(p_anio_mes);
+    v_columns text := core.stg_ventas_lyl_stored_columns();
+BEGIN
+    IF to_regclass(format('core.%I', v_name)) IS NOT NULL THEN
+        RETURN v_name;
+    END IF;
+
+    EXECUTE format(
+        'CREATE TABLE core.%I
+         (LIKE core.stg_ventas_lyl INCLUDING DEFAULTS INCLUDING GENERATED)',
+        v_name
+    );
+
+    IF to_regclass('core.stg_ventas_lyl_default') IS NOT NULL THEN
+        EXECUTE format(
+            'INSERT INTO core.%I (%s)
+             SELECT %s FROM core.stg_ventas_lyl_default WHERE anio_mes = $1',
+            v_name, v_columns, v_columns
+        ) USING p_anio_mes;
+
+        EXECUTE 'DELETE FROM core.stg_ventas_lyl_default WHERE anio_mes = $1'
+        USING p_anio_mes;
+    END IF;
+
+    EXECUTE format(
+        'ALTER TABLE core.stg_ventas_lyl ATTACH PARTITION core.%I FOR VALUES IN (%L)',
+        v_name, p_anio_mes
+    );
+
+    RETURN v_name;
+END;
+$$;
+
+
+DO $$
+DECLARE
+    v_columns  text;
+    v_anio_mes text;
+    v_seq      text;
+    v_identity boolean;
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = 'core.stg_ventas_lyl'::regclass) = 'p' THEN
+        RETURN;
+    END IF;
+
+    ALTER TABLE core.stg_ventas_lyl RENAME TO stg_ventas_lyl_unpartitioned;
+    ALTER INDEX IF EXISTS core.stg_ventas_lyl_periodo_key_idx RENAME TO stg_ventas_lyl_unpartitioned_periodo_key_idx;
+
+    -- sin INCLUDING INDEXES/CONSTRAINTS: una PK sobre id no sirve en una
+    -- tabla particionada (tendría que incluir anio_mes)
+    CREATE TABLE core.stg_ventas_lyl (
+        LIKE core.stg_ventas_lyl_unpartitioned
+        INCLUDING DEFAULTS INCLUDING GENERATED
+        INCLUDING STORAGE INCLUDING COMMENTS
+    ) PARTITION BY LIST (anio_mes);
+
+    -- si id era IDENTITY pasa a un DEFAULT con secuencia propia, que las
+    -- particiones creadas con LIKE ... INCLUDING DEFAULTS también heredan
+    SELECT a.attidentity <> ''
+    INTO v_identity
+    FROM pg_attribute a
+    WHERE a.attrelid = 'core.stg_ventas_lyl_unpartitioned'::regclass
+      AND a.attname = 'id';
+
+    IF v_identity THEN
+        CREATE SEQUENCE core.stg_ventas_lyl_part_id_seq;
+        ALTER TABLE core.stg_ventas_lyl
+            ALTER COLUMN id SET DEFAULT nextval('core.stg_ventas_lyl_part_id_seq');
+    END IF;
+
+    CREATE TABLE core.stg_ventas_lyl_default
+    PARTITION OF core.stg_ventas_lyl DEFAULT;
+
+    CREATE INDEX stg_ventas_lyl_periodo_key_idx
+        ON core.stg_ventas_lyl (anio_mes, ventas_key);
+
+    FOR v_anio_mes IN
+        SELECT DISTINCT anio_mes
+        FROM core.stg_ventas_lyl_unpartitioned
+        WHERE anio_mes ~ '^\d{4}-(0[1-9]|1[0-2])$'
+    LOOP
+        PERFORM core.ensure_stg_ventas_lyl_partition(v_anio_mes);
+    END LOOP;
+
+    v_columns := core.stg_ventas_lyl_stored_columns();
+
+    EXECUTE format(
+        'INSERT INTO core.stg_ventas_lyl (%s) SELECT %s FROM core.stg_ventas_lyl_unpartitioned',
+        v_columns, v_columns
+    );
+
+    IF v_identity THEN
+        PERFORM setval(
+            'core.stg_ventas_lyl_part_id_seq',
+            COALESCE((SELECT max(id) FROM core.stg_ventas_lyl), 0) + 1,
+            false
+        );
+        ALTER SEQUENCE core.stg_ventas_lyl_part_id_seq OWNED BY core.stg_ventas_lyl.id;
+    ELSE
+        -- la secuencia de id pertenece a la tabla antigua: se traspasa antes de borrarla
+        v_seq := pg_get_serial_sequence('core.stg_ventas_lyl_unpartitioned', 'id');
+
+        IF v_seq IS NOT NULL THEN
+            EXECUTE format('ALTER SEQUENCE %s OWNED BY core.stg_ventas_lyl.id', v_seq);
+        END IF;
+    END IF;
+
+    DROP TABLE core.stg_ventas_lyl_unpartitioned;
+END;
+$$;
@@ -0,0 +1,246 @@
+-- Tabla de hechos tipada de ventas LYL.
+--
+-- core.stg_ventas_lyl guarda todo como texto, tal como viene del Excel.
+-- Después de cada carga de un período el backend llama a
+-- core.refresh_fact_ventas_lyl(anio, anio_mes), que convierte el período
+-- completo en una sola sentencia a core.fact_ventas_lyl con fechas, montos
+-- y porcentajes ya tipados, para que los reportes no casteen en cada
+-- consulta. Lo que no se puede convertir queda en NULL.
+--
+-- Instalar: correr este archivo. Al final se llena con lo que ya hay en
+-- staging.
+
+
+-- Montos: "12345", "12345.5", "-300", "$ 1500", "1.234.567", "12.345,50",
+-- "1234,5". Un solo punto es decimal ("12.345" = 12,345), como lo deja el Excel.
+CREATE OR REPLACE FUNCTION core.try_numeric(p_value text)
+RETURNS numeric
+LANGUAGE plpgsql
+IMMUTABLE
+PARALLEL SAFE
+AS $$
+DECLARE
+    v_text text := replace(replace(btrim(p_value), '$', ''), ' ', '');
+BEGIN
+    IF v_text IS NULL OR v_text = '' THEN
+        RETURN NULL;
+    END IF;
+
+    IF v_text ~ '^-?\d+(\.\d+)?$' THEN
+        RETURN v_text::numeric;
+    END IF;
+
+    -- formato local: punto de miles y coma decimal
+    IF v_text ~ '^-?\d{1,3}(\.\d{3})+(,\d+)?$' THEN
+        RETURN replace(replace(v_text, '.', ''), ',', '.')::numeric;
+    END IF;
+
+    IF v_text ~ '^-?\d+,\d+$' THEN
+        RETURN replace(v_text, ',', '.')::numeric;
+    END IF;
+
+    RETURN NULL;
+END;
+$$;
+
+
+-- Porcentajes como fracción: "0.4" -> 0.4, "40%" -> 0.4.
+CREATE OR REPLACE FUNCTION core.try_percentage(p_value text)
+RETURNS numeric
+LANGUAGE sql
+IMMUTABLE
+PARALLEL SAFE
+AS $$
+    SELECT CASE
+        WHEN btrim(p_value) LIKE '%\%' THEN core.try_numeric(rtrim(btrim(p_value), '%')) / 100
+        ELSE core.try_numeric(p_value)
+    END
+$$;
+
+
+-- Fechas: "2024-03-01 00:00:00" (celda fecha del Excel), "2024-03-01",
+-- "01-03-2024", "01/03/2024" o el número de serie de Excel (días desde
+-- 1899-12-30). Una fecha que no existe (31-02-2024, mes 13, año 0) da NULL.
+--
+-- El día, mes y año se revisan antes de llamar a make_date en vez de atrapar
+-- su error: un bloque EXCEPTION abre una subtransacción en cada llamada (dos
+-- por fila al refrescar la tabla de hechos) y no puede correr en un worker
+-- paralelo. Es un solo SELECT sin FROM y sin casts STABLE (text::date
+-- depende de DateStyle) para que el planner la inline en la consulta.
+CREATE OR REPLACE FUNCTION core.try_date(p_value text)
+RETURNS date
+LANGUAGE sql
+IMMUTABLE
+PARALLEL SAFE
+AS $$
+    SELECT CASE
+        WHEN btrim(p_value) ~ '^\d{4}-\d{2}-\d{2}([ T]\d{2}:\d{2}(:\d{2}(\.\d+)?)?)?$' THEN
+            CASE
+                WHEN substr(btrim(p_value), 1, 4)::int >= 1
+                 AND substr(btrim(p_value), 6, 2)::int BETWEEN 1 AND 12
+                 AND substr(btrim(p_value), 9, 2)::int >= 1
+                 AND (substr(btrim(p_value), 9, 2)::int <= 28 OR substr(btrim(p_value), 9, 2)::int <= CASE
+                        WHEN substr(btrim(p_value), 6, 2)::int = 2 THEN
+                            CASE WHEN (substr(btrim(p_value), 1, 4)::int % 4 = 0 AND substr(btrim(p_value), 1, 4)::int % 100 <> 0) OR substr(btrim(p_value), 1, 4)::int % 400 = 0 THEN 29 ELSE 28 END
+                        WHEN substr(btrim(p_value), 6, 2)::int IN (4, 6, 9, 11) THEN 30
+                        ELSE 31
+                     END)
+                THEN make_date(substr(btrim(p_value), 1, 4)::int, substr(btrim(p_value), 6, 2)::int, substr(btrim(p_value), 9, 2)::int)
+            END
+        WHEN btrim(p_value) ~ '^\d{2}[-/]\d{2}[-/]\d{4}$' THEN
+            CASE
+                WHEN substr(btrim(p_value), 7, 4)::int >= 1
+                 AND substr(btrim(p_value), 4, 2)::int BETWEEN 1 AND 12
+                 AND substr(btrim(p_value), 1, 2)::int >= 1
+                 AND (substr(btrim(p_value), 1, 2)::int <= 28 OR substr(btrim(p_value), 1, 2)::int <= CASE
+                        WHEN substr(btrim(p_value), 4, 2)::int = 2 THEN
+                            CASE WHEN (substr(btrim(p_value), 7, 4)::int % 4 = 0 AND substr(btrim(p_value), 7, 4)::int % 100 <> 0) OR substr(btrim(p_value), 7, 4)::int % 400 = 0 THEN 29 ELSE 28 END
+                        WHEN substr(btrim(p_value), 4, 2)::int IN (4, 6, 9, 11) THEN 30
+                        ELSE 31
+                     END)
+                THEN make_date(substr(btrim(p_value), 7, 4)::int, substr(btrim(p_value), 4, 2)::int, substr(btrim(p_value), 1, 2)::int)
+            END
+        WHEN btrim(p_value) ~ '^\d{5}(\.\d+)?$' THEN
+            DATE '1899-12-30' + floor(btrim(p_value)::numeric)::int
+    END
+$$;
+
+
+CREATE TABLE IF NOT EXISTS core.fact_ventas_lyl (
+    periodo                date NOT NULL,
+    anio                   smallint NOT NULL,
+    mes                    smallint NOT NULL,
+    ventas_key             text,
+    sp                     text,
+    fecha_entrega          date,
+    profesional            text,
+    fecha_recau            date,
+    rut_celular            text,
+    nombre                 text,
+    origen                 text,
+    nro_formulario         text,
+    familia                text,
+    nivel_2                text,
+    nivel_3                text,
+    nivel_4                text,
+    precio_profesional     numeric,
+    precio_web             numeric,
+    porcentaje_profesional numeric,
+    abono                  numeric,
+    pagados                numeric,
+    total                  numeric,
+    nro_getnet             text,
+    total_pw               numeric,
+    valida_form            text,
+    abono_perdido          numeric,
+    descuento              text,
+    descuentos             numeric,
+    ganancia_prof          numeric,
+    total_ganancia_prof    numeric,
+    ganancia_salon         numeric,
+    descprof_a_clientas    numeric,
+    obs                    text,
+    archivo_origen         text,
+    fila_excel             integer,
+    loaded_at              timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS fact_ventas_lyl_periodo_familia_idx
+    ON core.fact_ventas_lyl (periodo, familia);
+
+CREATE INDEX IF NOT EXISTS fact_ventas_lyl_niveles_idx
+    ON core.fact_ventas_lyl (familia, nivel_2, nivel_3, nivel_4);
+
+CREATE INDEX IF NOT EXISTS fact_ventas_lyl_fecha_entrega_idx
+    ON core.fact_ventas_lyl (fecha_entrega);
+
+CREATE INDEX IF NOT EXISTS fact_ventas_lyl_ventas_key_idx
+    ON core.fact_ventas_lyl (ventas_key);
+
+
+-- Reemplaza el período en la tabla de hechos con lo que hay en staging.
+-- Retorna las filas insertadas.
+CREATE OR REPLACE FUNCTION core.refresh_fact_ventas_lyl(p_anio text, p_anio_mes text)
+RETURNS bigint
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_periodo date := to_date(p_anio_mes || '-01', 'YYYY-MM-DD');
+    v_rows    bigint;
+BEGIN
+    DELETE FROM core.fact_ventas_lyl
+    WHERE periodo = v_periodo;
+
+    INSERT INTO core.fact_ventas_lyl (
+        periodo, anio, mes,
+        ventas_key, sp, fecha_entrega, profesional, fecha_recau,
+        rut_celular, nombre, origen, nro_formulario,
+        familia, nivel_2, nivel_3, nivel_4,
+        precio_profesional, precio_web, porcentaje_profesional,
+        abono, pagados, total, nro_getnet, total_pw, valida_form,
+        abono_perdido, descuento, descuentos,
+        ganancia_prof, total_ganancia_prof, ganancia_salon, descprof_a_clientas,
+        obs, archivo_origen, fila_excel
+    )
+    SELECT
+        v_periodo,
+        EXTRACT(YEAR FROM v_periodo)::smallint,
+        EXTRACT(MONTH FROM v_periodo)::smallint,
+        s.ventas_key,
+        s.sp,
+        core.try_date(s.fecha_entrega),
+        s.profesional,
+        core.try_date(s.fecha_recau),
+        s.rut_celular,
+        s.nombre,
+        s.origen,
+        s.nro_formulario,
+        upper(btrim(s.familia)),
+        btrim(s.nivel_2),
+        btrim(s.nivel_3),
+        btrim(s.nivel_4),
+        core.try_numeric(s.precio_profesional),
+        core.try_numeric(s.precio_web),
+        core.try_percentage(s.porcentaje_profesional),
+        core.try_numeric(s.abono),
+        core.try_numeric(s.pagados),
+        core.try_numeric(s.total),
+        s.nro_getnet,
+        core.try_numeric(s.total_pw),
+        s.valida_form,
+        core.try_numeric(s.abono_perdido),
+        s.descuento,
+        core.try_numeric(s.descuentos),
+        core.try_numeric(s.ganancia_prof),
+        core.try_numeric(s.total_ganancia_prof),
+        core.try_numeric(s.ganancia_salon),
+        core.try_numeric(s.descprof_a_clientas),
+        s.obs,
+        s.archivo_origen,
+        s.fila_excel
+    FROM core.stg_ventas_lyl s
+    WHERE s.anio = p_anio
+      AND s.anio_mes = p_anio_mes;
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+
+    RETURN v_rows;
+END;
+$$;
+
+
+-- carga inicial con los períodos que ya están en staging
+DO $$
+DECLARE
+    v_anio_mes text;
+BEGIN
+    FOR v_anio_mes IN
+        SELECT DISTINCT anio_mes
+        FROM core.stg_ventas_lyl
+        WHERE anio_mes ~ '^\d{4}-(0[1-9]|1[0-2])$'
+          AND anio = substr(anio_mes, 1, 4)
+    LOOP
+        PERFORM core.refresh_fact_ventas_lyl(substr(v_anio_mes, 1, 4), v_anio_mes);
+    END LOOP;
+END;
+$$;
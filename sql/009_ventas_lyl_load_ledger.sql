@@ -0,0 +1,24 @@
+-- Registro de cargas exitosas de ventas LYL por período.
+--
+-- Cada carga guarda el sha256 del archivo subido. Si llega otra vez el mismo
+-- archivo para un período cuya última carga fue justamente ese archivo, el
+-- backend responde con el resultado anterior sin volver a leerlo ni cargarlo
+-- (salvo que se pida force). Una carga que dejó staging al día pero no pudo
+-- actualizar core.fact_ventas_lyl queda con result->'fact_error' y no sirve
+-- de atajo: el mismo archivo se vuelve a cargar.
+
+CREATE TABLE IF NOT EXISTS core.ventas_lyl_load_ledger (
+    id          bigserial PRIMARY KEY,
+    anio_mes    text NOT NULL,
+    file_sha256 text NOT NULL,
+    file_size   bigint,
+    filename    text,
+    formato     text,
+    modo        text,
+    result      jsonb NOT NULL,
+    loaded_by   text,
+    loaded_at   timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS ventas_lyl_load_ledger_periodo_idx
+    ON core.ventas_lyl_load_ledger (anio_mes, id DESC);
@@ -0,0 +1,73 @@
+-- Invalida la configuración del formulario de clientes express que cada
+-- proceso mantiene en memoria por tenant (services/customer_express_service.py)
+-- cuando cambian {tenant}.customer_capture_settings o
+-- {tenant}.identifier_type_settings.
+-- Canal: customer_settings_changed, payload: schema del tenant.
+--
+-- Las tablas viven en el schema de cada tenant: al crear un tenant nuevo
+-- hay que llamar a core.install_customer_settings_triggers('<schema>') (o
+-- volver a correr este archivo). También crea el índice por token de
+-- {tenant}.customers_express, que es la única consulta al abrir el formulario.
+
+CREATE OR REPLACE FUNCTION core.notify_customer_settings_changed()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    PERFORM pg_notify('customer_settings_changed', TG_TABLE_SCHEMA);
+    RETURN NULL;
+END;
+$$;
+
+
+CREATE OR REPLACE FUNCTION core.install_customer_settings_triggers(p_schema text)
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_table text;
+BEGIN
+    FOREACH v_table IN ARRAY ARRAY['customer_capture_settings', 'identifier_type_settings']
+    LOOP
+        IF to_regclass(format('%I.%I', p_schema, v_table)) IS NULL THEN
+            CONTINUE;
+        END IF;
+
+        EXECUTE format(
+            'DROP TRIGGER IF EXISTS trg_customer_settings_changed ON %I.%I',
+            p_schema, v_table
+        );
+
+        EXECUTE format(
+            'CREATE TRIGGER trg_customer_settings_changed
+             AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I.%I
+             FOR EACH STATEMENT
+             EXECUTE FUNCTION core.notify_customer_settings_changed()',
+            p_schema, v_table
+        );
+    END LOOP;
+
+    IF to_regclass(format('%I.customers_express', p_schema)) IS NOT NULL THEN
+        EXECUTE format(
+            'CREATE INDEX IF NOT EXISTS customers_express_token_idx
+             ON %I.customers_express (customers_express_token)',
+            p_schema
+        );
+    END IF;
+END;
+$$;
+
+
+DO $$
+DECLARE
+    v_schema text;
+BEGIN
+    FOR v_schema IN
+        SELECT DISTINCT table_schema
+        FROM information_schema.tables
+        WHERE table_name IN ('customer_capture_settings', 'identifier_type_settings')
+    LOOP
+        PERFORM core.install_customer_settings_triggers(v_schema);
+    END LOOP;
+END;
+$$;
@@ -0,0 +1,196 @@
+"""
+La limpieza vectorizada (clean_series en filter_period / build_insert_rows)
+debe dar exactamente las mismas filas que la implementación original celda
+a celda con clean_value, sobre un libro VENTAS con NaN, tipos mezclados,
+fechas y números escritos como texto.
+"""
+
+from datetime import datetime
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from services.ventas_lyl_service import (
+    COLUMN_MAP,
+    DB_COLUMNS,
+    EXCEL_SHEET_NAME,
+    build_insert_rows,
+    clean_series,
+    clean_value,
+    filter_period,
+    normalize_columns,
+)
+
+
+ARCHIVO = "golden.xlsx"
+
+PERIODS = [(2024, 1), (2024, 2), (2024, 12)]
+
+
+# =========================
+# IMPLEMENTACIÓN ORIGINAL (referencia)
+# =========================
+
+def filter_period_celda_a_celda(df: pd.DataFrame, anio: int, mes: int) -> pd.DataFrame:
+    anio_text = str(anio)
+    anio_mes = f"{anio}-{str(mes).zfill(2)}"
+
+    df["AÑO"] = df["AÑO"].apply(clean_value)
+    df["AÑO-MES"] = df["AÑO-MES"].apply(clean_value)
+
+    return df[
+        (df["AÑO"] == anio_text) &
+        (df["AÑO-MES"] == anio_mes)
+    ].copy()
+
+
+def build_insert_rows_celda_a_celda(df: pd.DataFrame, archivo_origen: str):
+    rows = []
+
+    for index, row in df.iterrows():
+        record = {}
+
+        for excel_col, db_col in COLUMN_MAP.items():
+            if excel_col in df.columns:
+                record[db_col] = clean_value(row[excel_col])
+            else:
+                record[db_col] = None
+
+        record["archivo_origen"] = archivo_origen
+        record["hoja_origen"] = EXCEL_SHEET_NAME
+        record["fila_excel"] = int(index) + 2
+
+        rows.append(tuple(record[col] for col in DB_COLUMNS))
+
+    return rows
+
+
+# =========================
+# LIBRO DE PRUEBA
+# =========================
+
+# valores difíciles por columna; cada fila toma el siguiente de la lista
+TRICKY_VALUES = [
+    None,
+    "",
+    "   ",
+    "nan",
+    " NaN ",
+    "None",
+    "NaT",
+    "texto",
+    "  con espacios  ",
+    "1.0",
+    "1.0.0",
+    ".0",
+    "12345.0",
+    "12.345",
+    "0.4",
+    "40%",
+    "$ 1.500",
+    0,
+    1,
+    -300,
+    1500.0,
+    1500.5,
+    0.1 + 0.2,
+    True,
+    False,
+    datetime(2024, 3, 1),
+    datetime(2024, 3, 1, 14, 30),
+    "01/03/2024",
+    "45352",
+    "ñandú",
+]
+
+# AÑO / AÑO-MES: los que tienen que calzar con el período y los que no
+PERIOD_VALUES = [
+    (2024, "2024-01"),
+    ("2024", "2024-01"),
+    (2024.0, "2024-02"),
+    (" 2024 ", " 2024-02 "),
+    ("2024.0", "2024-12"),
+    (2024, "2024-1"),
+    (2023, "2024-01"),
+    (None, "2024-01"),
+    (2024, None),
+    ("nan", "2024-01"),
+    (2024, datetime(2024, 1, 1)),
+]
+
+
+@pytest.fixture(scope="module")
+def golden_workbook(tmp_path_factory):
+    path = tmp_path_factory.mktemp("ventas") / ARCHIVO
+
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = EXCEL_SHEET_NAME
+
+    # encabezados con espacios alrededor, como llegan a veces del Excel;
+    # sin DESCUENTO para cubrir una columna de COLUMN_MAP ausente
+    headers = [f" {col} " if i % 7 == 0 else col for i, col in enumerate(COLUMN_MAP) if col != "DESCUENTO"]
+    sheet.append(headers)
+
+    for i in range(len(TRICKY_VALUES) * 3):
+        anio, anio_mes = PERIOD_VALUES[i % len(PERIOD_VALUES)]
+        row = []
+
+        for j, col in enumerate(headers):
+            name = col.strip()
+
+            if name == "AÑO":
+                row.append(anio)
+            elif name == "AÑO-MES":
+                row.append(anio_mes)
+            elif name == "VENTAS_KEY":
+                row.append(f"V-{i:04d}" if i % 5 else i)
+            else:
+                row.append(TRICKY_VALUES[(i + j) % len(TRICKY_VALUES)])
+
+        sheet.append(row)
+
+    # una fila completamente vacía en medio y datos después
+    sheet.append([])
+    sheet.append([2024 if col.strip() == "AÑO" else "2024-01" if col.strip() == "AÑO-MES" else "x" for col in headers])
+
+    workbook.save(path)
+
+    return path
+
+
+def _read(path, **kwargs) -> pd.DataFrame:
+    return normalize_columns(
+        pd.read_excel(path, sheet_name=EXCEL_SHEET_NAME, engine="openpyxl", **kwargs)
+    )
+
+
+# =========================
+# TESTS
+# =========================
+
+def test_clean_series_matches_clean_value_cell_by_cell():
+    values = pd.Series(
+        TRICKY_VALUES + [float("nan"), pd.NaT, pd.NA, 2.0, "2.0 ", " .0"],
+        dtype=object
+    )
+
+    assert clean_series(values).tolist() == [clean_value(value) for value in values]
+
+
+@pytest.mark.parametrize("dtype", [str, None], ids=["dtype_str", "tipos_mezclados"])
+@pytest.mark.parametrize("anio, mes", PERIODS)
+def test_vectorized_rows_match_original(golden_workbook, dtype, anio, mes):
+    original = build_insert_rows_celda_a_celda(
+        filter_period_celda_a_celda(_read(golden_workbook, dtype=dtype), anio, mes),
+        ARCHIVO
+    )
+
+    vectorized = build_insert_rows(
+        filter_period(_read(golden_workbook, dtype=dtype), anio, mes),
+        ARCHIVO
+    )
+
+    assert original, "el libro de prueba debe tener filas en cada período"
+    assert vectorized == original